@@ -1,9 +1,20 @@
 import logging
+import signal
+import threading
+import time
 from http.server import HTTPServer
 
 from .config import parse_args
-from .storage.db import MediaDB
+from .storage.backup import BackupScheduler
+from .storage.maintenance import MaintenanceScheduler
+from .storage.s3_client import S3Client
+from .storage.sharding import open_media_db
+from .storage.write_behind import WriteBehindQueue
 from .handler import MediaRequestHandler
+from .http_layer.aio_server import DEFAULT_DB_THREADS, AsyncMediaServer
+from .http_layer.pool_server import PooledHTTPServer
+from .http_layer.prefork import PreforkSupervisor
+from .utils import metrics
 
 
 class ColorFormatter(logging.Formatter):
@@ -28,6 +39,152 @@ class ColorFormatter(logging.Formatter):
         return f"{prefix}{message}"
 
 
+def _adopt_socket(server, sock):
+    server.socket.close()
+    server.socket = sock
+    server.server_address = sock.getsockname()[:2]
+    return server
+
+
+def build_server(config, sock=None):
+    address = (config.server.host, config.server.port)
+    if config.server.engine == "asyncio":
+        return AsyncMediaServer(
+            address,
+            config,
+            MediaRequestHandler.db,
+            backlog=config.server.backlog,
+            idle_timeout=config.server.keepalive_timeout,
+            sock=sock,
+            db_writer=MediaRequestHandler.db_writer,
+            db_threads=_db_readers(config),
+        )
+    # A kept-alive connection holds its thread until the idle timeout, which
+    # would stall every other client of the serial server.
+    MediaRequestHandler.configure_keep_alive(config.server.keepalive_timeout if config.server.workers > 0 else 0)
+    if config.server.workers > 0:
+        server = PooledHTTPServer(
+            address,
+            MediaRequestHandler,
+            workers=config.server.workers,
+            backlog=config.server.backlog,
+            queue_depth=config.server.queue_depth,
+            bind_and_activate=sock is None,
+        )
+        return _adopt_socket(server, sock) if sock is not None else server
+    server = HTTPServer(address, MediaRequestHandler, bind_and_activate=False)
+    if sock is not None:
+        return _adopt_socket(server, sock)
+    server.request_queue_size = max(1, config.server.backlog)
+    try:
+        server.server_bind()
+        server.server_activate()
+    except Exception:
+        server.server_close()
+        raise
+    return server
+
+
+def _db_readers(config):
+    """Readers per process: one per thread that can run a request at once."""
+    if config.db.readers > 0:
+        return config.db.readers
+    # The asyncio engine runs SQLite calls on that many threads of its own.
+    if config.server.engine == "asyncio":
+        return DEFAULT_DB_THREADS
+    # The serial server touches SQLite from a single thread.
+    if config.server.workers <= 0:
+        return 1
+    return config.server.workers
+
+
+def _open_db(config, init_schema=True):
+    db = open_media_db(
+        config.db_path,
+        shards=config.db.shards,
+        pool_size=_db_readers(config),
+        init_schema=init_schema,
+        checkout_timeout=config.db.checkout_timeout,
+        mmap_size=config.db.mmap_size,
+    )
+    metrics.register("db_pool", db.pool_stats)
+    return db
+
+
+def _attach_key_layouts(config, db):
+    # Learned key layouts are persisted in media.db; load them before the first HEAD.
+    if config.storage.layout_learn_after > 0:
+        S3Client.shared(config.storage).layouts.attach(db)
+
+
+def _open_db_writer(config, db):
+    if not config.db.write_behind:
+        return None
+    return WriteBehindQueue(
+        db,
+        max_batch=config.db.write_behind_batch,
+        max_delay_ms=config.db.write_behind_delay_ms,
+        capacity=config.db.write_behind_capacity,
+    )
+
+
+def _start_maintenance(config, db):
+    if not config.db.maintenance:
+        return None
+    return MaintenanceScheduler(
+        db,
+        wal_limit_bytes=config.db.wal_checkpoint_mb * 1024 * 1024,
+        optimize_interval=config.db.optimize_interval,
+        budget_ms=config.db.maintenance_budget_ms,
+        placeholder_max_age=config.db.placeholder_max_age,
+        sweep_interval=config.db.placeholder_sweep_interval,
+        sweep_batch=config.db.placeholder_sweep_batch,
+    ).start()
+
+
+def _start_backups(config, db):
+    if not config.db.backup_dir:
+        return None
+    return BackupScheduler(
+        db,
+        config.db.backup_dir,
+        interval=config.db.backup_interval,
+        keep=config.db.backup_keep,
+        pages=config.db.backup_pages,
+        sleep=config.db.backup_sleep_ms / 1000,
+        compress=config.db.backup_compress,
+    ).start()
+
+
+def _close_db(db, writer, *schedulers):
+    for scheduler in schedulers:
+        if scheduler is not None:
+            scheduler.close()
+    # Flush queued upserts before the connections they are written through go away.
+    if writer is not None:
+        writer.close()
+    if db is not None:
+        db.close()
+
+
+def _run_prefork_worker(config, sock):
+    # Each worker owns its connection pool; the schema was created by the
+    # supervisor before forking so workers never race on DDL.
+    MediaRequestHandler.config = config
+    MediaRequestHandler.db = _open_db(config, init_schema=False)
+    _attach_key_layouts(config, MediaRequestHandler.db)
+    MediaRequestHandler.db_writer = _open_db_writer(config, MediaRequestHandler.db)
+    maintenance = _start_maintenance(config, MediaRequestHandler.db)
+    server = build_server(config, sock=sock)
+    signal.signal(signal.SIGTERM, lambda signum, frame: threading.Thread(target=server.shutdown).start())
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        _close_db(MediaRequestHandler.db, MediaRequestHandler.db_writer, maintenance)
+    return 0
+
+
 def main():
     config = parse_args()
     handler = logging.StreamHandler()
@@ -37,19 +194,59 @@ def main():
     root.handlers = [handler]
     level = getattr(logging, config.log_level.upper(), logging.INFO)
     root.setLevel(level)
+    if config.server.processes > 1:
+        if config.db.backup_dir:
+            logging.warning("--db-backup-dir is ignored with --processes > 1; schedule scripts/backup_media_db.py instead")
+        open_media_db(config.db_path, shards=config.db.shards, pool_size=1).close()
+        supervisor = PreforkSupervisor(
+            (config.server.host, config.server.port),
+            config.server.processes,
+            lambda sock: _run_prefork_worker(config, sock),
+            backlog=config.server.backlog,
+            reuse_port=config.server.reuse_port,
+        )
+        supervisor.run()
+        return
+
     MediaRequestHandler.config = config
-    MediaRequestHandler.db = MediaDB(config.db_path)
+    started = time.perf_counter()
+    MediaRequestHandler.db = _open_db(config)
+    if config.db.bloom_filter:
+        # Pre-forked workers never get here: a sibling's writes would not reach this filter.
+        membership = MediaRequestHandler.db.enable_membership_filter(config.db.bloom_fp_rate)
+        stats = membership.stats()
+        logging.info(
+            "Fingerprint filter loaded members=%s memory=%.1fMiB",
+            stats["members"],
+            stats["memory_bytes"] / (1 << 20),
+        )
+    _attach_key_layouts(config, MediaRequestHandler.db)
+    MediaRequestHandler.db_writer = _open_db_writer(config, MediaRequestHandler.db)
+    maintenance = _start_maintenance(config, MediaRequestHandler.db)
+    backups = _start_backups(config, MediaRequestHandler.db)
+    logging.info(
+        "Database ready in %.1fms (schema check %.1fms)",
+        (time.perf_counter() - started) * 1000,
+        MediaRequestHandler.db.schema_ready_ms,
+    )
 
-    server = HTTPServer((config.server.host, config.server.port), MediaRequestHandler)
-    logging.info("Media server listening on %s:%s", config.server.host, config.server.port)
+    server = build_server(config)
+    # SIGTERM (systemd stop) takes the same path as Ctrl+C so queued writes are flushed.
+    signal.signal(signal.SIGTERM, lambda signum, frame: threading.Thread(target=server.shutdown).start())
+    logging.info(
+        "Media server listening on %s:%s engine=%s workers=%s",
+        config.server.host,
+        config.server.port,
+        config.server.engine,
+        config.server.workers or "serial",
+    )
     try:
         server.serve_forever()
     except KeyboardInterrupt:
         logging.info("Shutting down...")
     finally:
-        if getattr(MediaRequestHandler, "db", None):
-            MediaRequestHandler.db.close()
         server.server_close()
+        _close_db(MediaRequestHandler.db, MediaRequestHandler.db_writer, maintenance, backups)
 
 
 if __name__ == "__main__":
@@ -1,10 +1,12 @@
 from .app import AppConfig, parse_args
+from .database import DatabaseConfig
 from .server import ServerConfig
 from .storage import StorageConfig
 from .sts import STSConfig
 
 __all__ = [
     "AppConfig",
+    "DatabaseConfig",
     "ServerConfig",
     "StorageConfig",
     "STSConfig",
@@ -1,6 +1,7 @@
 import argparse
 from dataclasses import dataclass
 
+from .database import DatabaseConfig
 from .server import ServerConfig
 from .storage import StorageConfig
 from .sts import STSConfig
@@ -13,6 +14,7 @@ class AppConfig:
     sts: STSConfig
     db_path: str
     log_level: str
+    db: DatabaseConfig = DatabaseConfig()
 
 
 def parse_bool(value):
@@ -29,6 +31,43 @@ def parse_args():
     parser.add_argument("--host", default="0.0.0.0", help="Bind host")
     parser.add_argument("--port", type=int, default=8090, help="Bind port")
     parser.add_argument("--token", default="demo-token", help="Fixed x-auth-token")
+    parser.add_argument(
+        "--engine",
+        choices=("threaded", "asyncio"),
+        default="threaded",
+        help="Serving engine: threaded (HTTPServer, optionally pooled) or asyncio (non-blocking S3/STS I/O)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help="Worker threads serving requests concurrently (0 = serve one request at a time)",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=1,
+        help="Pre-forked worker processes sharing the listening port (1 = single process)",
+    )
+    parser.add_argument(
+        "--reuse-port",
+        type=parse_bool,
+        default=False,
+        help="Let each pre-forked worker bind its own SO_REUSEPORT socket instead of inheriting one",
+    )
+    parser.add_argument(
+        "--keepalive-timeout",
+        type=int,
+        default=15,
+        help="Seconds an idle HTTP/1.1 keep-alive connection stays open (0 = close after each response)",
+    )
+    parser.add_argument("--backlog", type=int, default=128, help="Listen socket accept backlog")
+    parser.add_argument(
+        "--queue-depth",
+        type=int,
+        default=64,
+        help="Accepted connections allowed to wait for a worker before answering 503",
+    )
     parser.add_argument("--storage-endpoint", default="http://127.0.0.1:9000", help="Object storage endpoint")
     parser.add_argument("--storage-bucket", default="media", help="Object storage bucket")
     parser.add_argument("--storage-region", default="us-east-1", help="Object storage region")
@@ -53,10 +92,209 @@ def parse_args():
         default=False,
         help="Trust X-Forwarded-Host/Proto headers for public endpoint resolution",
     )
+    parser.add_argument(
+        "--storage-head-parallelism",
+        type=int,
+        default=8,
+        help="Concurrent HEAD checks per tiny-fingerprints request",
+    )
+    parser.add_argument(
+        "--storage-head-deadline",
+        type=float,
+        default=10.0,
+        help="Seconds a tiny-fingerprints request waits for its HEAD checks; unanswered keys are left untouched",
+    )
+    parser.add_argument(
+        "--storage-pool-size",
+        type=int,
+        default=8,
+        help="Keep-alive connections to the storage endpoint per process",
+    )
+    parser.add_argument(
+        "--storage-pool-idle-timeout",
+        type=float,
+        default=60.0,
+        help="Seconds an idle storage connection is kept before it is closed",
+    )
+    parser.add_argument(
+        "--storage-verify-freshness",
+        type=float,
+        default=300.0,
+        help="Seconds a successful HEAD is trusted before the object is checked again; 0 always checks",
+    )
+    parser.add_argument(
+        "--storage-breaker-failures",
+        type=int,
+        default=5,
+        help="Consecutive storage failures that open the circuit breaker (0 = disabled)",
+    )
+    parser.add_argument(
+        "--storage-breaker-reset",
+        type=float,
+        default=10.0,
+        help="Seconds the storage circuit stays open before half-open probes are let through",
+    )
+    parser.add_argument(
+        "--storage-breaker-probes",
+        type=int,
+        default=1,
+        help="Requests let through while the storage circuit is half-open",
+    )
+    parser.add_argument(
+        "--storage-layout-learn-after",
+        type=int,
+        default=3,
+        help="Consecutive hits in one key layout before a workspace's HEADs stop trying the other (0 = always both)",
+    )
+    parser.add_argument(
+        "--storage-hedge-percentile",
+        type=float,
+        default=0.0,
+        help="Percentile of recent HEAD latency after which a second HEAD is sent (0 = no hedging, e.g. 95)",
+    )
+    parser.add_argument(
+        "--storage-hedge-budget",
+        type=float,
+        default=0.05,
+        help="Most hedged HEADs as a fraction of all HEADs",
+    )
+    parser.add_argument(
+        "--storage-events-token",
+        default="",
+        help="Shared secret MinIO sends with bucket notifications to POST /storage/api/v1/events (empty = endpoint disabled)",
+    )
+    parser.add_argument(
+        "--storage-event-index-ttl",
+        type=float,
+        default=3600.0,
+        help="Seconds an object index entry is trusted instead of a HEAD (0 = never consult the index)",
+    )
     parser.add_argument("--storage-sts-role-arn", default="arn:aws:iam::minio:role/dji-pilot", help="MinIO STS role ARN")
     parser.add_argument("--storage-sts-policy", default="", help="MinIO STS policy JSON")
     parser.add_argument("--storage-sts-duration", type=int, default=3600, help="MinIO STS duration seconds")
+    parser.add_argument(
+        "--storage-sts-cache",
+        type=parse_bool,
+        default=True,
+        help="Reuse STS credentials per workspace until close to expiry",
+    )
+    parser.add_argument(
+        "--storage-sts-refresh-threshold",
+        type=int,
+        default=300,
+        help="Seconds of remaining lifetime below which cached STS credentials are no longer handed out",
+    )
     parser.add_argument("--db-path", default="/opt/mediaserver/data/media.db", help="SQLite DB path")
+    parser.add_argument(
+        "--db-write-behind",
+        type=parse_bool,
+        default=False,
+        help="Queue fast-upload fingerprint upserts for a writer thread that commits them in groups",
+    )
+    parser.add_argument("--db-write-behind-batch", type=int, default=256, help="Max upserts per group commit")
+    parser.add_argument(
+        "--db-write-behind-delay-ms",
+        type=float,
+        default=5.0,
+        help="Max milliseconds a queued upsert waits for its group to fill",
+    )
+    parser.add_argument(
+        "--db-write-behind-capacity",
+        type=int,
+        default=10000,
+        help="Max queued upserts; when full, requests write synchronously",
+    )
+    parser.add_argument(
+        "--db-bloom-filter",
+        type=parse_bool,
+        default=False,
+        help=(
+            "Answer unknown fingerprints from an in-memory filter (single-process mode only); "
+            "rows added by other processes, e.g. reconcile_storage.py --fix-orphans, stay hidden until restart"
+        ),
+    )
+    parser.add_argument(
+        "--db-bloom-fp-rate",
+        type=float,
+        default=0.01,
+        help="Target false-positive rate of the fingerprint filter",
+    )
+    parser.add_argument(
+        "--db-readers",
+        type=int,
+        default=0,
+        help="Read-only SQLite connections per process (0 = one per request worker)",
+    )
+    parser.add_argument(
+        "--db-checkout-timeout",
+        type=float,
+        default=5.0,
+        help="Seconds a request waits for a free SQLite connection before answering 503",
+    )
+    parser.add_argument(
+        "--db-mmap-size",
+        type=int,
+        default=256 * 1024 * 1024,
+        help="Bytes of the database each reader memory-maps (0 = disabled)",
+    )
+    parser.add_argument(
+        "--db-shards",
+        type=int,
+        default=0,
+        help="Spread workspaces over this many hash-sharded SQLite files next to --db-path (0 = one file)",
+    )
+    parser.add_argument(
+        "--db-maintenance",
+        type=parse_bool,
+        default=True,
+        help="Checkpoint the WAL, refresh planner statistics and vacuum free pages in the background",
+    )
+    parser.add_argument(
+        "--db-wal-checkpoint-mb",
+        type=int,
+        default=64,
+        help="WAL size in MiB above which it is checkpointed and truncated",
+    )
+    parser.add_argument(
+        "--db-optimize-interval",
+        type=float,
+        default=3600.0,
+        help="Min seconds between ANALYZE/optimize and incremental vacuum runs, done only while idle",
+    )
+    parser.add_argument(
+        "--db-maintenance-budget-ms",
+        type=float,
+        default=200.0,
+        help="Max milliseconds one maintenance task may hold the database writer",
+    )
+    parser.add_argument(
+        "--db-placeholder-max-age",
+        type=float,
+        default=0.0,
+        help="Delete fast-upload placeholder rows whose upload never completed after this many seconds (0 = keep)",
+    )
+    parser.add_argument(
+        "--db-placeholder-sweep-interval",
+        type=float,
+        default=600.0,
+        help="Seconds between placeholder sweeps",
+    )
+    parser.add_argument(
+        "--db-placeholder-sweep-batch",
+        type=int,
+        default=500,
+        help="Placeholder rows deleted per write transaction",
+    )
+    parser.add_argument(
+        "--db-backup-dir",
+        default="",
+        help="Write online snapshots of the database here on a schedule (empty = no scheduled backups)",
+    )
+    parser.add_argument("--db-backup-interval", type=float, default=86400.0, help="Seconds between scheduled snapshots")
+    parser.add_argument("--db-backup-keep", type=int, default=7, help="Snapshots kept per database file")
+    parser.add_argument("--db-backup-pages", type=int, default=256, help="Pages copied per backup step")
+    parser.add_argument("--db-backup-sleep-ms", type=float, default=50.0, help="Pause between backup steps")
+    parser.add_argument("--db-backup-compress", type=parse_bool, default=False, help="gzip scheduled snapshots")
     parser.add_argument("--log-level", default="info", help="Log level: debug/info/warning/error/critical")
     args = parser.parse_args()
     return AppConfig(
@@ -64,6 +302,13 @@ def parse_args():
             host=args.host,
             port=args.port,
             token=args.token,
+            engine=args.engine,
+            workers=args.workers,
+            backlog=args.backlog,
+            queue_depth=args.queue_depth,
+            processes=args.processes,
+            reuse_port=args.reuse_port,
+            keepalive_timeout=args.keepalive_timeout,
         ),
         storage=StorageConfig(
             endpoint=args.storage_endpoint,
@@ -76,12 +321,52 @@ def parse_args():
             public_endpoint=args.storage_public_endpoint,
             public_port=args.storage_public_port,
             trust_forwarded_headers=args.trust_forwarded_headers,
+            head_parallelism=args.storage_head_parallelism,
+            head_deadline=args.storage_head_deadline,
+            pool_size=args.storage_pool_size,
+            pool_idle_timeout=args.storage_pool_idle_timeout,
+            verify_freshness=args.storage_verify_freshness,
+            breaker_failures=args.storage_breaker_failures,
+            breaker_reset=args.storage_breaker_reset,
+            breaker_probes=args.storage_breaker_probes,
+            layout_learn_after=args.storage_layout_learn_after,
+            hedge_percentile=args.storage_hedge_percentile,
+            hedge_budget=args.storage_hedge_budget,
+            events_token=args.storage_events_token,
+            event_index_ttl=args.storage_event_index_ttl,
         ),
         sts=STSConfig(
             role_arn=args.storage_sts_role_arn,
             policy=args.storage_sts_policy,
             duration=args.storage_sts_duration,
+            cache=args.storage_sts_cache,
+            refresh_threshold=args.storage_sts_refresh_threshold,
         ),
         db_path=args.db_path,
         log_level=args.log_level,
+        db=DatabaseConfig(
+            write_behind=args.db_write_behind,
+            write_behind_batch=args.db_write_behind_batch,
+            write_behind_delay_ms=args.db_write_behind_delay_ms,
+            write_behind_capacity=args.db_write_behind_capacity,
+            bloom_filter=args.db_bloom_filter,
+            bloom_fp_rate=args.db_bloom_fp_rate,
+            readers=args.db_readers,
+            checkout_timeout=args.db_checkout_timeout,
+            mmap_size=args.db_mmap_size,
+            shards=args.db_shards,
+            maintenance=args.db_maintenance,
+            wal_checkpoint_mb=args.db_wal_checkpoint_mb,
+            optimize_interval=args.db_optimize_interval,
+            maintenance_budget_ms=args.db_maintenance_budget_ms,
+            placeholder_max_age=args.db_placeholder_max_age,
+            placeholder_sweep_interval=args.db_placeholder_sweep_interval,
+            placeholder_sweep_batch=args.db_placeholder_sweep_batch,
+            backup_dir=args.db_backup_dir,
+            backup_interval=args.db_backup_interval,
+            backup_keep=args.db_backup_keep,
+            backup_pages=args.db_backup_pages,
+            backup_sleep_ms=args.db_backup_sleep_ms,
+            backup_compress=args.db_backup_compress,
+        ),
     )
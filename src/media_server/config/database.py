@@ -0,0 +1,28 @@
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class DatabaseConfig:
+    write_behind: bool = False
+    write_behind_batch: int = 256
+    write_behind_delay_ms: float = 5.0
+    write_behind_capacity: int = 10000
+    bloom_filter: bool = False
+    bloom_fp_rate: float = 0.01
+    readers: int = 0
+    checkout_timeout: float = 5.0
+    mmap_size: int = 256 * 1024 * 1024
+    shards: int = 0
+    maintenance: bool = True
+    wal_checkpoint_mb: int = 64
+    optimize_interval: float = 3600.0
+    maintenance_budget_ms: float = 200.0
+    placeholder_max_age: float = 0.0
+    placeholder_sweep_interval: float = 600.0
+    placeholder_sweep_batch: int = 500
+    backup_dir: str = ""
+    backup_interval: float = 86400.0
+    backup_keep: int = 7
+    backup_pages: int = 256
+    backup_sleep_ms: float = 50.0
+    backup_compress: bool = False
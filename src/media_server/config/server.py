@@ -6,3 +6,10 @@ class ServerConfig:
     host: str
     port: int
     token: str
+    engine: str = "threaded"
+    workers: int = 0
+    backlog: int = 128
+    queue_depth: int = 64
+    processes: int = 1
+    reuse_port: bool = False
+    keepalive_timeout: int = 15
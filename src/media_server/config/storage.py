@@ -13,3 +13,16 @@ class StorageConfig:
     public_endpoint: str = ""
     public_port: int = 9000
     trust_forwarded_headers: bool = False
+    head_parallelism: int = 8
+    head_deadline: float = 10.0
+    pool_size: int = 8
+    pool_idle_timeout: float = 60.0
+    verify_freshness: float = 300.0
+    breaker_failures: int = 5
+    breaker_reset: float = 10.0
+    breaker_probes: int = 1
+    layout_learn_after: int = 3
+    hedge_percentile: float = 0.0
+    hedge_budget: float = 0.05
+    events_token: str = ""
+    event_index_ttl: float = 3600.0
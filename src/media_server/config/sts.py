@@ -6,3 +6,5 @@ class STSConfig:
     role_arn: str
     policy: str
     duration: int
+    cache: bool = True
+    refresh_threshold: int = 300
@@ -6,58 +6,45 @@ from urllib.parse import urlparse
 
 from .handlers import (
     handle_fast_upload,
+    handle_health,
+    handle_metrics,
+    handle_storage_events,
     handle_sts,
     handle_tiny_fingerprints,
     handle_upload_callback,
 )
-from .http_layer.error_codes import ERR_INVALID_TOKEN, ERR_MISSING_TOKEN, ERR_NOT_FOUND
-from .utils.http import error_response, ok_response
-from .http_layer.router import resolve_route
+from .http_layer.connection_stats import CONNECTION_STATS
+from .http_layer.error_codes import ERR_DB_BUSY, ERR_INVALID_TOKEN, ERR_MISSING_TOKEN, ERR_NOT_FOUND
+from .utils.http import error_response
+from .http_layer.router import Router
+from .storage.db_pool import PoolTimeout
 
+# Compiled once at import; POST handlers take (handler, **path params).
+ROUTER = Router(
+    handlers={
+        "fast-upload": handle_fast_upload,
+        "tiny-fingerprints": handle_tiny_fingerprints,
+        "upload-callback": handle_upload_callback,
+        "sts": handle_sts,
+        "storage-events": handle_storage_events,
+        "health": handle_health,
+        "metrics": handle_metrics,
+    }
+)
 
-class MediaRequestHandler(BaseHTTPRequestHandler):
-    server_version = "FCMediaServer/0.1"
-    config = None
-    db = None
 
-    def log_message(self, fmt, *args):
-        logging.getLogger("access").debug("%s - %s", self.address_string(), fmt % args)
+class MediaRequestMixin:
+    """Request helpers shared by the threaded handler and the asyncio engine's request view."""
 
-    def do_GET(self):
-        parsed = urlparse(self.path)
-        if parsed.path == "/health":
-            ok_response(self, {}, message="ok", status=HTTPStatus.OK)
-            return
-        error_response(self, ERR_NOT_FOUND)
-
-    def do_OPTIONS(self):
-        self.send_response(HTTPStatus.NO_CONTENT)
-        self.send_header("Access-Control-Allow-Origin", "*")
-        self.send_header("Access-Control-Allow-Methods", "GET, POST, OPTIONS")
-        self.send_header("Access-Control-Allow-Headers", "Content-Type, x-auth-token")
-        self.end_headers()
-
-    def do_POST(self):
-        parsed = urlparse(self.path)
-        route_name, workspace_id = resolve_route("POST", parsed.path)
-        if not route_name or not workspace_id:
-            error_response(self, ERR_NOT_FOUND)
-            return
-        handlers = {
-            "fast-upload": handle_fast_upload,
-            "tiny-fingerprints": handle_tiny_fingerprints,
-            "upload-callback": handle_upload_callback,
-            "sts": handle_sts,
-        }
-        handler = handlers.get(route_name)
-        if not handler:
-            error_response(self, ERR_NOT_FOUND)
-            return
-        handler(self, workspace_id)
+    config = None
+    db = None
+    db_writer = None
+    body_consumed = False
 
     def read_json(self):
         content_length = int(self.headers.get("Content-Length", "0"))
         raw = self.rfile.read(content_length) if content_length > 0 else b""
+        self.body_consumed = True
         if not raw:
             return {}
         payload = json.loads(raw.decode("utf-8"))
@@ -81,3 +68,99 @@ class MediaRequestHandler(BaseHTTPRequestHandler):
             error_response(self, ERR_INVALID_TOKEN)
             return None
         return token
+
+    def do_GET(self):
+        # GET routes are cheap and do no I/O, so both engines serve them synchronously.
+        handler, params = ROUTER.resolve("GET", urlparse(self.path).path)
+        if handler is None:
+            error_response(self, ERR_NOT_FOUND)
+            return
+        handler(self, **params)
+
+    def do_OPTIONS(self):
+        self.send_response(HTTPStatus.NO_CONTENT)
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.send_header("Access-Control-Allow-Methods", "GET, POST, OPTIONS")
+        self.send_header("Access-Control-Allow-Headers", "Content-Type, x-auth-token")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+
+# Unread request bodies up to this size are drained to keep the connection
+# reusable; anything larger closes the connection instead.
+MAX_DRAIN_BYTES = 1 << 20
+
+
+class MediaRequestHandler(MediaRequestMixin, BaseHTTPRequestHandler):
+    server_version = "FCMediaServer/0.1"
+    # Switched to HTTP/1.1 with an idle ``timeout`` by app.build_server when
+    # requests are served concurrently; see configure_keep_alive.
+    protocol_version = "HTTP/1.0"
+    timeout = None
+    idle_timeout = None
+
+    @classmethod
+    def configure_keep_alive(cls, idle_timeout):
+        if idle_timeout and idle_timeout > 0:
+            cls.protocol_version = "HTTP/1.1"
+            cls.timeout = idle_timeout
+            cls.idle_timeout = idle_timeout
+        else:
+            cls.protocol_version = "HTTP/1.0"
+            cls.timeout = None
+            cls.idle_timeout = None
+
+    def log_message(self, fmt, *args):
+        logging.getLogger("access").debug("%s - %s", self.address_string(), fmt % args)
+
+    def handle(self):
+        self.requests_served = 0
+        try:
+            super().handle()
+        finally:
+            CONNECTION_STATS.record(self.requests_served)
+
+    def handle_one_request(self):
+        wait_for_request = getattr(self.server, "wait_for_request", None)
+        if self.requests_served and wait_for_request is not None:
+            if not wait_for_request(self.connection, self.rfile, self.idle_timeout):
+                self.close_connection = True
+                return
+        super().handle_one_request()
+
+    def parse_request(self):
+        self.body_consumed = False
+        parsed = super().parse_request()
+        if parsed:
+            self.requests_served += 1
+        return parsed
+
+    def _discard_unread_body(self):
+        if self.body_consumed or self.close_connection:
+            return
+        try:
+            remaining = int(self.headers.get("Content-Length", "0"))
+        except ValueError:
+            self.close_connection = True
+            return
+        if remaining > MAX_DRAIN_BYTES:
+            self.close_connection = True
+            return
+        if remaining > 0:
+            self.rfile.read(remaining)
+        self.body_consumed = True
+
+    def do_POST(self):
+        parsed = urlparse(self.path)
+        handler, params = ROUTER.resolve("POST", parsed.path)
+        if handler is None:
+            error_response(self, ERR_NOT_FOUND)
+            self._discard_unread_body()
+            return
+        try:
+            handler(self, **params)
+        except PoolTimeout as exc:
+            logging.warning("database pool exhausted on %s: %s", parsed.path, exc)
+            error_response(self, ERR_DB_BUSY)
+        finally:
+            self._discard_unread_body()
@@ -1,11 +1,21 @@
-from .fast_upload import handle_fast_upload
-from .sts import handle_sts
-from .tiny_fingerprints import handle_tiny_fingerprints
-from .upload_callback import handle_upload_callback
+from .fast_upload import handle_fast_upload, handle_fast_upload_async
+from .status import handle_health, handle_metrics
+from .storage_events import handle_storage_events, handle_storage_events_async
+from .sts import handle_sts, handle_sts_async
+from .tiny_fingerprints import handle_tiny_fingerprints, handle_tiny_fingerprints_async
+from .upload_callback import handle_upload_callback, handle_upload_callback_async
 
 __all__ = [
     "handle_fast_upload",
     "handle_tiny_fingerprints",
     "handle_upload_callback",
     "handle_sts",
+    "handle_fast_upload_async",
+    "handle_tiny_fingerprints_async",
+    "handle_upload_callback_async",
+    "handle_sts_async",
+    "handle_storage_events",
+    "handle_storage_events_async",
+    "handle_health",
+    "handle_metrics",
 ]
@@ -1,7 +1,9 @@
 import json
+import time
 from typing import Callable, Optional, Tuple, TypeVar
 
 from ..http_layer.error_codes import ERR_INVALID_JSON
+from ..storage.object_index import IndexedStorage, ObjectIndex
 from ..utils.http import error_response
 
 T = TypeVar("T")
@@ -21,3 +23,19 @@ def parse_request(handler, payload: dict, parser: Callable[[dict], Tuple[Optiona
         error_response(handler, error)
         return None
     return req
+
+
+def is_fresh(verified_at, window) -> bool:
+    """True when a HEAD confirmed the object less than ``window`` seconds ago (0 disables)."""
+    if not verified_at or not window or window <= 0:
+        return False
+    return time.time() - verified_at < window
+
+
+def object_checker(handler, client, consult=True):
+    """``client`` for HEADs, fronted by the bucket-notification object index when one is configured."""
+    index = ObjectIndex.for_config(handler.db, handler.config.storage)
+    if index is None:
+        return client
+    # The asyncio engine's request carries the executor its index reads and writes run on.
+    return IndexedStorage(client, index, consult=consult, executor=getattr(handler, "db_executor", None))
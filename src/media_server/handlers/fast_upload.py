@@ -3,25 +3,27 @@ from http import HTTPStatus
 
 from ..utils.http import ok_response
 from ..http_layer.request_models import parse_fast_upload
-from ..storage.s3_client import S3Client
-from .common import parse_request, read_payload
+from ..storage.s3_client import S3Client, stat_fields
+from .common import is_fresh, object_checker, parse_request, read_payload
 
 
-def handle_fast_upload(handler, workspace_id):
+def _begin_fast_upload(handler, workspace_id):
     token = handler.require_token()
     if not token:
-        return
+        return None
 
     payload = read_payload(handler)
     if payload is None:
-        return
+        return None
 
     req = parse_request(handler, payload, parse_fast_upload)
     if not req:
-        return
+        return None
 
     if req.tiny_fingerprint:
-        handler.db.upsert_fingerprint_tiny(
+        # With write-behind the row is committed by the writer thread a few ms later.
+        writer = getattr(handler, "db_writer", None) or handler.db
+        writer.upsert_fingerprint_tiny(
             workspace_id,
             req.fingerprint,
             req.tiny_fingerprint,
@@ -43,15 +45,55 @@ def handle_fast_upload(handler, workspace_id):
     )
     logging.debug("fast-upload fingerprints: fingerprint=%s tiny=%s", req.fingerprint, req.tiny_fingerprint)
 
-    stored_key = handler.db.get_object_key_by_fingerprint(workspace_id, req.fingerprint)
+    stored = handler.db.get_object_by_fingerprint(workspace_id, req.fingerprint)
+    if not stored:
+        return req, None, False
+    stored_key, verified_at = stored
+    return req, stored_key, is_fresh(verified_at, handler.config.storage.verify_freshness)
+
+
+def _finish_fast_upload(handler, workspace_id, req, stored_key, exists, checked):
     if stored_key:
-        try:
-            exists = S3Client(handler.config.storage).head_object(stored_key)
-        except RuntimeError as exc:
-            logging.error("fast-upload head check failed: %s", exc)
-            exists = False
         if exists:
+            if checked:
+                etag, size = stat_fields(exists)
+                handler.db.mark_verified(workspace_id, req.fingerprint, etag=etag, size=size)
             ok_response(handler, {"object_key": stored_key}, status=HTTPStatus.OK)
             return
-        handler.db.delete_by_fingerprint(workspace_id, req.fingerprint)
+        # None: storage could not be asked. Keep the row; the next request checks again.
+        if exists is not None:
+            handler.db.delete_by_fingerprint(workspace_id, req.fingerprint)
     ok_response(handler, "", message=f"{req.fingerprint} don't exist.", code=-1, status=HTTPStatus.OK)
+
+
+def handle_fast_upload(handler, workspace_id):
+    prepared = _begin_fast_upload(handler, workspace_id)
+    if not prepared:
+        return
+    req, stored_key, fresh = prepared
+
+    exists = fresh
+    if stored_key and not fresh:
+        try:
+            exists = object_checker(handler, S3Client.shared(handler.config.storage)).head_object(stored_key)
+        except RuntimeError as exc:
+            logging.error("fast-upload head check failed: %s", exc)
+            exists = None
+    _finish_fast_upload(handler, workspace_id, req, stored_key, exists, checked=not fresh)
+
+
+async def handle_fast_upload_async(handler, workspace_id):
+    # SQLite calls block: the begin/finish halves run on the server's DB threads.
+    prepared = await handler.run_db(_begin_fast_upload, handler, workspace_id)
+    if not prepared:
+        return
+    req, stored_key, fresh = prepared
+
+    exists = fresh
+    if stored_key and not fresh:
+        try:
+            exists = await object_checker(handler, S3Client.shared(handler.config.storage)).head_object_async(stored_key)
+        except RuntimeError as exc:
+            logging.error("fast-upload head check failed: %s", exc)
+            exists = None
+    await handler.run_db(_finish_fast_upload, handler, workspace_id, req, stored_key, exists, not fresh)
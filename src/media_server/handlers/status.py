@@ -0,0 +1,14 @@
+from http import HTTPStatus
+
+from ..utils import metrics
+from ..utils.http import ok_response
+
+
+def handle_health(handler):
+    ok_response(handler, {}, message="ok", status=HTTPStatus.OK)
+
+
+def handle_metrics(handler):
+    if handler.require_token() is None:
+        return
+    ok_response(handler, metrics.snapshot(), status=HTTPStatus.OK)
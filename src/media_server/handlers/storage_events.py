@@ -0,0 +1,47 @@
+import hmac
+import logging
+from http import HTTPStatus
+
+from ..http_layer.error_codes import ERR_INVALID_AUTHORIZATION, ERR_MISSING_AUTHORIZATION, ERR_NOT_FOUND
+from ..storage.object_index import ObjectIndex, parse_events
+from ..utils.http import error_response, ok_response
+from .common import read_payload
+
+
+def _authorized(handler):
+    expected = handler.config.storage.events_token
+    if not expected:
+        # Not configured: the endpoint does not exist.
+        error_response(handler, ERR_NOT_FOUND)
+        return False
+    # MinIO sends its webhook auth_token as the Authorization header, with or without "Bearer ".
+    supplied = (handler.headers.get("Authorization") or "").strip()
+    if supplied[:7].lower() == "bearer ":
+        supplied = supplied[7:].strip()
+    if not supplied:
+        error_response(handler, ERR_MISSING_AUTHORIZATION)
+        return False
+    if not hmac.compare_digest(supplied.encode("utf-8"), expected.encode("utf-8")):
+        error_response(handler, ERR_INVALID_AUTHORIZATION)
+        return False
+    return True
+
+
+def handle_storage_events(handler):
+    """MinIO bucket notification webhook; updates the object index and answers 200 so MinIO moves on."""
+    if not _authorized(handler):
+        return
+    payload = read_payload(handler)
+    if payload is None:
+        return
+    storage = handler.config.storage
+    events = parse_events(payload, storage.bucket)
+    index = ObjectIndex.for_config(handler.db, storage)
+    counts = index.apply(events) if index is not None else {"received": len(events), "applied": 0}
+    logging.debug("storage-events %s", counts)
+    ok_response(handler, counts, status=HTTPStatus.OK)
+
+
+async def handle_storage_events_async(handler):
+    # Only SQLite work: all of it runs on the server's DB threads.
+    await handler.run_db(handle_storage_events, handler)
@@ -4,7 +4,7 @@ from http import HTTPStatus
 from urllib.parse import urlparse
 
 from ..http_layer.error_codes import ERR_STS_FAILED
-from ..storage.sts import fetch_minio_sts
+from ..storage.sts_cache import STSCredentialCache
 from ..utils.http import error_response, json_response
 
 
@@ -153,10 +153,10 @@ def _resolve_public_endpoint(handler):
     return storage.endpoint
 
 
-def handle_sts(handler, workspace_id):
+def _begin_sts(handler):
     token = handler.require_token()
     if not token:
-        return
+        return None
 
     public_endpoint = _resolve_public_endpoint(handler)
     logging.debug(
@@ -169,17 +169,11 @@ def handle_sts(handler, workspace_id):
         handler.config.sts.duration,
         len(handler.config.sts.policy or ""),
     )
-    try:
-        security_token, access_key, secret_key, expire_seconds = fetch_minio_sts(
-            handler.config.storage,
-            handler.config.sts,
-            workspace_id,
-        )
-    except RuntimeError as exc:
-        logging.error("sts error=%s", exc)
-        error_response(handler, ERR_STS_FAILED)
-        return
+    return token, public_endpoint
+
 
+def _finish_sts(handler, workspace_id, token, public_endpoint, credentials):
+    security_token, access_key, secret_key, expire_seconds = credentials
     logging.debug(
         "sts issued access_key_id=%s token_len=%s expire_seconds=%s",
         access_key,
@@ -230,3 +224,33 @@ def handle_sts(handler, workspace_id):
         token,
     )
     json_response(handler, HTTPStatus.OK, payload)
+
+
+def handle_sts(handler, workspace_id):
+    prepared = _begin_sts(handler)
+    if not prepared:
+        return
+    token, public_endpoint = prepared
+
+    try:
+        credentials = STSCredentialCache.shared(handler.config.storage, handler.config.sts).get(workspace_id)
+    except RuntimeError as exc:
+        logging.error("sts error=%s", exc)
+        error_response(handler, ERR_STS_FAILED)
+        return
+    _finish_sts(handler, workspace_id, token, public_endpoint, credentials)
+
+
+async def handle_sts_async(handler, workspace_id):
+    prepared = _begin_sts(handler)
+    if not prepared:
+        return
+    token, public_endpoint = prepared
+
+    try:
+        credentials = await STSCredentialCache.shared(handler.config.storage, handler.config.sts).get_async(workspace_id)
+    except RuntimeError as exc:
+        logging.error("sts error=%s", exc)
+        error_response(handler, ERR_STS_FAILED)
+        return
+    _finish_sts(handler, workspace_id, token, public_endpoint, credentials)
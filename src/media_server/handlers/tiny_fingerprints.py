@@ -3,45 +3,107 @@ from http import HTTPStatus
 
 from ..utils.http import ok_response
 from ..http_layer.request_models import parse_tiny_fingerprints
-from ..storage.s3_client import S3Client
-from .common import parse_request, read_payload
+from ..storage.s3_client import S3Client, stat_fields
+from .common import is_fresh, object_checker, parse_request, read_payload
 
 
-def handle_tiny_fingerprints(handler, workspace_id):
+def _begin_tiny_fingerprints(handler, workspace_id):
     token = handler.require_token()
     if not token:
-        return
+        return None
 
     payload = read_payload(handler)
     if payload is None:
-        return
+        return None
 
     req = parse_request(handler, payload, parse_tiny_fingerprints)
     if not req:
-        return
+        return None
+
+    objects = handler.db.get_objects_by_tiny(workspace_id, req.tiny_fingerprints)
+    candidates = [
+        (fp, objects[fp][0]) for fp in req.tiny_fingerprints if isinstance(fp, str) and fp in objects
+    ]
+    window = handler.config.storage.verify_freshness
+    # A key is only trusted without a HEAD when every row pointing at it is fresh.
+    stale_keys = {object_key for object_key, verified_at in objects.values() if not is_fresh(verified_at, window)}
+    fresh_keys = {object_key for _, object_key in candidates} - stale_keys
+    return token, req, candidates, fresh_keys
+
 
+def _to_check(candidates, fresh_keys):
+    return [object_key for _, object_key in candidates if object_key not in fresh_keys]
+
+
+def _finish_tiny_fingerprints(handler, workspace_id, token, req, candidates, fresh_keys, results):
+    # Runs after the whole fan-out, so every delete sees the final verdicts.
     found = []
-    s3_client = S3Client(handler.config.storage)
-    for fp in req.tiny_fingerprints:
-        object_key = handler.db.get_object_key_by_tiny(workspace_id, fp)
-        if not object_key:
+    stale = []
+    verified = {}
+    unknown = 0
+    for fp, object_key in candidates:
+        if object_key in fresh_keys:
+            found.append(fp)
+            continue
+        exists = results.get(object_key)
+        if exists is None:
+            unknown += 1
             continue
-        try:
-            exists = s3_client.head_object(object_key)
-        except RuntimeError as exc:
-            logging.error("tiny-fingerprints head check failed: %s", exc)
-            exists = False
         if exists:
             found.append(fp)
+            verified[fp] = stat_fields(exists)
             continue
-        handler.db.delete_by_tiny(workspace_id, fp)
+        stale.append(fp)
+    if stale:
+        handler.db.delete_by_tiny_many(workspace_id, stale)
+    if verified:
+        handler.db.mark_verified_by_tiny_many(workspace_id, verified)
+    if unknown:
+        logging.warning(
+            "tiny-fingerprints workspace_id=%s head deadline expired, %s unverified",
+            workspace_id,
+            unknown,
+        )
 
     logging.debug(
-        "tiny-fingerprints workspace_id=%s requested=%s found=%s token=%s",
+        "tiny-fingerprints workspace_id=%s requested=%s found=%s fresh=%s token=%s",
         workspace_id,
         len(req.tiny_fingerprints),
         len(found),
+        len(fresh_keys),
         token,
     )
 
     ok_response(handler, {"tiny_fingerprints": found}, status=HTTPStatus.OK)
+
+
+def handle_tiny_fingerprints(handler, workspace_id):
+    prepared = _begin_tiny_fingerprints(handler, workspace_id)
+    if not prepared:
+        return
+    token, req, candidates, fresh_keys = prepared
+
+    storage = handler.config.storage
+    results = object_checker(handler, S3Client.shared(storage)).head_objects(
+        _to_check(candidates, fresh_keys),
+        parallelism=storage.head_parallelism,
+        deadline=storage.head_deadline,
+    )
+    _finish_tiny_fingerprints(handler, workspace_id, token, req, candidates, fresh_keys, results)
+
+
+async def handle_tiny_fingerprints_async(handler, workspace_id):
+    prepared = await handler.run_db(_begin_tiny_fingerprints, handler, workspace_id)
+    if not prepared:
+        return
+    token, req, candidates, fresh_keys = prepared
+
+    storage = handler.config.storage
+    results = await object_checker(handler, S3Client.shared(storage)).head_objects_async(
+        _to_check(candidates, fresh_keys),
+        parallelism=storage.head_parallelism,
+        deadline=storage.head_deadline,
+    )
+    await handler.run_db(
+        _finish_tiny_fingerprints, handler, workspace_id, token, req, candidates, fresh_keys, results
+    )
@@ -1,40 +1,39 @@
 import logging
+import time
 from http import HTTPStatus
 
-from ..http_layer.error_codes import ERR_OBJECT_CHECK_FAILED, ERR_OBJECT_NOT_FOUND
+from ..http_layer.error_codes import ERR_OBJECT_CHECK_FAILED, ERR_OBJECT_NOT_FOUND, ERR_STORAGE_UNAVAILABLE
 from ..utils.http import error_response, ok_response
 from ..http_layer.request_models import parse_upload_callback
-from ..storage.s3_client import S3Client
-from .common import parse_request, read_payload
+from ..storage.circuit_breaker import CircuitOpenError
+from ..storage.s3_client import S3Client, stat_fields
+from .common import object_checker, parse_request, read_payload
 
 
-def handle_upload_callback(handler, workspace_id):
+def _begin_upload_callback(handler):
     token = handler.require_token()
     if not token:
-        return
+        return None
 
     payload = read_payload(handler)
     if payload is None:
-        return
+        return None
 
     req = parse_request(handler, payload, parse_upload_callback)
     if not req:
-        return
+        return None
+    return token, req
 
-    try:
-        object_exists = S3Client(handler.config.storage).head_object(req.object_key)
-    except RuntimeError as exc:
-        logging.error("upload-callback head check failed: %s", exc)
-        error_response(handler, ERR_OBJECT_CHECK_FAILED)
-        return
 
+def _finish_upload_callback(handler, workspace_id, token, req, object_exists):
     if not object_exists:
         logging.warning("upload-callback object missing: %s", req.object_key)
         error_response(handler, ERR_OBJECT_NOT_FOUND)
         return
 
+    etag, size = stat_fields(object_exists)
     tiny_fingerprint = req.tiny_fingerprint
-    with handler.db.transaction() as conn:
+    with handler.db.shard_for(workspace_id).transaction() as conn:
         if not tiny_fingerprint and req.fingerprint:
             tiny_fingerprint = handler.db.get_tiny_by_fingerprint(workspace_id, req.fingerprint, conn=conn)
         if req.fingerprint:
@@ -48,6 +47,9 @@ def handle_upload_callback(handler, workspace_id):
                 is_original=req.is_original,
                 sub_file_type=req.sub_file_type,
                 metadata=req.metadata,
+                verified_at=time.time(),
+                etag=etag,
+                size=size,
                 conn=conn,
             )
 
@@ -61,3 +63,40 @@ def handle_upload_callback(handler, workspace_id):
     logging.debug("upload-callback fingerprints: fingerprint=%s tiny=%s", req.fingerprint, tiny_fingerprint)
 
     ok_response(handler, req.object_key, status=HTTPStatus.OK)
+
+
+def _check_failed(handler, exc):
+    logging.error("upload-callback head check failed: %s", exc)
+    # An open circuit fails fast with 503 so the client retries later instead of giving up.
+    error_response(handler, ERR_STORAGE_UNAVAILABLE if isinstance(exc, CircuitOpenError) else ERR_OBJECT_CHECK_FAILED)
+
+
+def handle_upload_callback(handler, workspace_id):
+    prepared = _begin_upload_callback(handler)
+    if not prepared:
+        return
+    token, req = prepared
+
+    # The object was just written: HEAD it even if the index disagrees, and record the answer.
+    checker = object_checker(handler, S3Client.shared(handler.config.storage), consult=False)
+    try:
+        object_exists = checker.head_object(req.object_key)
+    except RuntimeError as exc:
+        _check_failed(handler, exc)
+        return
+    _finish_upload_callback(handler, workspace_id, token, req, object_exists)
+
+
+async def handle_upload_callback_async(handler, workspace_id):
+    prepared = _begin_upload_callback(handler)
+    if not prepared:
+        return
+    token, req = prepared
+
+    checker = object_checker(handler, S3Client.shared(handler.config.storage), consult=False)
+    try:
+        object_exists = await checker.head_object_async(req.object_key)
+    except RuntimeError as exc:
+        _check_failed(handler, exc)
+        return
+    await handler.run_db(_finish_upload_callback, handler, workspace_id, token, req, object_exists)
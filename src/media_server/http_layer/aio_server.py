@@ -0,0 +1,270 @@
+import asyncio
+import logging
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate
+from http import HTTPStatus
+from http.client import parse_headers
+from io import BytesIO
+from urllib.parse import urlparse
+
+from ..handler import MediaRequestMixin
+from ..handlers import (
+    handle_fast_upload_async,
+    handle_storage_events_async,
+    handle_sts_async,
+    handle_tiny_fingerprints_async,
+    handle_upload_callback_async,
+)
+from ..storage.db_pool import PoolTimeout
+from ..utils.http import error_response
+from .connection_stats import CONNECTION_STATS
+from .error_codes import ERR_DB_BUSY, ERR_NOT_FOUND
+from .router import Router
+
+ASYNC_ROUTER = Router(
+    handlers={
+        "fast-upload": handle_fast_upload_async,
+        "tiny-fingerprints": handle_tiny_fingerprints_async,
+        "upload-callback": handle_upload_callback_async,
+        "sts": handle_sts_async,
+        "storage-events": handle_storage_events_async,
+    }
+)
+
+DEFAULT_IDLE_TIMEOUT = 30
+# Threads that run SQLite calls for the loop; app.build_server passes the reader pool size.
+DEFAULT_DB_THREADS = 4
+
+
+class AsyncRequest(MediaRequestMixin):
+    """Handler-shaped view of one parsed request.
+
+    Exposes the attributes ``handlers/`` and ``utils.http`` rely on (headers,
+    rfile/wfile, send_response/send_header/end_headers) so the route logic is
+    shared with the threaded engine; the response is buffered and written by
+    the connection loop.
+    """
+
+    server_version = "FCMediaServer/0.1"
+    protocol_version = "HTTP/1.1"
+
+    def __init__(
+        self,
+        command,
+        path,
+        request_version,
+        headers,
+        body,
+        client_address,
+        config,
+        db,
+        keep_alive,
+        idle_timeout=None,
+        db_writer=None,
+        db_executor=None,
+    ):
+        self.command = command
+        self.path = path
+        self.request_version = request_version
+        self.headers = headers
+        self.client_address = client_address
+        self.config = config
+        self.db = db
+        self.db_writer = db_writer
+        self.db_executor = db_executor
+        self.rfile = BytesIO(body)
+        self.wfile = BytesIO()
+        self.close_connection = not keep_alive
+        self.idle_timeout = idle_timeout if keep_alive else None
+        self.status = None
+        self._header_lines = []
+
+    def address_string(self):
+        return self.client_address[0] if self.client_address else "-"
+
+    async def run_db(self, func, *args):
+        """Run blocking SQLite work (and the response it writes) on the DB threads, off the event loop."""
+        return await asyncio.get_running_loop().run_in_executor(self.db_executor, func, *args)
+
+    def send_response(self, code, message=None):
+        code = int(code)
+        if message is None:
+            try:
+                message = HTTPStatus(code).phrase
+            except ValueError:
+                message = ""
+        self.status = code
+        self._header_lines.append(f"{self.protocol_version} {code} {message}\r\n")
+        self.send_header("Server", self.server_version)
+        self.send_header("Date", formatdate(usegmt=True))
+
+    def send_header(self, keyword, value):
+        if keyword.lower() == "connection" and str(value).lower() == "close":
+            self.close_connection = True
+        self._header_lines.append(f"{keyword}: {value}\r\n")
+
+    def end_headers(self):
+        if self.close_connection:
+            self._header_lines.append("Connection: close\r\n")
+        elif self.request_version == "HTTP/1.0":
+            self._header_lines.append("Connection: keep-alive\r\n")
+        self._header_lines.append("\r\n")
+        self.wfile.write("".join(self._header_lines).encode("latin-1"))
+        self._header_lines = []
+
+
+def _wants_keep_alive(request_version, headers):
+    connection = (headers.get("Connection") or "").strip().lower()
+    if request_version == "HTTP/1.1":
+        return connection != "close"
+    return connection == "keep-alive"
+
+
+class AsyncMediaServer:
+    """asyncio engine serving the router's routes with awaitable S3/STS I/O.
+
+    Mirrors the HTTPServer surface used by ``app.main`` (``server_address``,
+    ``serve_forever``, ``shutdown``, ``server_close``). Idle keep-alive
+    connections are parked coroutines, so they cost no thread. SQLite calls
+    block, so handlers hand them to ``db_threads`` worker threads.
+    """
+
+    def __init__(
+        self,
+        server_address,
+        config,
+        db,
+        backlog=128,
+        idle_timeout=DEFAULT_IDLE_TIMEOUT,
+        sock=None,
+        db_writer=None,
+        db_threads=DEFAULT_DB_THREADS,
+    ):
+        self.config = config
+        self.db = db
+        self.db_writer = db_writer
+        self.db_executor = ThreadPoolExecutor(max_workers=max(1, db_threads), thread_name_prefix="media-db")
+        # idle_timeout <= 0 disables keep-alive; requests still get the default read timeout.
+        self.keep_alive = bool(idle_timeout and idle_timeout > 0)
+        self.idle_timeout = idle_timeout if self.keep_alive else DEFAULT_IDLE_TIMEOUT
+        self.socket = sock or socket.create_server(server_address, backlog=max(1, backlog))
+        self.socket.setblocking(False)
+        self.server_address = self.socket.getsockname()[:2]
+        self._loop = None
+        self._stop = None
+        self._started = threading.Event()
+        self._finished = threading.Event()
+
+    def serve_forever(self):
+        self._finished.clear()
+        try:
+            asyncio.run(self._serve())
+        finally:
+            self._finished.set()
+
+    def shutdown(self):
+        self._started.wait()
+        self._loop.call_soon_threadsafe(self._stop.set)
+        self._finished.wait()
+
+    def server_close(self):
+        self.socket.close()
+        self.db_executor.shutdown(wait=False)
+
+    async def _serve(self):
+        self._loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+        server = await asyncio.start_server(self._handle_connection, sock=self.socket)
+        self._started.set()
+        async with server:
+            await self._stop.wait()
+
+    async def _read_request(self, reader, client_address):
+        head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), self.idle_timeout)
+        request_line, _, raw_headers = head.partition(b"\r\n")
+        parts = request_line.decode("latin-1").split()
+        if len(parts) != 3 or not parts[2].startswith("HTTP/"):
+            return None
+        command, path, request_version = parts
+        headers = parse_headers(BytesIO(raw_headers))
+        length = int(headers.get("Content-Length") or 0)
+        body = await asyncio.wait_for(reader.readexactly(length), self.idle_timeout) if length > 0 else b""
+        return AsyncRequest(
+            command,
+            path,
+            request_version,
+            headers,
+            body,
+            client_address,
+            self.config,
+            self.db,
+            keep_alive=self.keep_alive and _wants_keep_alive(request_version, headers),
+            idle_timeout=self.idle_timeout,
+            db_writer=self.db_writer,
+            db_executor=self.db_executor,
+        )
+
+    async def _dispatch(self, request):
+        if request.command == "GET":
+            request.do_GET()
+            return
+        if request.command == "OPTIONS":
+            request.do_OPTIONS()
+            return
+        if request.command != "POST":
+            error_response(request, HTTPStatus.NOT_IMPLEMENTED, message_override="unsupported method")
+            return
+        handler, params = ASYNC_ROUTER.resolve("POST", urlparse(request.path).path)
+        if handler is None:
+            error_response(request, ERR_NOT_FOUND)
+            return
+        try:
+            await handler(request, **params)
+        except PoolTimeout as exc:
+            if request.status is not None:
+                raise
+            logging.warning("database pool exhausted on %s: %s", request.path, exc)
+            error_response(request, ERR_DB_BUSY)
+
+    async def _handle_connection(self, reader, writer):
+        client_address = writer.get_extra_info("peername")
+        requests_served = 0
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader, client_address)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+                    return
+                if request is None:
+                    writer.write(b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+                    await writer.drain()
+                    return
+                requests_served += 1
+                try:
+                    await self._dispatch(request)
+                except Exception:
+                    logging.exception("unhandled error %s %s", request.command, request.path)
+                    if request.status is None:
+                        request.close_connection = True
+                        error_response(request, HTTPStatus.INTERNAL_SERVER_ERROR, message_override="internal error")
+                    else:
+                        return
+                logging.getLogger("access").debug(
+                    '%s - "%s %s %s" %s',
+                    request.address_string(),
+                    request.command,
+                    request.path,
+                    request.request_version,
+                    request.status,
+                )
+                writer.write(request.wfile.getvalue())
+                await writer.drain()
+                if request.close_connection:
+                    return
+        except (ConnectionError, OSError):
+            return
+        finally:
+            CONNECTION_STATS.record(requests_served)
+            writer.close()
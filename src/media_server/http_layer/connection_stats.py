@@ -0,0 +1,47 @@
+import threading
+
+from ..utils import metrics
+
+# Upper bounds of the requests-per-connection histogram buckets.
+REQUESTS_PER_CONNECTION_BUCKETS = (1, 2, 5, 10, 50, 100, 500)
+
+
+class ConnectionStats:
+    """Counts requests per client connection to show how many handshakes keep-alive saves."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._connections = 0
+        self._requests = 0
+        self._max_requests = 0
+        self._buckets = [0] * (len(REQUESTS_PER_CONNECTION_BUCKETS) + 1)
+
+    def record(self, requests):
+        if requests <= 0:
+            return
+        index = len(REQUESTS_PER_CONNECTION_BUCKETS)
+        for position, bound in enumerate(REQUESTS_PER_CONNECTION_BUCKETS):
+            if requests <= bound:
+                index = position
+                break
+        with self._lock:
+            self._connections += 1
+            self._requests += requests
+            self._max_requests = max(self._max_requests, requests)
+            self._buckets[index] += 1
+
+    def snapshot(self):
+        with self._lock:
+            labels = [f"<={bound}" for bound in REQUESTS_PER_CONNECTION_BUCKETS]
+            labels.append(f">{REQUESTS_PER_CONNECTION_BUCKETS[-1]}")
+            return {
+                "connections": self._connections,
+                "requests": self._requests,
+                "reused_requests": self._requests - self._connections,
+                "max_requests_per_connection": self._max_requests,
+                "requests_per_connection": dict(zip(labels, self._buckets)),
+            }
+
+
+CONNECTION_STATS = ConnectionStats()
+metrics.register("connections", CONNECTION_STATS.snapshot)
@@ -0,0 +1,165 @@
+import json
+import logging
+import select
+import threading
+import time
+from http.server import HTTPServer
+from queue import Full, Queue
+
+from ..utils import metrics
+from .error_codes import ERR_SERVER_BUSY
+
+# How often a worker waiting on an idle keep-alive connection checks whether
+# new connections are queued behind it.
+IDLE_POLL_INTERVAL = 0.1
+
+
+def _busy_response():
+    body = json.dumps(
+        {"code": ERR_SERVER_BUSY.code, "message": ERR_SERVER_BUSY.message, "data": {}},
+        ensure_ascii=True,
+    ).encode("utf-8")
+    head = (
+        f"HTTP/1.1 {ERR_SERVER_BUSY.status} Service Unavailable\r\n"
+        "Content-Type: application/json; charset=utf-8\r\n"
+        "Access-Control-Allow-Origin: *\r\n"
+        "Retry-After: 1\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        "Connection: close\r\n"
+        "\r\n"
+    )
+    return head.encode("ascii") + body
+
+
+def _buffered(sock, rfile):
+    """Whether ``rfile`` already holds bytes of a pipelined request, without blocking."""
+    timeout = sock.gettimeout()
+    sock.settimeout(0)
+    try:
+        return bool(rfile.peek(1))
+    except OSError:
+        return False
+    finally:
+        sock.settimeout(timeout)
+
+
+class PooledHTTPServer(HTTPServer):
+    """HTTPServer that serves accepted connections on a fixed pool of worker threads.
+
+    The accept loop only enqueues sockets. When ``queue_depth`` connections are
+    already waiting for a worker, new ones are answered with 503 right away
+    instead of piling up behind a slow S3 HEAD or STS call.
+
+    A kept-alive connection holds its worker while it waits for the next
+    request, so at most ``workers - 1`` connections wait like that at once
+    (see wait_for_request) and one worker is always left for new connections.
+    """
+
+    def __init__(self, server_address, handler_class, workers, backlog=128, queue_depth=64, bind_and_activate=True):
+        self.request_queue_size = max(1, backlog)
+        self.workers = max(1, workers)
+        self._queue = Queue(maxsize=max(1, queue_depth))
+        self._stats_lock = threading.Lock()
+        self._accepted = 0
+        self._rejected = 0
+        self._active = 0
+        self._idle = 0
+        self._idle_closed = 0
+        self.max_idle = self.workers - 1
+        self._threads = []
+        super().__init__(server_address, handler_class, bind_and_activate)
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._worker_loop, name=f"media-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        metrics.register("server_pool", self.stats)
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "workers": self.workers,
+                "queue_depth": self._queue.maxsize,
+                "queued": self._queue.qsize(),
+                "active": self._active,
+                "accepted": self._accepted,
+                "rejected": self._rejected,
+                "idle_keepalive": self._idle,
+                "idle_closed": self._idle_closed,
+            }
+
+    def wait_for_request(self, sock, rfile, timeout):
+        """Wait on a kept-alive connection for its next request; False means close it instead.
+
+        Gives up at once when ``max_idle`` workers are already waiting, and as
+        soon as a new connection is queued for a worker.
+        """
+        with self._stats_lock:
+            if self._idle >= self.max_idle:
+                self._idle_closed += 1
+                return False
+            self._idle += 1
+        try:
+            if _buffered(sock, rfile):
+                return True
+            deadline = time.monotonic() + timeout if timeout else None
+            while True:
+                if not self._queue.empty():
+                    with self._stats_lock:
+                        self._idle_closed += 1
+                    return False
+                wait = IDLE_POLL_INTERVAL
+                if deadline is not None:
+                    wait = min(wait, deadline - time.monotonic())
+                    if wait <= 0:
+                        return False
+                # Readable also covers the client closing; the handler reads that as EOF.
+                if select.select([sock], [], [], wait)[0]:
+                    return True
+        finally:
+            with self._stats_lock:
+                self._idle -= 1
+
+    def process_request(self, request, client_address):
+        try:
+            self._queue.put_nowait((request, client_address))
+        except Full:
+            with self._stats_lock:
+                self._rejected += 1
+            logging.warning("worker queue full, rejecting %s", client_address[0] if client_address else "")
+            self._reject(request)
+            return
+        with self._stats_lock:
+            self._accepted += 1
+
+    def _reject(self, request):
+        try:
+            request.sendall(_busy_response())
+        except OSError:
+            pass
+        self.shutdown_request(request)
+
+    def _worker_loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            request, client_address = item
+            with self._stats_lock:
+                self._active += 1
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+                with self._stats_lock:
+                    self._active -= 1
+
+    def server_close(self):
+        super().server_close()
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
+        metrics.unregister("server_pool")
@@ -0,0 +1,134 @@
+import logging
+import os
+import signal
+import socket
+import time
+
+DRAIN_TIMEOUT = 30
+MAX_RESTART_DELAY = 30
+
+
+def _listen_socket(address, backlog, reuse_port):
+    if reuse_port and not hasattr(socket, "SO_REUSEPORT"):
+        raise RuntimeError("SO_REUSEPORT is not supported on this platform")
+    return socket.create_server(address, backlog=max(1, backlog), reuse_port=reuse_port)
+
+
+class PreforkSupervisor:
+    """Fork ``processes`` workers that accept on one port and keep them alive.
+
+    By default the supervisor binds the listening socket and the workers
+    inherit it. With ``reuse_port`` every worker binds its own SO_REUSEPORT
+    socket instead, so the kernel spreads connections across processes.
+    ``start_worker(sock)`` runs inside the child and returns its exit code;
+    it must stop serving and return on SIGTERM.
+    """
+
+    def __init__(self, address, processes, start_worker, backlog=128, reuse_port=False, drain_timeout=DRAIN_TIMEOUT):
+        self.address = address
+        self.processes = max(1, processes)
+        self.backlog = backlog
+        self.reuse_port = reuse_port
+        self.drain_timeout = drain_timeout
+        self._start_worker = start_worker
+        self._socket = None
+        self._children = {}
+        self._failures = {}
+        self._stopping = False
+
+    def run(self):
+        self._socket = _listen_socket(self.address, self.backlog, self.reuse_port)
+        self.address = self._socket.getsockname()[:2]
+        if self.reuse_port:
+            # Only used to validate the address and resolve port 0; an unaccepted
+            # SO_REUSEPORT socket would otherwise get its share of connections.
+            self._socket.close()
+            self._socket = None
+        previous = {
+            signum: signal.signal(signum, self._request_stop) for signum in (signal.SIGTERM, signal.SIGINT)
+        }
+        try:
+            for slot in range(self.processes):
+                self._spawn(slot)
+            logging.info("prefork supervisor pid=%s workers=%s address=%s:%s", os.getpid(), self.processes, *self.address)
+            self._supervise()
+        finally:
+            self._drain()
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
+            if self._socket is not None:
+                self._socket.close()
+        return 0
+
+    def _request_stop(self, signum, frame):
+        self._stopping = True
+
+    def _spawn(self, slot):
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                signal.signal(signal.SIGINT, signal.SIG_IGN)
+                sock = self._socket or _listen_socket(self.address, self.backlog, reuse_port=True)
+                code = self._start_worker(sock) or 0
+            except BaseException:
+                logging.exception("prefork worker slot=%s crashed", slot)
+            finally:
+                os._exit(code)
+        self._children[pid] = (slot, time.monotonic())
+        logging.info("prefork worker slot=%s pid=%s started", slot, pid)
+
+    def _supervise(self):
+        # Poll instead of blocking in waitpid: PEP 475 retries the syscall after
+        # the SIGTERM handler runs, so a blocking wait would never see the stop flag.
+        while not self._stopping:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                time.sleep(0.2)
+                continue
+            if pid not in self._children:
+                continue
+            slot, started_at = self._children.pop(pid)
+            if self._stopping:
+                break
+            code = os.waitstatus_to_exitcode(status)
+            lived = time.monotonic() - started_at
+            failures = self._failures.get(slot, 0) + 1 if lived < 1.0 else 0
+            self._failures[slot] = failures
+            delay = min(MAX_RESTART_DELAY, 2 ** failures - 1) if failures else 0
+            logging.warning("prefork worker slot=%s pid=%s exited code=%s, restarting in %ss", slot, pid, code, delay)
+            deadline = time.monotonic() + delay
+            while not self._stopping and time.monotonic() < deadline:
+                time.sleep(0.1)
+            if not self._stopping:
+                self._spawn(slot)
+
+    def _drain(self):
+        for pid in list(self._children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                self._children.pop(pid, None)
+        deadline = time.monotonic() + self.drain_timeout
+        while self._children and time.monotonic() < deadline:
+            try:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self._children.clear()
+                break
+            if pid == 0:
+                time.sleep(0.05)
+                continue
+            self._children.pop(pid, None)
+        for pid in list(self._children):
+            logging.warning("prefork worker pid=%s did not drain in %ss, killing", pid, self.drain_timeout)
+            try:
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+            except (ProcessLookupError, ChildProcessError):
+                pass
+        self._children.clear()
@@ -1,33 +1,124 @@
-import re
 from dataclasses import dataclass
-from typing import Optional, Tuple
+from typing import Callable, Dict, Iterable, Optional, Tuple
 
 
 @dataclass(frozen=True)
 class Route:
+    """``template`` is a path whose ``{name}`` segments match any one non-empty segment."""
+
     name: str
     method: str
-    pattern: re.Pattern
+    template: str
 
 
 ROUTES = (
-    Route("fast-upload", "POST", re.compile(r"^/media/api/v1/workspaces/(?P<workspace_id>[^/]+)/fast-upload$")),
-    Route(
-        "tiny-fingerprints",
-        "POST",
-        re.compile(r"^/media/api/v1/workspaces/(?P<workspace_id>[^/]+)/files/tiny-fingerprints$"),
-    ),
-    Route("upload-callback", "POST", re.compile(r"^/media/api/v1/workspaces/(?P<workspace_id>[^/]+)/upload-callback$")),
-    Route("sts", "POST", re.compile(r"^/storage/api/v1/workspaces/(?P<workspace_id>[^/]+)/sts$")),
+    Route("fast-upload", "POST", "/media/api/v1/workspaces/{workspace_id}/fast-upload"),
+    Route("tiny-fingerprints", "POST", "/media/api/v1/workspaces/{workspace_id}/files/tiny-fingerprints"),
+    Route("upload-callback", "POST", "/media/api/v1/workspaces/{workspace_id}/upload-callback"),
+    Route("sts", "POST", "/storage/api/v1/workspaces/{workspace_id}/sts"),
+    Route("storage-events", "POST", "/storage/api/v1/events"),
+    Route("health", "GET", "/health"),
+    Route("metrics", "GET", "/metrics"),
 )
 
 
+class _Node:
+    __slots__ = ("static", "param", "target")
+
+    def __init__(self):
+        self.static = {}
+        self.param = None
+        # (handler, param names) of the route ending here.
+        self.target = None
+
+
+def _segments(path):
+    return path[1:].split("/")
+
+
+class Router:
+    """Routes compiled into one path-segment trie per method.
+
+    Resolving costs a dict lookup per path segment whatever the number of
+    routes. Literal segments win over ``{param}`` ones at the same depth.
+    ``handlers`` maps route names to what ``resolve`` returns; routes
+    without one are left out, so the threaded and asyncio engines each
+    compile their own table from the same ROUTES.
+    """
+
+    def __init__(self, routes: Iterable[Route] = ROUTES, handlers: Optional[Dict[str, Callable]] = None):
+        self._roots = {}
+        # Set once a node has both literal and param children; only then can a walk need to backtrack.
+        self._backtracks = False
+        for route in routes:
+            handler = route.name if handlers is None else handlers.get(route.name)
+            if handler is not None:
+                self._add(route, handler)
+
+    def _add(self, route, handler):
+        if not route.template.startswith("/"):
+            raise ValueError(f"route {route.name} must start with '/': {route.template}")
+        node = self._roots.setdefault(route.method, _Node())
+        names = []
+        for segment in _segments(route.template):
+            if segment.startswith("{") and segment.endswith("}"):
+                names.append(segment[1:-1])
+                node.param = node.param or _Node()
+                child = node.param
+            else:
+                child = node.static.setdefault(segment, _Node())
+            self._backtracks = self._backtracks or bool(node.static and node.param is not None)
+            node = child
+        if node.target is not None:
+            raise ValueError(f"duplicate route {route.method} {route.template}")
+        node.target = (handler, tuple(names))
+
+    def resolve(self, method: str, path: str) -> Tuple[Optional[Callable], Dict[str, str]]:
+        """``(handler, path params)`` for ``method path``, or ``(None, {})`` when nothing matches."""
+        node = self._roots.get(method)
+        if node is None or not path.startswith("/"):
+            return None, {}
+        values = []
+        if self._backtracks:
+            target = _match(node, _segments(path), 0, values)
+        else:
+            for segment in _segments(path):
+                child = node.static.get(segment)
+                if child is None:
+                    child = node.param
+                    if child is None or not segment:
+                        return None, {}
+                    values.append(segment)
+                node = child
+            target = node.target
+        if target is None:
+            return None, {}
+        handler, names = target
+        return handler, dict(zip(names, values)) if names else {}
+
+
+def _match(node, segments, index, values):
+    if index == len(segments):
+        return node.target
+    segment = segments[index]
+    child = node.static.get(segment)
+    if child is not None:
+        target = _match(child, segments, index + 1, values)
+        if target is not None:
+            return target
+    if node.param is not None and segment:
+        values.append(segment)
+        target = _match(node.param, segments, index + 1, values)
+        if target is not None:
+            return target
+        values.pop()
+    return None
+
+
+_NAMES = Router()
+
+
 def resolve_route(method: str, path: str) -> Tuple[Optional[str], Optional[str]]:
-    for route in ROUTES:
-        if route.method != method:
-            continue
-        match = route.pattern.match(path)
-        if not match:
-            continue
-        return route.name, match.group("workspace_id")
-    return None, None
+    """``(route name, workspace_id)``; kept for callers that only need the name."""
+    name, params = _NAMES.resolve(method, path)
+    return name, params.get("workspace_id")
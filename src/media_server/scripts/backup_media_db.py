@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""Snapshot media.db (every shard with --db-shards) while the server keeps running."""
+import argparse
+import os
+import sys
+
+repo_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.insert(0, os.path.join(repo_root, "src"))
+
+from media_server.config.app import parse_bool
+from media_server.storage.backup import snapshot
+from media_server.storage.sharding import open_media_db
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--db-path", default="/opt/mediaserver/data/media.db", help="SQLite DB path")
+    parser.add_argument("--db-shards", type=int, default=0, help="Same value as the server's --db-shards")
+    parser.add_argument("--dest", default="/opt/mediaserver/data/backups", help="Directory for the snapshots")
+    parser.add_argument("--pages", type=int, default=256, help="Pages copied per backup step")
+    parser.add_argument("--sleep-ms", type=float, default=50.0, help="Pause between backup steps")
+    parser.add_argument("--keep", type=int, default=0, help="Keep only the newest N snapshots (0 = keep all)")
+    parser.add_argument("--compress", type=parse_bool, default=False, help="gzip the snapshots")
+    args = parser.parse_args()
+    if args.db_shards <= 1 and not os.path.exists(args.db_path):
+        parser.error(f"{args.db_path} does not exist")
+
+    db = open_media_db(args.db_path, shards=args.db_shards, pool_size=1)
+    try:
+        results = snapshot(
+            db,
+            args.dest,
+            pages=args.pages,
+            sleep=args.sleep_ms / 1000,
+            compress=args.compress,
+            keep=args.keep or None,
+        )
+    finally:
+        db.close()
+    for result in results:
+        size = result.get("compressed_bytes", result["bytes"])
+        print(
+            f"[backup] {result['path']} {size} bytes in {result['duration_ms']:.0f}ms "
+            f"restarts={result['restarts']} pruned={len(result.get('pruned', []))}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""Throughput of the serial server vs the pooled server as simulated Pilot2 clients grow.
+
+Each request is an upload-callback, i.e. one signed S3 HEAD against a fake storage
+that answers after --storage-latency seconds plus one SQLite upsert.
+"""
+import argparse
+import http.client
+import json
+import os
+import tempfile
+import threading
+
+from bench_support import make_config, run_clients, start_fake_storage
+
+from media_server.app import build_server
+from media_server.handler import MediaRequestHandler
+from media_server.storage.db import MediaDB
+
+
+def _bench(config, clients, requests_per_client):
+    MediaRequestHandler.config = config
+    MediaRequestHandler.db = MediaDB(config.db_path, pool_size=max(1, config.server.workers))
+    server = build_server(config)
+    port = server.server_address[1]
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    def _post(index, seq):
+        body = json.dumps(
+            {
+                "object_key": f"ws1/bench/{index}-{seq}.jpg",
+                "fingerprint": f"fp-{index}-{seq}",
+                "name": f"{index}-{seq}.jpg",
+            }
+        )
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        try:
+            conn.request(
+                "POST",
+                "/media/api/v1/workspaces/ws1/upload-callback",
+                body=body,
+                headers={"x-auth-token": config.server.token, "Content-Type": "application/json"},
+            )
+            resp = conn.getresponse()
+            resp.read()
+            if resp.status != 200:
+                raise RuntimeError(f"status {resp.status}")
+        finally:
+            conn.close()
+
+    try:
+        elapsed, errors = run_clients(clients, requests_per_client, _post)
+    finally:
+        server.shutdown()
+        server.server_close()
+        MediaRequestHandler.db.close()
+    return clients * requests_per_client / elapsed, len(errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark serial vs pooled request serving")
+    parser.add_argument("--storage-latency", type=float, default=0.02, help="Simulated HEAD latency seconds")
+    parser.add_argument("--requests", type=int, default=20, help="Requests per client")
+    parser.add_argument("--clients", default="1,4,16,32", help="Comma separated client counts")
+    parser.add_argument("--workers", default="0,4,16", help="Comma separated --workers values (0 = serial)")
+    parser.add_argument("--engine", choices=("threaded", "asyncio"), default="threaded", help="Serving engine")
+    args = parser.parse_args()
+
+    storage = start_fake_storage(latency=args.storage_latency)
+    client_counts = [int(value) for value in args.clients.split(",")]
+    worker_counts = [int(value) for value in args.workers.split(",")]
+    print(f"{'workers':>8} {'clients':>8} {'req/s':>10} {'errors':>7}")
+    try:
+        for workers in worker_counts:
+            for clients in client_counts:
+                with tempfile.TemporaryDirectory() as tmpdir:
+                    config = make_config(
+                        storage.server_address[1],
+                        os.path.join(tmpdir, "media.db"),
+                        engine=args.engine,
+                        workers=workers,
+                        queue_depth=max(64, clients * 2),
+                    )
+                    throughput, errors = _bench(config, clients, args.requests)
+                print(f"{workers or 'serial':>8} {clients:>8} {throughput:>10.1f} {errors:>7}")
+    finally:
+        storage.shutdown()
+        storage.server_close()
+
+
+if __name__ == "__main__":
+    main()
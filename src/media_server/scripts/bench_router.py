@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""Route resolution cost as the route table grows: linear regex scan vs the compiled trie Router."""
+import argparse
+import re
+import time
+
+from bench_support import src_root  # noqa: F401  (puts src/ on sys.path)
+
+from media_server.http_layer.router import ROUTES, Route, Router
+
+
+def _synthetic_routes(count):
+    # Shaped like the real API: a shared prefix, a workspace param, then distinct tails.
+    routes = list(ROUTES)
+    for index in range(max(0, count - len(routes))):
+        method = "GET" if index % 3 == 0 else "POST"
+        routes.append(
+            Route(f"extra-{index}", method, f"/media/api/v1/workspaces/{{workspace_id}}/resource-{index}/{{item_id}}")
+        )
+    return routes
+
+
+def _legacy_resolver(routes):
+    # The implementation Router replaced: every compiled regex tried in order.
+    compiled = []
+    for route in routes:
+        pattern = re.sub(r"\{(\w+)\}", r"(?P<\1>[^/]+)", route.template)
+        compiled.append((route.name, route.method, re.compile(f"^{pattern}$")))
+
+    def resolve(method, path):
+        for name, route_method, pattern in compiled:
+            if route_method != method:
+                continue
+            match = pattern.match(path)
+            if match:
+                return name, match.groupdict()
+        return None, {}
+
+    return resolve
+
+
+def _ns_per_call(resolve, requests, count):
+    started = time.perf_counter()
+    for index in range(count):
+        method, path = requests[index % len(requests)]
+        resolve(method, path)
+    return (time.perf_counter() - started) * 1e9 / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark route resolution")
+    parser.add_argument("--count", type=int, default=200_000, help="Resolutions per measurement")
+    parser.add_argument("--sizes", default="6,50,200", help="Comma-separated route table sizes")
+    args = parser.parse_args()
+
+    print(f"{'routes':>7} {'linear ns':>10} {'trie ns':>9} {'speedup':>8}")
+    for size in (int(value) for value in args.sizes.split(",")):
+        routes = _synthetic_routes(size)
+        legacy = _legacy_resolver(routes)
+        router = Router(routes)
+        last = routes[-1]
+        requests = [
+            ("POST", "/media/api/v1/workspaces/ws1/fast-upload"),
+            (last.method, last.template.replace("{workspace_id}", "ws1").replace("{item_id}", "42")),
+            ("POST", "/media/api/v1/workspaces/ws1/no-such-route"),
+        ]
+        for method, path in requests:
+            expected_name, expected_params = legacy(method, path)
+            assert router.resolve(method, path) == (expected_name, expected_params), f"{method} {path} differs"
+        linear = _ns_per_call(legacy, requests, args.count)
+        trie = _ns_per_call(router.resolve, requests, args.count)
+        print(f"{len(routes):>7} {linear:>10.0f} {trie:>9.0f} {linear / trie:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
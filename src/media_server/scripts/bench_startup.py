@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""MediaDB startup time on a large media.db: unversioned schema check vs user_version migrations."""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+from bench_support import src_root  # noqa: F401  (puts src/ on sys.path)
+
+from media_server.storage.db import MediaDB
+from media_server.storage.migrations import MIGRATIONS
+
+
+def _legacy_boot(db_path):
+    # What every boot did before migrations: CREATE IF NOT EXISTS, table_info scan, ALTERs, index.
+    started = time.perf_counter()
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    MIGRATIONS[0][2](conn)
+    conn.execute("PRAGMA table_info(media_files)").fetchall()
+    conn.close()
+    return (time.perf_counter() - started) * 1000
+
+
+def _timed_open(db_path):
+    started = time.perf_counter()
+    db = MediaDB(db_path)
+    total_ms = (time.perf_counter() - started) * 1000
+    schema_ms = db.schema_ready_ms
+    started = time.perf_counter()
+    db.enable_membership_filter()
+    filter_ms = (time.perf_counter() - started) * 1000
+    db.close()
+    return total_ms, schema_ms, filter_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark MediaDB startup")
+    parser.add_argument("--rows", type=int, default=500_000, help="Rows in media_files")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db_path = os.path.join(tmpdir, "media.db")
+        conn = sqlite3.connect(db_path, isolation_level=None)
+        MIGRATIONS[0][2](conn)
+        now = int(time.time())
+        conn.execute("BEGIN")
+        conn.executemany(
+            "INSERT INTO media_files (workspace_id, fingerprint, tiny_fingerprint, object_key, created_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (
+                (f"ws{i % 10}", f"fp{i}", f"tiny{i}", f"ws{i % 10}/{i}.jpg" if i % 5 else "", now - i)
+                for i in range(args.rows)
+            ),
+        )
+        conn.execute("COMMIT")
+        conn.close()
+        print(f"[bench] media_files rows={args.rows}")
+
+        print(f"{'boot':>22} {'total ms':>10} {'schema ms':>10} {'filter ms':>10}")
+        print(f"{'legacy schema check':>22} {_legacy_boot(db_path):>10.1f} {'-':>10} {'-':>10}")
+        total, schema, filtered = _timed_open(db_path)
+        print(f"{'first boot (migrate)':>22} {total:>10.1f} {schema:>10.1f} {filtered:>10.1f}")
+        total, schema, filtered = _timed_open(db_path)
+        print(f"{'current schema':>22} {total:>10.1f} {schema:>10.1f} {filtered:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
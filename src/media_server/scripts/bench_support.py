@@ -0,0 +1,78 @@
+"""Shared helpers for the bench_*.py scripts: a fake object storage and an in-process media server."""
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+repo_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+src_root = os.path.join(repo_root, "src")
+if src_root not in sys.path:
+    sys.path.insert(0, src_root)
+
+from media_server.config import AppConfig, ServerConfig, StorageConfig, STSConfig
+
+
+class FakeStorageHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency = 0.0
+    missing_prefix = "missing/"
+
+    def log_message(self, fmt, *args):
+        return None
+
+    def do_HEAD(self):
+        if self.latency:
+            time.sleep(self.latency)
+        status = 404 if f"/{self.missing_prefix}" in self.path else 200
+        self.send_response(status)
+        self.send_header("ETag", '"0123456789abcdef"')
+        self.send_header("Content-Length", "0" if status == 404 else "1024")
+        self.end_headers()
+
+
+def start_fake_storage(latency=0.0):
+    handler = type("LatencyStorageHandler", (FakeStorageHandler,), {"latency": latency})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def make_config(storage_port, db_path, **server_options):
+    return AppConfig(
+        server=ServerConfig(host="127.0.0.1", port=0, token="bench-token", **server_options),
+        storage=StorageConfig(
+            endpoint=f"http://127.0.0.1:{storage_port}",
+            bucket="media",
+            region="us-east-1",
+            access_key="key",
+            secret_key="secret",
+            session_token="",
+            provider="minio",
+        ),
+        sts=STSConfig(role_arn="arn", policy="", duration=3600),
+        db_path=db_path,
+        log_level="warning",
+    )
+
+
+def run_clients(clients, requests_per_client, worker):
+    errors = []
+
+    def _run(index):
+        for seq in range(requests_per_client):
+            try:
+                worker(index, seq)
+            except Exception as exc:
+                errors.append(exc)
+
+    threads = [threading.Thread(target=_run, args=(index,)) for index in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return elapsed, errors
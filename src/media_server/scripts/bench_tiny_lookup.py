@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""Per-fingerprint lookups vs MediaDB.get_object_keys_by_tiny on a large media_files table."""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from bench_support import src_root  # noqa: F401  (puts src/ on sys.path)
+
+from media_server.storage.db import MediaDB
+
+
+def _populate(db, rows, workspaces):
+    batch = []
+    now = int(time.time())
+    with db.transaction() as conn:
+        for index in range(rows):
+            workspace_id = f"ws{index % workspaces}"
+            batch.append((workspace_id, f"fp{index}", f"tiny{index}", f"{workspace_id}/{index}.jpg", now))
+            if len(batch) >= 50000:
+                conn.executemany(
+                    "INSERT INTO media_files (workspace_id, fingerprint, tiny_fingerprint, object_key, created_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    batch,
+                )
+                batch = []
+        if batch:
+            conn.executemany(
+                "INSERT INTO media_files (workspace_id, fingerprint, tiny_fingerprint, object_key, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                batch,
+            )
+
+
+def _requested(rows, workspaces, count):
+    # Half hits in ws0, half unknown fingerprints, shuffled like a Pilot2 batch.
+    hits = [f"tiny{index}" for index in random.sample(range(0, rows, workspaces), count // 2)]
+    misses = [f"unknown{index}" for index in range(count - len(hits))]
+    requested = hits + misses
+    random.shuffle(requested)
+    return requested
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark tiny fingerprint lookups")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Rows in media_files")
+    parser.add_argument("--workspaces", type=int, default=10, help="Workspaces the rows are spread over")
+    parser.add_argument("--sizes", default="10,1000,10000", help="Comma separated request sizes")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db = MediaDB(os.path.join(tmpdir, "media.db"))
+        started = time.perf_counter()
+        _populate(db, args.rows, args.workspaces)
+        print(f"[bench] populated {args.rows} rows in {time.perf_counter() - started:.1f}s")
+        print(f"{'size':>7} {'loop ms':>10} {'bulk ms':>10} {'speedup':>8}")
+        for size in [int(value) for value in args.sizes.split(",")]:
+            requested = _requested(args.rows, args.workspaces, size)
+
+            started = time.perf_counter()
+            loop_found = {}
+            for fp in requested:
+                object_key = db.get_object_key_by_tiny("ws0", fp)
+                if object_key:
+                    loop_found[fp] = object_key
+            loop_ms = (time.perf_counter() - started) * 1000
+
+            started = time.perf_counter()
+            bulk_found = db.get_object_keys_by_tiny("ws0", requested)
+            bulk_ms = (time.perf_counter() - started) * 1000
+
+            assert loop_found == bulk_found, "bulk lookup disagrees with per-fingerprint lookup"
+            print(f"{size:>7} {loop_ms:>10.2f} {bulk_ms:>10.2f} {loop_ms / bulk_ms:>7.1f}x")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
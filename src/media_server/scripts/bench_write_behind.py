@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""fast-upload fingerprint upserts per second: one autocommit per request vs write-behind group commits."""
+import argparse
+import os
+import tempfile
+import time
+
+from bench_support import run_clients  # noqa: F401  (also puts src/ on sys.path)
+
+from media_server.storage.db import MediaDB
+from media_server.storage.write_behind import WriteBehindQueue
+
+
+def _bench(db_path, clients, per_client, grouped, batch, delay_ms):
+    db = MediaDB(db_path, pool_size=max(1, min(clients, 8)))
+    writer = WriteBehindQueue(db, max_batch=batch, max_delay_ms=delay_ms) if grouped else None
+    target = writer or db
+
+    def _upsert(index, seq):
+        target.upsert_fingerprint_tiny("ws1", f"fp-{index}-{seq}", f"tiny-{index}-{seq}", file_name=f"{seq}.jpg")
+
+    started = time.perf_counter()
+    _, errors = run_clients(clients, per_client, _upsert)
+    if writer is not None:
+        writer.close()
+    elapsed = time.perf_counter() - started
+    stored = db._fetch_one("SELECT COUNT(*) FROM media_files")[0]
+    batches = writer.stats()["batches"] if writer else stored
+    db.close()
+    assert stored == clients * per_client, f"expected {clients * per_client} rows, found {stored}"
+    return clients * per_client / elapsed, batches, len(errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-request vs grouped fingerprint upserts")
+    parser.add_argument("--clients", default="1,8,32", help="Comma separated concurrent request threads")
+    parser.add_argument("--requests", type=int, default=500, help="Upserts per client")
+    parser.add_argument("--batch", type=int, default=256, help="--db-write-behind-batch")
+    parser.add_argument("--delay-ms", type=float, default=5.0, help="--db-write-behind-delay-ms")
+    args = parser.parse_args()
+
+    print(f"{'mode':>12} {'clients':>8} {'upserts/s':>10} {'commits':>8} {'errors':>7}")
+    for clients in [int(value) for value in args.clients.split(",")]:
+        for grouped in (False, True):
+            with tempfile.TemporaryDirectory() as tmpdir:
+                rate, commits, errors = _bench(
+                    os.path.join(tmpdir, "media.db"),
+                    clients,
+                    args.requests,
+                    grouped,
+                    args.batch,
+                    args.delay_ms,
+                )
+            mode = "grouped" if grouped else "per-request"
+            print(f"{mode:>12} {clients:>8} {rate:>10.0f} {commits:>8} {errors:>7}")
+
+
+if __name__ == "__main__":
+    main()
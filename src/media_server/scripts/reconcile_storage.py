@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""Compare object storage with media.db and report (optionally fix) rows without objects and objects without rows.
+
+Drift is printed as one JSON object per line. With --state-file the run
+records its resume token as it goes, and an interrupted run picks up from
+there when started again with the same file.
+"""
+import argparse
+import json
+import os
+import sys
+
+repo_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.insert(0, os.path.join(repo_root, "src"))
+
+from media_server.config import StorageConfig
+from media_server.config.app import parse_bool
+from media_server.storage.reconcile import Reconciler
+from media_server.storage.s3_client import S3Client
+from media_server.storage.sharding import open_media_db
+
+
+def _write_state(path, token):
+    partial = f"{path}.partial"
+    with open(partial, "w", encoding="utf-8") as handle:
+        handle.write(token)
+    os.replace(partial, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--db-path", default="/opt/mediaserver/data/media.db", help="SQLite DB path")
+    parser.add_argument("--db-shards", type=int, default=0, help="Same value as the server's --db-shards")
+    parser.add_argument("--storage-endpoint", default="http://127.0.0.1:9000", help="Object storage endpoint")
+    parser.add_argument("--storage-bucket", default="media", help="Object storage bucket")
+    parser.add_argument("--storage-region", default="us-east-1", help="Object storage region")
+    parser.add_argument("--storage-access-key", default="minioadmin", help="Object storage access key")
+    parser.add_argument("--storage-secret-key", default="minioadmin", help="Object storage secret key")
+    parser.add_argument("--workspace", action="append", default=None, help="Only this workspace (repeatable)")
+    parser.add_argument("--rate", type=float, default=20.0, help="Storage requests per second (0 = unthrottled)")
+    parser.add_argument("--page-size", type=int, default=1000, help="Keys per ListObjectsV2 page and rows per DB batch")
+    parser.add_argument("--fix-missing", type=parse_bool, default=False, help="Delete rows whose object is gone")
+    parser.add_argument("--fix-orphans", type=parse_bool, default=False, help="Add rows for objects nobody points at")
+    parser.add_argument(
+        "--orphan-grace",
+        type=float,
+        default=3600.0,
+        help="Only adopt orphan objects at least this many seconds old",
+    )
+    parser.add_argument("--resume", default=None, help="Resume token printed by an earlier run")
+    parser.add_argument("--state-file", default=None, help="Keep the resume token here; resumed from if present")
+    args = parser.parse_args()
+    if args.db_shards <= 1 and not os.path.exists(args.db_path):
+        parser.error(f"{args.db_path} does not exist")
+
+    resume = args.resume
+    if resume is None and args.state_file and os.path.exists(args.state_file):
+        with open(args.state_file, encoding="utf-8") as handle:
+            resume = handle.read().strip() or None
+    last_token = [resume]
+
+    def _resume_hint():
+        return f"; resume with --resume {last_token[0]}" if last_token[0] else ""
+
+    def _checkpoint(token):
+        last_token[0] = token
+        if args.state_file:
+            _write_state(args.state_file, token)
+
+    storage = StorageConfig(
+        endpoint=args.storage_endpoint,
+        bucket=args.storage_bucket,
+        region=args.storage_region,
+        access_key=args.storage_access_key,
+        secret_key=args.storage_secret_key,
+        session_token="",
+        provider="minio",
+        pool_size=1,
+    )
+    db = open_media_db(args.db_path, shards=args.db_shards, pool_size=1)
+    client = S3Client(storage)
+    reconciler = Reconciler(
+        db,
+        client,
+        storage.bucket,
+        rate=args.rate,
+        page_size=args.page_size,
+        fix_missing=args.fix_missing,
+        fix_orphans=args.fix_orphans,
+        orphan_grace=args.orphan_grace,
+    )
+    try:
+        stats = reconciler.run(
+            workspaces=args.workspace,
+            resume=resume,
+            on_drift=lambda entry: print(json.dumps(entry, ensure_ascii=False), flush=True),
+            on_checkpoint=_checkpoint,
+        )
+    except KeyboardInterrupt:
+        print(f"[reconcile] interrupted{_resume_hint()}", file=sys.stderr)
+        sys.exit(130)
+    except RuntimeError as exc:
+        print(f"[reconcile] {exc}{_resume_hint()}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        client.close()
+        db.close()
+    if args.state_file and os.path.exists(args.state_file):
+        os.remove(args.state_file)
+    print(
+        f"[reconcile] workspaces={stats['workspaces']} rows={stats['rows']} objects={stats['objects']} "
+        f"missing={stats['missing_object']} orphans={stats['orphan_object']} "
+        f"deleted={stats['deleted']} adopted={stats['adopted']} requests={stats['requests']}",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""Clear verified_at stamps so the server HEADs those objects again on their next request."""
+import argparse
+import os
+import sys
+
+repo_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.insert(0, os.path.join(repo_root, "src"))
+
+from media_server.storage.sharding import open_media_db
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--db-path", default="/opt/mediaserver/data/media.db", help="SQLite DB path")
+    parser.add_argument("--db-shards", type=int, default=0, help="Same value as the server's --db-shards")
+    parser.add_argument("--workspace", default=None, help="Only this workspace (default: all)")
+    parser.add_argument(
+        "--older-than",
+        type=float,
+        default=None,
+        help="Only stamps at least this many seconds old (default: every stamp)",
+    )
+    args = parser.parse_args()
+
+    db = open_media_db(args.db_path, shards=args.db_shards, pool_size=1)
+    try:
+        cleared = db.invalidate_verified(workspace_id=args.workspace, older_than=args.older_than)
+    finally:
+        db.close()
+    print(f"[reverify] cleared verified_at on {cleared} rows")
+
+
+if __name__ == "__main__":
+    main()
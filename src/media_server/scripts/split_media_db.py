@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""Split a single media.db into the hash-sharded files the server opens with --db-shards N.
+
+The source file is only read. media_files, key_layouts and objects rows go to
+the shard of the workspace they belong to, so learned key layouts and the
+object index survive the split. Rows keep their ids, so shard files can be
+compared against the original. Placeholders copied from a database older
+than the updated_at column start aging at the split, as migration 5 would
+have done in place. Stop the server first: rows written while the split runs
+are not copied.
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import time
+
+repo_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.insert(0, os.path.join(repo_root, "src"))
+
+from media_server.storage.db import MediaDB
+from media_server.storage.migrations import backfill_placeholder_ages
+from media_server.storage.object_index import storage_workspace
+from media_server.storage.sharding import shard_index, shard_paths
+
+BATCH_ROWS = 5000
+
+# Tables copied into the shards, each with the workspace that owns a row.
+# objects rows carry no workspace_id; it comes from the storage key, the same
+# way ObjectIndex routes them.
+TABLES = {
+    "media_files": lambda row: row["workspace_id"],
+    "key_layouts": lambda row: row["workspace_id"],
+    "objects": lambda row: storage_workspace(row["bucket"], row["object_key"]),
+}
+
+
+def _copy_table(source, targets, table, owner, batch_rows):
+    shards = len(targets)
+    counts = [0] * shards
+    if not source.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (table,)).fetchone():
+        # Written by a server older than the table's migration: nothing to copy.
+        return counts
+    source_columns = [row[1] for row in source.execute(f"PRAGMA table_info({table})")]
+    target_columns = {row[1] for row in targets[0]._fetch_all(f"PRAGMA table_info({table})")}
+    columns = [name for name in source_columns if name in target_columns]
+    insert = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+    cursor = source.execute(f"SELECT {', '.join(columns)} FROM {table} ORDER BY rowid")
+    while True:
+        rows = cursor.fetchmany(batch_rows)
+        if not rows:
+            break
+        grouped = {}
+        for row in rows:
+            grouped.setdefault(shard_index(owner(dict(zip(columns, row))), shards), []).append(row)
+        for index, shard_rows in grouped.items():
+            with targets[index].transaction() as conn:
+                conn.executemany(insert, shard_rows)
+            counts[index] += len(shard_rows)
+    return counts
+
+
+def split(db_path, shards, batch_rows=BATCH_ROWS):
+    """Copy every row of TABLES in ``db_path`` into its shard; returns ``{table: rows per shard}``."""
+    source = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    targets = [MediaDB(path, pool_size=1) for path in shard_paths(db_path, shards)]
+    try:
+        for target in targets:
+            if target._fetch_one("SELECT 1 FROM media_files LIMIT 1"):
+                raise RuntimeError(f"{target.path} is not empty; remove the shard files before splitting again")
+        counts = {table: _copy_table(source, targets, table, owner, batch_rows) for table, owner in TABLES.items()}
+        for target in targets:
+            with target.transaction() as conn:
+                backfill_placeholder_ages(conn)
+        return counts
+    finally:
+        source.close()
+        for target in targets:
+            target.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db-path", default="/opt/mediaserver/data/media.db", help="Existing single-file SQLite DB")
+    parser.add_argument("--shards", type=int, required=True, help="Shard count, same value as --db-shards")
+    args = parser.parse_args()
+    if args.shards < 2:
+        parser.error("--shards must be at least 2")
+    if not os.path.exists(args.db_path):
+        parser.error(f"{args.db_path} does not exist")
+
+    started = time.perf_counter()
+    counts = split(args.db_path, args.shards)
+    for index, path in enumerate(shard_paths(args.db_path, args.shards)):
+        print(f"[split] {path}: " + ", ".join(f"{table}={rows[index]}" for table, rows in counts.items()))
+    files = sum(counts["media_files"])
+    print(f"[split] {files} media_files rows into {args.shards} shards in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
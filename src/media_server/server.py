@@ -33,6 +33,37 @@ def run(
     host: str = typer.Option("0.0.0.0", "--host", help="Bind host"),
     port: int = typer.Option(8090, "--port", help="Bind port"),
     token: str = typer.Option("demo-token", "--token", help="Fixed x-auth-token"),
+    engine: str = typer.Option(
+        "threaded",
+        "--engine",
+        help="Serving engine: threaded (HTTPServer, optionally pooled) or asyncio (non-blocking S3/STS I/O)",
+    ),
+    workers: int = typer.Option(
+        0,
+        "--workers",
+        help="Worker threads serving requests concurrently (0 = serve one request at a time)",
+    ),
+    processes: int = typer.Option(
+        1,
+        "--processes",
+        help="Pre-forked worker processes sharing the listening port (1 = single process)",
+    ),
+    reuse_port: str = typer.Option(
+        "false",
+        "--reuse-port",
+        help="Let each pre-forked worker bind its own SO_REUSEPORT socket instead of inheriting one (true/false)",
+    ),
+    keepalive_timeout: int = typer.Option(
+        15,
+        "--keepalive-timeout",
+        help="Seconds an idle HTTP/1.1 keep-alive connection stays open (0 = close after each response)",
+    ),
+    backlog: int = typer.Option(128, "--backlog", help="Listen socket accept backlog"),
+    queue_depth: int = typer.Option(
+        64,
+        "--queue-depth",
+        help="Accepted connections allowed to wait for a worker before answering 503",
+    ),
     storage_endpoint: str = typer.Option("http://127.0.0.1:9000", "--storage-endpoint", help="Object storage endpoint"),
     storage_bucket: str = typer.Option("media", "--storage-bucket", help="Object storage bucket"),
     storage_region: str = typer.Option("us-east-1", "--storage-region", help="Object storage region"),
@@ -55,12 +86,181 @@ def run(
         "--trust-forwarded-headers",
         help="Trust X-Forwarded-Host/Proto headers for public endpoint resolution (true/false)",
     ),
+    storage_head_parallelism: int = typer.Option(
+        8,
+        "--storage-head-parallelism",
+        help="Concurrent HEAD checks per tiny-fingerprints request",
+    ),
+    storage_head_deadline: float = typer.Option(
+        10.0,
+        "--storage-head-deadline",
+        help="Seconds a tiny-fingerprints request waits for its HEAD checks; unanswered keys are left untouched",
+    ),
+    storage_pool_size: int = typer.Option(
+        8,
+        "--storage-pool-size",
+        help="Keep-alive connections to the storage endpoint per process",
+    ),
+    storage_pool_idle_timeout: float = typer.Option(
+        60.0,
+        "--storage-pool-idle-timeout",
+        help="Seconds an idle storage connection is kept before it is closed",
+    ),
+    storage_verify_freshness: float = typer.Option(
+        300.0,
+        "--storage-verify-freshness",
+        help="Seconds a successful HEAD is trusted before the object is checked again; 0 always checks",
+    ),
+    storage_breaker_failures: int = typer.Option(
+        5,
+        "--storage-breaker-failures",
+        help="Consecutive storage failures that open the circuit breaker (0 = disabled)",
+    ),
+    storage_breaker_reset: float = typer.Option(
+        10.0,
+        "--storage-breaker-reset",
+        help="Seconds the storage circuit stays open before half-open probes are let through",
+    ),
+    storage_breaker_probes: int = typer.Option(
+        1,
+        "--storage-breaker-probes",
+        help="Requests let through while the storage circuit is half-open",
+    ),
+    storage_layout_learn_after: int = typer.Option(
+        3,
+        "--storage-layout-learn-after",
+        help="Consecutive hits in one key layout before a workspace's HEADs stop trying the other (0 = always both)",
+    ),
+    storage_hedge_percentile: float = typer.Option(
+        0.0,
+        "--storage-hedge-percentile",
+        help="Percentile of recent HEAD latency after which a second HEAD is sent (0 = no hedging, e.g. 95)",
+    ),
+    storage_hedge_budget: float = typer.Option(
+        0.05,
+        "--storage-hedge-budget",
+        help="Most hedged HEADs as a fraction of all HEADs",
+    ),
+    storage_events_token: str = typer.Option(
+        "",
+        "--storage-events-token",
+        help="Shared secret MinIO sends with bucket notifications to POST /storage/api/v1/events (empty = endpoint disabled)",
+    ),
+    storage_event_index_ttl: float = typer.Option(
+        3600.0,
+        "--storage-event-index-ttl",
+        help="Seconds an object index entry is trusted instead of a HEAD (0 = never consult the index)",
+    ),
     storage_sts_role_arn: str = typer.Option(
         "arn:aws:iam::minio:role/dji-pilot", "--storage-sts-role-arn", help="MinIO STS role ARN"
     ),
     storage_sts_policy: str = typer.Option("", "--storage-sts-policy", help="MinIO STS policy JSON"),
     storage_sts_duration: int = typer.Option(3600, "--storage-sts-duration", help="MinIO STS duration seconds"),
+    storage_sts_cache: str = typer.Option(
+        "true",
+        "--storage-sts-cache",
+        help="Reuse STS credentials per workspace until close to expiry (true/false)",
+    ),
+    storage_sts_refresh_threshold: int = typer.Option(
+        300,
+        "--storage-sts-refresh-threshold",
+        help="Seconds of remaining lifetime below which cached STS credentials are no longer handed out",
+    ),
     db_path: str = typer.Option("/opt/mediaserver/data/media.db", "--db-path", help="SQLite DB path"),
+    db_write_behind: str = typer.Option(
+        "false",
+        "--db-write-behind",
+        help="Queue fast-upload fingerprint upserts for a writer thread that commits them in groups (true/false)",
+    ),
+    db_write_behind_batch: int = typer.Option(256, "--db-write-behind-batch", help="Max upserts per group commit"),
+    db_write_behind_delay_ms: float = typer.Option(
+        5.0,
+        "--db-write-behind-delay-ms",
+        help="Max milliseconds a queued upsert waits for its group to fill",
+    ),
+    db_write_behind_capacity: int = typer.Option(
+        10000,
+        "--db-write-behind-capacity",
+        help="Max queued upserts; when full, requests write synchronously",
+    ),
+    db_bloom_filter: str = typer.Option(
+        "false",
+        "--db-bloom-filter",
+        help=(
+            "Answer unknown fingerprints from an in-memory filter, single-process mode only; rows added by "
+            "other processes, e.g. reconcile_storage.py --fix-orphans, stay hidden until restart (true/false)"
+        ),
+    ),
+    db_bloom_fp_rate: float = typer.Option(
+        0.01,
+        "--db-bloom-fp-rate",
+        help="Target false-positive rate of the fingerprint filter",
+    ),
+    db_readers: int = typer.Option(
+        0,
+        "--db-readers",
+        help="Read-only SQLite connections per process (0 = one per request worker)",
+    ),
+    db_checkout_timeout: float = typer.Option(
+        5.0,
+        "--db-checkout-timeout",
+        help="Seconds a request waits for a free SQLite connection before answering 503",
+    ),
+    db_mmap_size: int = typer.Option(
+        256 * 1024 * 1024,
+        "--db-mmap-size",
+        help="Bytes of the database each reader memory-maps (0 = disabled)",
+    ),
+    db_shards: int = typer.Option(
+        0,
+        "--db-shards",
+        help="Spread workspaces over this many hash-sharded SQLite files next to --db-path (0 = one file)",
+    ),
+    db_maintenance: str = typer.Option(
+        "true",
+        "--db-maintenance",
+        help="Checkpoint the WAL, refresh planner statistics and vacuum free pages in the background (true/false)",
+    ),
+    db_wal_checkpoint_mb: int = typer.Option(
+        64,
+        "--db-wal-checkpoint-mb",
+        help="WAL size in MiB above which it is checkpointed and truncated",
+    ),
+    db_optimize_interval: float = typer.Option(
+        3600.0,
+        "--db-optimize-interval",
+        help="Min seconds between ANALYZE/optimize and incremental vacuum runs, done only while idle",
+    ),
+    db_maintenance_budget_ms: float = typer.Option(
+        200.0,
+        "--db-maintenance-budget-ms",
+        help="Max milliseconds one maintenance task may hold the database writer",
+    ),
+    db_placeholder_max_age: float = typer.Option(
+        0.0,
+        "--db-placeholder-max-age",
+        help="Delete fast-upload placeholder rows whose upload never completed after this many seconds (0 = keep)",
+    ),
+    db_placeholder_sweep_interval: float = typer.Option(
+        600.0,
+        "--db-placeholder-sweep-interval",
+        help="Seconds between placeholder sweeps",
+    ),
+    db_placeholder_sweep_batch: int = typer.Option(
+        500,
+        "--db-placeholder-sweep-batch",
+        help="Placeholder rows deleted per write transaction",
+    ),
+    db_backup_dir: str = typer.Option(
+        "",
+        "--db-backup-dir",
+        help="Write online snapshots of the database here on a schedule (empty = no scheduled backups)",
+    ),
+    db_backup_interval: float = typer.Option(86400.0, "--db-backup-interval", help="Seconds between scheduled snapshots"),
+    db_backup_keep: int = typer.Option(7, "--db-backup-keep", help="Snapshots kept per database file"),
+    db_backup_pages: int = typer.Option(256, "--db-backup-pages", help="Pages copied per backup step"),
+    db_backup_sleep_ms: float = typer.Option(50.0, "--db-backup-sleep-ms", help="Pause between backup steps"),
+    db_backup_compress: str = typer.Option("false", "--db-backup-compress", help="gzip scheduled snapshots (true/false)"),
     log_level: str = typer.Option("info", "--log-level", help="Log level: debug/info/warning/error/critical"),
 ):
     argv = [
@@ -71,6 +271,20 @@ def run(
         str(port),
         "--token",
         token,
+        "--engine",
+        engine,
+        "--workers",
+        str(workers),
+        "--processes",
+        str(processes),
+        "--reuse-port",
+        reuse_port,
+        "--keepalive-timeout",
+        str(keepalive_timeout),
+        "--backlog",
+        str(backlog),
+        "--queue-depth",
+        str(queue_depth),
         "--storage-endpoint",
         storage_endpoint,
         "--storage-bucket",
@@ -91,14 +305,90 @@ def run(
         str(storage_public_port),
         "--trust-forwarded-headers",
         trust_forwarded_headers,
+        "--storage-head-parallelism",
+        str(storage_head_parallelism),
+        "--storage-head-deadline",
+        str(storage_head_deadline),
+        "--storage-pool-size",
+        str(storage_pool_size),
+        "--storage-pool-idle-timeout",
+        str(storage_pool_idle_timeout),
+        "--storage-verify-freshness",
+        str(storage_verify_freshness),
+        "--storage-breaker-failures",
+        str(storage_breaker_failures),
+        "--storage-breaker-reset",
+        str(storage_breaker_reset),
+        "--storage-breaker-probes",
+        str(storage_breaker_probes),
+        "--storage-layout-learn-after",
+        str(storage_layout_learn_after),
+        "--storage-hedge-percentile",
+        str(storage_hedge_percentile),
+        "--storage-hedge-budget",
+        str(storage_hedge_budget),
+        "--storage-events-token",
+        storage_events_token,
+        "--storage-event-index-ttl",
+        str(storage_event_index_ttl),
         "--storage-sts-role-arn",
         storage_sts_role_arn,
         "--storage-sts-policy",
         storage_sts_policy,
         "--storage-sts-duration",
         str(storage_sts_duration),
+        "--storage-sts-cache",
+        storage_sts_cache,
+        "--storage-sts-refresh-threshold",
+        str(storage_sts_refresh_threshold),
         "--db-path",
         db_path,
+        "--db-write-behind",
+        db_write_behind,
+        "--db-write-behind-batch",
+        str(db_write_behind_batch),
+        "--db-write-behind-delay-ms",
+        str(db_write_behind_delay_ms),
+        "--db-write-behind-capacity",
+        str(db_write_behind_capacity),
+        "--db-bloom-filter",
+        db_bloom_filter,
+        "--db-bloom-fp-rate",
+        str(db_bloom_fp_rate),
+        "--db-readers",
+        str(db_readers),
+        "--db-checkout-timeout",
+        str(db_checkout_timeout),
+        "--db-mmap-size",
+        str(db_mmap_size),
+        "--db-shards",
+        str(db_shards),
+        "--db-maintenance",
+        db_maintenance,
+        "--db-wal-checkpoint-mb",
+        str(db_wal_checkpoint_mb),
+        "--db-optimize-interval",
+        str(db_optimize_interval),
+        "--db-maintenance-budget-ms",
+        str(db_maintenance_budget_ms),
+        "--db-placeholder-max-age",
+        str(db_placeholder_max_age),
+        "--db-placeholder-sweep-interval",
+        str(db_placeholder_sweep_interval),
+        "--db-placeholder-sweep-batch",
+        str(db_placeholder_sweep_batch),
+        "--db-backup-dir",
+        db_backup_dir,
+        "--db-backup-interval",
+        str(db_backup_interval),
+        "--db-backup-keep",
+        str(db_backup_keep),
+        "--db-backup-pages",
+        str(db_backup_pages),
+        "--db-backup-sleep-ms",
+        str(db_backup_sleep_ms),
+        "--db-backup-compress",
+        db_backup_compress,
         "--log-level",
         log_level,
     ]
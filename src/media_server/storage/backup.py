@@ -0,0 +1,190 @@
+"""Online snapshots of media.db through the sqlite3 backup API.
+
+The copy runs ``pages`` at a time with a ``sleep`` between steps so its I/O
+never crowds out request traffic. In WAL mode a step only needs a read
+snapshot, so writers are never blocked; but SQLite restarts a stepped backup
+whenever another connection commits, so after ``max_restarts`` restarts the
+rest is copied in one step under a single read snapshot, which still does
+not block writers.
+"""
+import glob
+import gzip
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from collections import deque
+
+from ..utils import metrics
+
+STAMP_FORMAT = "%Y%m%d-%H%M%S"
+
+
+class _TooManyRestarts(Exception):
+    pass
+
+
+def _snapshot_prefix(db_path):
+    stem, _ = os.path.splitext(os.path.basename(db_path))
+    return f"{stem}-"
+
+
+def snapshot_path(db_path, dest_dir, stamp):
+    _, suffix = os.path.splitext(db_path)
+    return os.path.join(dest_dir, f"{_snapshot_prefix(db_path)}{stamp}{suffix or '.db'}")
+
+
+def list_snapshots(db_path, dest_dir):
+    """Snapshots of ``db_path`` in ``dest_dir``, oldest first."""
+    _, suffix = os.path.splitext(db_path)
+    pattern = os.path.join(glob.escape(dest_dir), f"{glob.escape(_snapshot_prefix(db_path))}*{suffix or '.db'}")
+    found = glob.glob(pattern) + glob.glob(pattern + ".gz")
+    # Timestamps sort lexically; compressed and plain copies of one stamp stay adjacent.
+    return sorted(found, key=os.path.basename)
+
+
+def prune_snapshots(db_path, dest_dir, keep):
+    """Delete all but the newest ``keep`` snapshots of ``db_path``; returns the removed paths."""
+    snapshots = list_snapshots(db_path, dest_dir)
+    removed = snapshots[: max(0, len(snapshots) - max(1, keep))]
+    for path in removed:
+        os.remove(path)
+    return removed
+
+
+def backup_file(db_path, dest_path, pages=256, sleep=0.05, max_restarts=3):
+    """Copy ``db_path`` to ``dest_path`` while it stays in use; returns copy statistics."""
+    started = time.perf_counter()
+    partial = f"{dest_path}.partial"
+    if os.path.exists(partial):
+        os.remove(partial)
+    # Not mode=ro: a read-only connection cannot create the -shm of a WAL file nobody has open.
+    source = sqlite3.connect(db_path)
+    target = sqlite3.connect(partial)
+    restarts = 0
+    previous = None
+
+    def _progress(status, remaining, total):
+        nonlocal restarts, previous
+        if previous is not None and remaining > previous:
+            restarts += 1
+            if restarts > max_restarts:
+                raise _TooManyRestarts()
+        previous = remaining
+
+    try:
+        try:
+            source.backup(target, pages=max(1, pages), progress=_progress, sleep=sleep)
+        except _TooManyRestarts:
+            source.backup(target, pages=-1)
+        # The copy is one self-contained file, not a WAL database waiting for its -wal.
+        target.execute("PRAGMA journal_mode = DELETE")
+        check = target.execute("PRAGMA quick_check").fetchone()[0]
+        if check != "ok":
+            raise sqlite3.DatabaseError(f"snapshot of {db_path} failed quick_check: {check}")
+    except BaseException:
+        target.close()
+        os.remove(partial)
+        raise
+    finally:
+        source.close()
+    target.close()
+    os.replace(partial, dest_path)
+    return {
+        "path": dest_path,
+        "bytes": os.path.getsize(dest_path),
+        "restarts": restarts,
+        "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+    }
+
+
+def _gzip_file(path):
+    compressed = f"{path}.gz"
+    with open(path, "rb") as raw, gzip.open(f"{compressed}.partial", "wb", compresslevel=6) as out:
+        shutil.copyfileobj(raw, out, 1024 * 1024)
+    os.replace(f"{compressed}.partial", compressed)
+    os.remove(path)
+    return compressed
+
+
+def snapshot(db, dest_dir, pages=256, sleep=0.05, compress=False, keep=None, stamp=None):
+    """Back up every database behind ``db`` (each shard of a ShardedMediaDB) into ``dest_dir``.
+
+    Returns one result dict per database. ``keep`` prunes older snapshots
+    once the new ones are in place.
+    """
+    os.makedirs(dest_dir, exist_ok=True)
+    stamp = stamp or time.strftime(STAMP_FORMAT)
+    results = []
+    for shard in db.shards:
+        result = backup_file(shard.path, snapshot_path(shard.path, dest_dir, stamp), pages=pages, sleep=sleep)
+        if compress:
+            result["path"] = _gzip_file(result["path"])
+            result["compressed_bytes"] = os.path.getsize(result["path"])
+        if keep:
+            result["pruned"] = prune_snapshots(shard.path, dest_dir, keep)
+        logging.info("snapshot of %s written to %s in %.1fms", shard.path, result["path"], result["duration_ms"])
+        results.append(result)
+    return results
+
+
+class BackupScheduler:
+    """Takes a snapshot every ``interval`` seconds; results are on /metrics as ``db_backup``."""
+
+    def __init__(self, db, dest_dir, interval=86400.0, keep=7, pages=256, sleep=0.05, compress=False):
+        self._db = db
+        self.dest_dir = dest_dir
+        self.interval = interval
+        self.keep = keep
+        self.pages = pages
+        self.sleep = sleep
+        self.compress = compress
+        self._lock = threading.Lock()
+        self._runs = deque(maxlen=10)
+        self._failures = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="media-db-backup", daemon=True)
+        self._thread.start()
+        metrics.register("db_backup", self.stats)
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception:
+                # run_once records its own failures; this only keeps the schedule alive.
+                logging.exception("database snapshot scheduler error")
+
+    def run_once(self):
+        started = time.time()
+        try:
+            results = snapshot(
+                self._db, self.dest_dir, pages=self.pages, sleep=self.sleep, compress=self.compress, keep=self.keep
+            )
+            run = {"at": int(started), "status": "ok", "files": [os.path.basename(result["path"]) for result in results]}
+        except Exception as exc:
+            # Any failure is one failed run; the next one is still scheduled.
+            logging.exception("scheduled database snapshot failed")
+            results = None
+            run = {"at": int(started), "status": "error", "error": type(exc).__name__}
+        run["duration_ms"] = round((time.time() - started) * 1000, 3)
+        with self._lock:
+            self._failures += int(results is None)
+            self._runs.append(run)
+        return results
+
+    def stats(self):
+        with self._lock:
+            return {"interval": self.interval, "failures": self._failures, "recent": list(self._runs)}
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            metrics.unregister("db_backup")
@@ -0,0 +1,190 @@
+import hashlib
+import math
+import threading
+
+# Floor for a workspace filter's capacity. Filters are sized from the
+# workspace's own row count, so the floor is what an empty or new workspace
+# costs (about 10 KB per kind at 1%); a workspace that outgrows its filter is
+# rebuilt at twice its row count.
+MIN_CAPACITY = 1024
+COUNTER_MAX = 255
+
+
+class CountingBloomFilter:
+    """Bloom filter with 8-bit counters so members can be removed.
+
+    A counter that saturates at 255 is never decremented again, which can only
+    cause false positives, never false negatives.
+    """
+
+    def __init__(self, capacity, fp_rate=0.01):
+        capacity = max(1, capacity)
+        self.capacity = capacity
+        self.size = max(64, int(math.ceil(-capacity * math.log(fp_rate) / (math.log(2) ** 2))))
+        self.hashes = max(1, int(round(self.size / capacity * math.log(2))))
+        self._counters = bytearray(self.size)
+        self.count = 0
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode("utf-8"), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return [(first + index * second) % self.size for index in range(self.hashes)]
+
+    def add(self, value):
+        counters = self._counters
+        for position in self._positions(value):
+            if counters[position] < COUNTER_MAX:
+                counters[position] += 1
+        self.count += 1
+
+    def remove(self, value):
+        counters = self._counters
+        positions = self._positions(value)
+        # Removing something that was never added would punch holes for other members.
+        if not all(counters[position] for position in positions):
+            return
+        for position in positions:
+            if counters[position] < COUNTER_MAX:
+                counters[position] -= 1
+        self.count = max(0, self.count - 1)
+
+    def __contains__(self, value):
+        counters = self._counters
+        return all(counters[position] for position in self._positions(value))
+
+    @property
+    def nbytes(self):
+        return len(self._counters)
+
+
+class MembershipFilter:
+    """Per-workspace filters over fingerprints and tiny fingerprints of rows that have an object_key.
+
+    ``might_*`` returning False is a definite miss. Only valid while this
+    process is the sole writer of the database.
+
+    A workspace filter that grows past its capacity is rebuilt larger from
+    the database: ``add`` reports it, the owner calls ``begin_rebuild``, reads
+    the workspace's rows and hands them to ``finish_rebuild``. Values added in
+    between are replayed into the new filter.
+    """
+
+    KINDS = ("fingerprint", "tiny")
+
+    def __init__(self, fp_rate=0.01):
+        self.fp_rate = fp_rate
+        self._lock = threading.Lock()
+        self._filters = {kind: {} for kind in self.KINDS}
+        # workspace -> [(kind, value)] added while its rows are being re-read.
+        self._rebuilding = {}
+        self._rebuilds = 0
+        self._negatives = 0
+        self._hits = 0
+        self._false_positives = 0
+
+    def _filter(self, kind, workspace_id, expected=0):
+        filters = self._filters[kind]
+        bloom = filters.get(workspace_id)
+        if bloom is None:
+            bloom = CountingBloomFilter(max(MIN_CAPACITY, expected * 2), self.fp_rate)
+            filters[workspace_id] = bloom
+        return bloom
+
+    def load(self, rows):
+        """Bulk-load ``(workspace_id, fingerprint, tiny_fingerprint)`` rows; replaces current state."""
+        rows = list(rows)
+        per_workspace = {}
+        for workspace_id, _, _ in rows:
+            per_workspace[workspace_id] = per_workspace.get(workspace_id, 0) + 1
+        with self._lock:
+            self._filters = {kind: {} for kind in self.KINDS}
+            for workspace_id, expected in per_workspace.items():
+                for kind in self.KINDS:
+                    self._filter(kind, workspace_id, expected)
+            for workspace_id, fingerprint, tiny_fingerprint in rows:
+                self._filters["fingerprint"][workspace_id].add(fingerprint)
+                if tiny_fingerprint:
+                    self._filters["tiny"][workspace_id].add(tiny_fingerprint)
+
+    def add(self, kind, workspace_id, value):
+        """Add one member; True when the workspace filter is now over capacity and should be rebuilt."""
+        if not value:
+            return False
+        with self._lock:
+            bloom = self._filter(kind, workspace_id)
+            bloom.add(value)
+            pending = self._rebuilding.get(workspace_id)
+            if pending is not None:
+                pending.append((kind, value))
+                return False
+            return bloom.count > bloom.capacity
+
+    def begin_rebuild(self, workspace_id):
+        """Start recording adds for ``workspace_id``; False when it is already being rebuilt or fits again."""
+        with self._lock:
+            filters = [self._filters[kind].get(workspace_id) for kind in self.KINDS]
+            if workspace_id in self._rebuilding or not any(bloom and bloom.count > bloom.capacity for bloom in filters):
+                return False
+            self._rebuilding[workspace_id] = []
+            return True
+
+    def abort_rebuild(self, workspace_id):
+        with self._lock:
+            self._rebuilding.pop(workspace_id, None)
+
+    def finish_rebuild(self, workspace_id, rows):
+        """Replace the workspace's filters with ones sized for ``(fingerprint, tiny_fingerprint)`` rows."""
+        rows = list(rows)
+        capacity = max(MIN_CAPACITY, len(rows) * 2)
+        rebuilt = {kind: CountingBloomFilter(capacity, self.fp_rate) for kind in self.KINDS}
+        for fingerprint, tiny_fingerprint in rows:
+            rebuilt["fingerprint"].add(fingerprint)
+            if tiny_fingerprint:
+                rebuilt["tiny"].add(tiny_fingerprint)
+        with self._lock:
+            for kind, value in self._rebuilding.pop(workspace_id, ()):
+                rebuilt[kind].add(value)
+            for kind in self.KINDS:
+                self._filters[kind][workspace_id] = rebuilt[kind]
+            self._rebuilds += 1
+
+    def remove(self, kind, workspace_id, value):
+        if not value:
+            return
+        with self._lock:
+            bloom = self._filters[kind].get(workspace_id)
+            if bloom is not None:
+                bloom.remove(value)
+
+    def might_contain(self, kind, workspace_id, value):
+        with self._lock:
+            bloom = self._filters[kind].get(workspace_id)
+            present = bloom is not None and value in bloom
+            if not present:
+                self._negatives += 1
+            return present
+
+    def record_lookup(self, found):
+        """Called after a DB lookup the filter let through; a miss there is a false positive."""
+        with self._lock:
+            if found:
+                self._hits += 1
+            else:
+                self._false_positives += 1
+
+    def stats(self):
+        with self._lock:
+            filters = [bloom for kind in self.KINDS for bloom in self._filters[kind].values()]
+            negatives = self._negatives + self._false_positives
+            return {
+                "workspaces": len(self._filters["fingerprint"]),
+                "members": sum(bloom.count for bloom in filters),
+                "memory_bytes": sum(bloom.nbytes for bloom in filters),
+                "target_fp_rate": self.fp_rate,
+                "rebuilds": self._rebuilds,
+                "definite_misses": self._negatives,
+                "hits": self._hits,
+                "false_positives": self._false_positives,
+                "measured_fp_rate": round(self._false_positives / negatives, 6) if negatives else 0.0,
+            }
@@ -0,0 +1,98 @@
+import logging
+import threading
+import time
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    """The dependency is failing; the call was rejected without being attempted."""
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker for one remote dependency.
+
+    After ``failure_threshold`` failures in a row the breaker opens and
+    ``allow()`` rejects calls for ``reset_timeout`` seconds. It then goes
+    half-open and lets ``half_open_probes`` calls through. The first
+    success closes it; a failure opens it again. A probe slot that never
+    reports back frees up after another ``reset_timeout``. A threshold of 0
+    disables the breaker.
+    """
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=10.0, half_open_probes=1, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_probes = max(1, half_open_probes)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._changed_at = clock()
+        self._probes = 0
+        self._opened = 0
+        self._rejected = 0
+        self._last_error = None
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state
+
+    def allow(self):
+        if self.failure_threshold <= 0:
+            return True
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            now = self._clock()
+            if now - self._changed_at >= self.reset_timeout:
+                if self._state == OPEN:
+                    logging.info("%s circuit half-open, probing", self.name)
+                self._state = HALF_OPEN
+                self._changed_at = now
+                self._probes = 0
+            if self._state == HALF_OPEN and self._probes < self.half_open_probes:
+                self._probes += 1
+                return True
+            self._rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            if self._state != CLOSED:
+                logging.warning("%s circuit closed, dependency is back", self.name)
+                self._state = CLOSED
+                self._changed_at = self._clock()
+
+    def record_failure(self, error=None):
+        if self.failure_threshold <= 0:
+            return
+        with self._lock:
+            self._failures += 1
+            # Only a label reaches /metrics: the exception type, or the caller's
+            # own string. An exception message may carry hosts or keys.
+            if error is None or isinstance(error, str):
+                self._last_error = error
+            else:
+                self._last_error = type(error).__name__
+            if self._state == HALF_OPEN or (self._state == CLOSED and self._failures >= self.failure_threshold):
+                logging.warning("%s circuit open after %s consecutive failures: %s", self.name, self._failures, error)
+                self._state = OPEN
+                self._changed_at = self._clock()
+                self._opened += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "state": self._state,
+                "consecutive_failures": self._failures,
+                "seconds_in_state": round(self._clock() - self._changed_at, 3),
+                "times_opened": self._opened,
+                "rejected": self._rejected,
+                "last_error_type": self._last_error,
+            }
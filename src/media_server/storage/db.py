@@ -1,119 +1,329 @@
+import json
+import logging
 import os
 import re
 import sqlite3
 import time
 from contextlib import contextmanager
 from datetime import datetime
-from queue import Queue
+
+from ..utils import metrics
+from .bloom import MembershipFilter
+from .db_pool import ConnectionPool, PoolTimeout
+from .migrations import migrate
 
 
 DJI_CAPTURE_TIME_RE = re.compile(
     r"^DJI_(\d{14})_[0-9]{4}_[A-Za-z0-9]+\.[A-Za-z0-9]+$"
 )
-MEDIA_FILE_EXTRA_COLUMNS = {
-    "is_original": "INTEGER",
-    "sub_file_type": "TEXT",
-    "capture_time": "INTEGER",
-    "absolute_altitude": "REAL",
-    "relative_altitude": "REAL",
-    "gimbal_yaw_degree": "REAL",
-    "shoot_position_lat": "REAL",
-    "shoot_position_lng": "REAL",
-}
+# Fingerprints bound per json_each() statement in the bulk helpers; keeps the
+# JSON parameter and the IN-list probe small for very large requests.
+BULK_CHUNK_SIZE = 2000
+# Bytes of media.db each reader maps into memory; lookups then read pages
+# straight from the page cache instead of copying them through read().
+DEFAULT_MMAP_SIZE = 256 * 1024 * 1024
+ROWID_MAX = 2**63 - 1
 
 
 class MediaDB:
-    def __init__(self, path, pool_size=4):
+    """media.db access through one writer connection and a pool of read-only readers.
+
+    SQLite serialises writers anyway; giving them a dedicated connection keeps
+    writes from queueing behind reads for a pool slot, and WAL lets readers run
+    alongside the writer. ``pool_size`` is the number of readers.
+    """
+
+    def __init__(
+        self,
+        path,
+        pool_size=4,
+        busy_timeout_ms=5000,
+        init_schema=True,
+        checkout_timeout=5.0,
+        mmap_size=DEFAULT_MMAP_SIZE,
+    ):
         self.path = path
-        self._pool = Queue(maxsize=max(1, pool_size))
+        self._filter = None
+        # id(writer conn) -> callbacks to run once its open transaction commits.
+        self._after_commit = {}
+        self.schema_ready_ms = None
+        self._busy_timeout_ms = busy_timeout_ms
         dir_path = os.path.dirname(path)
         if dir_path:
             os.makedirs(dir_path, exist_ok=True)
-        for _ in range(self._pool.maxsize):
-            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=5)
-            conn.execute("PRAGMA journal_mode = WAL")
-            conn.execute("PRAGMA synchronous = NORMAL")
-            conn.execute("PRAGMA temp_store = MEMORY")
-            conn.execute("PRAGMA busy_timeout = 5000")
-            self._pool.put(conn)
-        self._init_schema()
+        self._writer = ConnectionPool(lambda: self._connect(busy_timeout_ms), 1, timeout=checkout_timeout)
+        self._readers = ConnectionPool(
+            lambda: self._connect(busy_timeout_ms, read_only=True, mmap_size=mmap_size),
+            pool_size,
+            timeout=checkout_timeout,
+        )
+        # Open the writer up front: it switches a new file to WAL before any reader attaches.
+        with self._writer.checkout():
+            pass
+        if init_schema:
+            self._init_schema()
 
-    @contextmanager
-    def _get_conn(self):
-        conn = self._pool.get()
+    def _connect(self, busy_timeout_ms, read_only=False, mmap_size=0):
+        conn = sqlite3.connect(
+            self.path,
+            check_same_thread=False,
+            isolation_level=None,
+            timeout=busy_timeout_ms / 1000,
+        )
+        conn.execute(f"PRAGMA busy_timeout = {int(busy_timeout_ms)}")
+        if read_only:
+            conn.execute("PRAGMA query_only = ON")
+            conn.execute(f"PRAGMA mmap_size = {int(mmap_size)}")
+        else:
+            # Only takes effect on a new, empty file; existing databases keep
+            # their mode and incremental_vacuum() then has nothing to do.
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            # journal_mode is persistent in the file; switching it needs an exclusive
+            # lock, so only ask when it is not WAL yet. Otherwise N pre-forked
+            # workers opening their pools at once all queue on that lock.
+            mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+            if str(mode).lower() != "wal":
+                conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        return conn
+
+    def _get_conn(self, write=False):
+        """Check out the writer or a reader; raises PoolTimeout when none frees up in time."""
+        return (self._writer if write else self._readers).checkout()
+
+    @property
+    def shards(self):
+        """The databases behind this one; ShardedMediaDB has several."""
+        return [self]
+
+    def shard_for(self, workspace_id):
+        return self
+
+    def pool_stats(self):
+        return {"writer": self._writer.stats(), "readers": self._readers.stats()}
+
+    # Maintenance tasks, run by storage.maintenance.MaintenanceScheduler. Each
+    # holds the writer for at most ``budget_ms``: the checkout, busy waits and
+    # the statements themselves all stop at the same deadline.
+
+    def wal_size(self):
         try:
-            yield conn
-        finally:
-            self._pool.put(conn)
+            return os.path.getsize(f"{self.path}-wal")
+        except OSError:
+            return 0
+
+    def idle_seconds(self):
+        """Seconds since any connection of this database was last in use."""
+        return min(self._writer.idle_seconds(), self._readers.idle_seconds())
+
+    @contextmanager
+    def _budgeted_writer(self, budget_ms):
+        """Writer connection whose statements are interrupted once ``budget_ms`` is spent; yields (conn, deadline)."""
+        deadline = time.monotonic() + budget_ms / 1000
+        with self._writer.checkout(timeout=budget_ms / 1000) as conn:
+            remaining_ms = max(1, int((deadline - time.monotonic()) * 1000))
+            conn.execute(f"PRAGMA busy_timeout = {remaining_ms}")
+            conn.set_progress_handler(lambda: time.monotonic() > deadline, 1000)
+            try:
+                yield conn, deadline
+            finally:
+                conn.set_progress_handler(None, 0)
+                conn.execute(f"PRAGMA busy_timeout = {int(self._busy_timeout_ms)}")
+
+    def checkpoint(self, budget_ms):
+        """``wal_checkpoint(TRUNCATE)``; ``busy`` means readers kept it from finishing in time."""
+        before = self.wal_size()
+        with self._budgeted_writer(budget_ms) as (conn, _):
+            busy = conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()[0]
+        return {"busy": bool(busy), "wal_bytes_before": before, "wal_bytes_after": self.wal_size()}
+
+    def optimize(self, budget_ms, analysis_limit=1000):
+        """Refresh planner statistics; analysis_limit bounds the rows ANALYZE samples per index."""
+        with self._budgeted_writer(budget_ms) as (conn, _):
+            conn.execute(f"PRAGMA analysis_limit = {int(analysis_limit)}")
+            conn.execute("ANALYZE")
+            conn.execute("PRAGMA optimize")
+        return {}
+
+    def incremental_vacuum(self, budget_ms, step_pages=256):
+        """Hand free pages back to the filesystem, ``step_pages`` at a time, until none are left or time is up."""
+        freed = 0
+        with self._budgeted_writer(budget_ms) as (conn, deadline):
+            if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+                return {"freed_pages": 0, "enabled": False}
+            while time.monotonic() < deadline:
+                free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+                if not free:
+                    break
+                conn.execute(f"PRAGMA incremental_vacuum({min(free, step_pages)})").fetchall()
+                freed += free - conn.execute("PRAGMA freelist_count").fetchone()[0]
+        return {"freed_pages": freed, "enabled": True}
+
+    def sweep_placeholders(self, budget_ms, max_age, batch_size=500):
+        """Delete fast-upload placeholders (object_key '') not touched for ``max_age`` seconds.
+
+        Each batch of ``batch_size`` rows is its own short write transaction,
+        so requests get the writer between batches. Stops when a batch comes
+        back short (``done``) or ``budget_ms`` is spent. Placeholders never
+        reach the membership filter, so there is nothing to forget there.
+        """
+        cutoff = int(time.time() - max_age)
+        deadline = time.monotonic() + budget_ms / 1000
+        deleted = batches = 0
+        done = False
+        while not done and time.monotonic() < deadline:
+            try:
+                with self._budgeted_writer((deadline - time.monotonic()) * 1000) as (conn, _):
+                    count = conn.execute(
+                        "DELETE FROM media_files WHERE id IN ("
+                        "SELECT id FROM media_files WHERE object_key = '' AND updated_at < ? LIMIT ?)",
+                        (cutoff, batch_size),
+                    ).rowcount
+            except (PoolTimeout, sqlite3.OperationalError) as exc:
+                # Out of budget mid-batch: that batch rolled back, earlier ones stay.
+                if not batches or not (isinstance(exc, PoolTimeout) or "interrupt" in str(exc)):
+                    raise
+                break
+            deleted += count
+            batches += 1
+            done = count < batch_size
+        return {"deleted": deleted, "batches": batches, "done": done}
 
     def _init_schema(self):
-        with self._get_conn() as conn:
-            conn.execute(
-                """
-                CREATE TABLE IF NOT EXISTS media_files (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    workspace_id TEXT NOT NULL,
-                    fingerprint TEXT NOT NULL,
-                    tiny_fingerprint TEXT,
-                    object_key TEXT NOT NULL,
-                    file_name TEXT,
-                    file_path TEXT,
-                    is_original INTEGER,
-                    sub_file_type TEXT,
-                    capture_time INTEGER,
-                    absolute_altitude REAL,
-                    relative_altitude REAL,
-                    gimbal_yaw_degree REAL,
-                    shoot_position_lat REAL,
-                    shoot_position_lng REAL,
-                    created_at INTEGER NOT NULL,
-                    UNIQUE(workspace_id, fingerprint)
-                )
-                """
-            )
-            existing_columns = {
-                row[1] for row in conn.execute("PRAGMA table_info(media_files)").fetchall()
-            }
-            for name, column_type in MEDIA_FILE_EXTRA_COLUMNS.items():
-                if name in existing_columns:
-                    continue
-                conn.execute(f"ALTER TABLE media_files ADD COLUMN {name} {column_type}")
-            conn.execute(
-                "CREATE INDEX IF NOT EXISTS idx_media_tiny ON media_files(workspace_id, tiny_fingerprint)"
+        started = time.perf_counter()
+        with self._get_conn(write=True) as conn:
+            applied = migrate(conn)
+        self.schema_ready_ms = (time.perf_counter() - started) * 1000
+        if applied:
+            logging.info("schema migrated to version %s in %.1fms", applied[-1], self.schema_ready_ms)
+        else:
+            logging.debug("schema current, checked in %.1fms", self.schema_ready_ms)
+
+    def enable_membership_filter(self, fp_rate=0.01):
+        """Answer definite fingerprint/tiny misses from memory; only safe while this process is the sole writer."""
+        membership = MembershipFilter(fp_rate)
+        membership.load(self._membership_rows())
+        self._filter = membership
+        metrics.register("membership_filter", membership.stats)
+        return membership
+
+    def _membership_rows(self):
+        return self._fetch_all(
+            "SELECT workspace_id, fingerprint, tiny_fingerprint FROM media_files WHERE object_key != ''"
+        )
+
+    def _previous_object(self, workspace_id, fingerprint, conn):
+        if self._filter is None:
+            return None
+        return self._fetch_one(
+            "SELECT object_key, tiny_fingerprint FROM media_files WHERE workspace_id=? AND fingerprint=?",
+            (workspace_id, fingerprint),
+            conn=conn,
+        )
+
+    def _on_commit(self, conn, callback):
+        """Run ``callback`` once ``conn``'s open transaction commits; at once when there is none."""
+        if conn is not None and conn.in_transaction:
+            self._after_commit.setdefault(id(conn), []).append(callback)
+        else:
+            callback()
+
+    def _track_upsert(self, workspace_id, fingerprint, tiny_fingerprint, object_key, previous, conn=None):
+        # Adds happen straight away: a rollback after an add merely costs one DB lookup.
+        if self._filter is None or not object_key:
+            return
+        had_object = bool(previous and previous[0])
+        full = False
+        if not had_object:
+            full = self._filter.add("fingerprint", workspace_id, fingerprint)
+        if tiny_fingerprint and (not had_object or previous[1] != tiny_fingerprint):
+            full = self._filter.add("tiny", workspace_id, tiny_fingerprint) or full
+        if full:
+            # The rebuild reads through the writer, which conn still holds until it commits.
+            self._on_commit(conn, lambda: self._rebuild_filter(workspace_id))
+
+    def _rebuild_filter(self, workspace_id):
+        membership = self._filter
+        if membership is None or not membership.begin_rebuild(workspace_id):
+            return
+        try:
+            # Read through the writer so every transaction that already added to the filter has finished.
+            rows = self._fetch_all(
+                "SELECT fingerprint, tiny_fingerprint FROM media_files WHERE workspace_id=? AND object_key != ''",
+                (workspace_id,),
+                write=True,
             )
-            # media_files is the single source of truth for fingerprints and tiny_fingerprints.
+        except (sqlite3.Error, PoolTimeout) as exc:
+            membership.abort_rebuild(workspace_id)
+            logging.warning("fingerprint filter for %s not rebuilt: %s", workspace_id, exc)
+            return
+        membership.finish_rebuild(workspace_id, rows)
+        logging.info("fingerprint filter for %s rebuilt for %s rows", workspace_id, len(rows))
+
+    def _track_deleted(self, workspace_id, rows, conn=None):
+        if self._filter is None:
+            return
+        removed = [(fingerprint, tiny_fingerprint) for fingerprint, tiny_fingerprint, object_key in rows if object_key]
+        if not removed:
+            return
+
+        def forget():
+            for fingerprint, tiny_fingerprint in removed:
+                self._filter.remove("fingerprint", workspace_id, fingerprint)
+                self._filter.remove("tiny", workspace_id, tiny_fingerprint)
+
+        # Forgetting a row whose delete later rolls back would turn it into a definite miss.
+        self._on_commit(conn, forget)
+
+    def _filter_miss(self, kind, workspace_id, value):
+        return self._filter is not None and not self._filter.might_contain(kind, workspace_id, value)
 
     def close(self):
-        while not self._pool.empty():
-            conn = self._pool.get_nowait()
-            conn.close()
+        if self._filter is not None:
+            metrics.unregister("membership_filter")
+        self._readers.close()
+        self._writer.close()
 
     @contextmanager
     def transaction(self):
-        with self._get_conn() as conn:
+        with self._get_conn(write=True) as conn:
             try:
-                conn.execute("BEGIN")
+                # IMMEDIATE takes the write lock up front so concurrent read-then-write
+                # transactions wait on busy_timeout instead of failing the lock upgrade.
+                conn.execute("BEGIN IMMEDIATE")
                 yield conn
                 conn.execute("COMMIT")
             except Exception:
+                self._after_commit.pop(id(conn), None)
                 conn.execute("ROLLBACK")
                 raise
+            committed = self._after_commit.pop(id(conn), ())
+        # Outside the checkout: callbacks may need the writer themselves.
+        for callback in committed:
+            callback()
 
     def _execute(self, query, params=(), conn=None):
         if conn is None:
-            with self._get_conn() as conn_ctx:
+            with self._get_conn(write=True) as conn_ctx:
                 conn_ctx.execute(query, params)
             return
         conn.execute(query, params)
 
-    def _fetch_one(self, query, params=(), conn=None):
+    def _fetch_one(self, query, params=(), conn=None, write=False):
         if conn is None:
-            with self._get_conn() as conn_ctx:
+            with self._get_conn(write=write) as conn_ctx:
                 cur = conn_ctx.execute(query, params)
                 return cur.fetchone()
         cur = conn.execute(query, params)
         return cur.fetchone()
 
+    def _fetch_all(self, query, params=(), conn=None, write=False):
+        if conn is None:
+            with self._get_conn(write=write) as conn_ctx:
+                return conn_ctx.execute(query, params).fetchall()
+        return conn.execute(query, params).fetchall()
+
     def _extract_capture_timestamp(self, file_name=None, object_key=None):
         candidates = [file_name, object_key]
         for candidate in candidates:
@@ -235,8 +445,13 @@ class MediaDB:
         shoot_position_lat=None,
         shoot_position_lng=None,
         metadata=None,
+        verified_at=None,
+        etag=None,
+        size=None,
         conn=None,
     ):
+        # verified_at/etag/size describe the object HEAD that accepted this key;
+        # an unverified upsert clears them so the next check goes to storage.
         created_at, parsed_from_name = self._resolve_created_at(file_name=file_name, object_key=object_key)
         extra_fields = self._resolve_media_metadata_fields(
             is_original=is_original,
@@ -249,18 +464,24 @@ class MediaDB:
             shoot_position_lng=shoot_position_lng,
             metadata=metadata,
         )
+        previous = self._previous_object(workspace_id, fingerprint, conn)
         self._execute(
             """
             INSERT INTO media_files
             (
                 workspace_id, fingerprint, tiny_fingerprint, object_key, file_name, file_path,
                 is_original, sub_file_type, capture_time, absolute_altitude, relative_altitude,
-                gimbal_yaw_degree, shoot_position_lat, shoot_position_lng, created_at
+                gimbal_yaw_degree, shoot_position_lat, shoot_position_lng, verified_at, etag, size,
+                created_at, updated_at
             )
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             ON CONFLICT(workspace_id, fingerprint) DO UPDATE SET
                 tiny_fingerprint=excluded.tiny_fingerprint,
                 object_key=excluded.object_key,
+                updated_at=excluded.updated_at,
+                verified_at=excluded.verified_at,
+                etag=excluded.etag,
+                size=excluded.size,
                 file_name=excluded.file_name,
                 file_path=excluded.file_path,
                 is_original=excluded.is_original,
@@ -291,44 +512,267 @@ class MediaDB:
                 extra_fields["gimbal_yaw_degree"],
                 extra_fields["shoot_position_lat"],
                 extra_fields["shoot_position_lng"],
+                None if verified_at is None else int(verified_at),
+                etag,
+                size,
                 created_at,
+                int(time.time()),
                 int(parsed_from_name),
                 created_at,
             ),
             conn=conn,
         )
+        self._track_upsert(workspace_id, fingerprint, tiny_fingerprint, object_key, previous, conn)
+
+    def _lookup_by_fingerprint(self, column, workspace_id, fingerprint, conn):
+        # Not coalesced like storage HEADs: a shared read that started before an
+        # upload-callback commit would hand a stale miss to a caller arriving after it.
+        query = f"SELECT {column} FROM media_files WHERE workspace_id=? AND fingerprint=?"
+        return self._fetch_one(query, (workspace_id, fingerprint), conn=conn)
+
+    def get_object_by_fingerprint(self, workspace_id, fingerprint, conn=None):
+        """``(object_key, verified_at)`` of the row, or None when it has no object_key."""
+        if self._filter_miss("fingerprint", workspace_id, fingerprint):
+            return None
+        row = self._lookup_by_fingerprint("object_key, verified_at", workspace_id, fingerprint, conn)
+        found = bool(row and row[0])
+        if self._filter is not None:
+            self._filter.record_lookup(found)
+        return (row[0], row[1]) if found else None
 
     def get_object_key_by_fingerprint(self, workspace_id, fingerprint, conn=None):
-        row = self._fetch_one(
-            "SELECT object_key FROM media_files WHERE workspace_id=? AND fingerprint=?",
-            (workspace_id, fingerprint),
+        found = self.get_object_by_fingerprint(workspace_id, fingerprint, conn=conn)
+        return found[0] if found else None
+
+    def list_workspaces(self):
+        return [row[0] for row in self._fetch_all("SELECT DISTINCT workspace_id FROM media_files ORDER BY workspace_id")]
+
+    def get_key_layouts(self, bucket):
+        """``{workspace_id: layout}`` learned for ``bucket``."""
+        return dict(self._fetch_all("SELECT workspace_id, layout FROM key_layouts WHERE bucket=?", (bucket,)))
+
+    def set_key_layout(self, workspace_id, bucket, layout, conn=None):
+        self._execute(
+            "INSERT INTO key_layouts (bucket, workspace_id, layout, updated_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(bucket, workspace_id) DO UPDATE SET layout=excluded.layout, updated_at=excluded.updated_at",
+            (bucket, workspace_id, layout, int(time.time())),
             conn=conn,
         )
-        if not row:
-            return None
-        return row[0] or None
+
+    # objects: what storage holds, by object key, from bucket notifications and
+    # HEADs. ``workspace_id`` only routes the call to its shard.
+
+    def apply_object_events(self, workspace_id, bucket, events, conn=None):
+        """Record notifications ``(object_key, present, etag, size, sequencer)``; returns how many applied.
+
+        An event whose sequencer is lower than the one already recorded for
+        its key arrived out of order and is ignored.
+        """
+        if not events:
+            return 0
+        if conn is None:
+            with self.transaction() as tx:
+                return self.apply_object_events(workspace_id, bucket, events, conn=tx)
+        stamp = int(time.time())
+        return conn.executemany(
+            "INSERT INTO objects (bucket, object_key, present, etag, size, sequencer, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT(bucket, object_key) DO UPDATE SET "
+            "present=excluded.present, etag=excluded.etag, size=excluded.size, "
+            "sequencer=excluded.sequencer, updated_at=excluded.updated_at "
+            "WHERE excluded.sequencer >= objects.sequencer",
+            [(bucket, key, int(present), etag, size, sequencer, stamp) for key, present, etag, size, sequencer in events],
+        ).rowcount
+
+    def record_object_checks(self, workspace_id, bucket, checks, checked_at, conn=None):
+        """Record HEAD answers ``(object_key, present, etag, size)`` from checks started at ``checked_at``.
+
+        An entry written after the checks started (a notification that raced
+        them) is newer and kept.
+        """
+        if not checks:
+            return
+        if conn is None:
+            with self.transaction() as tx:
+                self.record_object_checks(workspace_id, bucket, checks, checked_at, conn=tx)
+            return
+        stamp = int(checked_at)
+        conn.executemany(
+            "INSERT INTO objects (bucket, object_key, present, etag, size, updated_at) VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(bucket, object_key) DO UPDATE SET present=excluded.present, etag=excluded.etag, "
+            "size=excluded.size, updated_at=excluded.updated_at WHERE objects.updated_at < excluded.updated_at",
+            [(bucket, key, int(present), etag, size, stamp) for key, present, etag, size in checks],
+        )
+
+    def get_object_states(self, workspace_id, bucket, object_keys, conn=None):
+        """``{object_key: (present, etag, size, updated_at)}`` for the keys the index has."""
+        unique = list(dict.fromkeys(object_keys))
+        found = {}
+        for start in range(0, len(unique), BULK_CHUNK_SIZE):
+            rows = self._fetch_all(
+                "SELECT object_key, present, etag, size, updated_at FROM objects "
+                "WHERE bucket=? AND object_key IN (SELECT value FROM json_each(?))",
+                (bucket, json.dumps(unique[start : start + BULK_CHUNK_SIZE])),
+                conn=conn,
+            )
+            for object_key, present, etag, size, updated_at in rows:
+                found[object_key] = (bool(present), etag, size, updated_at)
+        return found
+
+    def iter_object_keys(self, workspace_id, prefix, after=None, batch_size=1000):
+        """Yield ``(object_key, fingerprint)`` of rows whose key starts with ``prefix``, in key order.
+
+        Reads ``batch_size`` rows per reader checkout, so a long scan neither
+        holds a connection nor loads the workspace into memory. ``after``
+        skips keys up to and including it.
+        """
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        last_key, last_id = (after, ROWID_MAX) if after is not None else ("", 0)
+        while True:
+            rows = self._fetch_all(
+                "SELECT object_key, fingerprint, id FROM media_files "
+                "WHERE workspace_id=? AND object_key != '' AND object_key >= ? AND object_key < ? "
+                "AND (object_key > ? OR (object_key = ? AND id > ?)) "
+                "ORDER BY object_key, id LIMIT ?",
+                (workspace_id, max(prefix, last_key), upper, last_key, last_key, last_id, batch_size),
+            )
+            for object_key, fingerprint, _ in rows:
+                yield object_key, fingerprint
+            if len(rows) < batch_size:
+                return
+            last_key, _, last_id = rows[-1]
 
     def get_object_key_by_tiny(self, workspace_id, tiny_fingerprint, conn=None):
+        if self._filter_miss("tiny", workspace_id, tiny_fingerprint):
+            return None
         row = self._fetch_one(
             "SELECT object_key FROM media_files WHERE workspace_id=? AND tiny_fingerprint=?",
             (workspace_id, tiny_fingerprint),
             conn=conn,
         )
+        if self._filter is not None:
+            self._filter.record_lookup(bool(row and row[0]))
         return row[0] if row else None
 
-    def delete_by_fingerprint(self, workspace_id, fingerprint, conn=None):
+    def get_objects_by_tiny(self, workspace_id, tiny_fingerprints, conn=None):
+        """Resolve many tiny fingerprints at once; returns ``{tiny_fingerprint: (object_key, verified_at)}``.
+
+        Only string fingerprints whose row has a non-empty object_key are
+        included. One statement per BULK_CHUNK_SIZE fingerprints.
+        """
+        unique = list(dict.fromkeys(fp for fp in tiny_fingerprints if isinstance(fp, str)))
+        if self._filter is not None:
+            unique = [fp for fp in unique if not self._filter_miss("tiny", workspace_id, fp)]
+        found = {}
+        for start in range(0, len(unique), BULK_CHUNK_SIZE):
+            rows = self._fetch_all(
+                """
+                SELECT tiny_fingerprint, object_key, verified_at FROM media_files
+                WHERE workspace_id=? AND tiny_fingerprint IN (SELECT value FROM json_each(?))
+                """,
+                (workspace_id, json.dumps(unique[start : start + BULK_CHUNK_SIZE])),
+                conn=conn,
+            )
+            for tiny_fingerprint, object_key, verified_at in rows:
+                if object_key and tiny_fingerprint not in found:
+                    found[tiny_fingerprint] = (object_key, verified_at)
+        if self._filter is not None:
+            for fp in unique:
+                self._filter.record_lookup(fp in found)
+        return found
+
+    def get_object_keys_by_tiny(self, workspace_id, tiny_fingerprints, conn=None):
+        found = self.get_objects_by_tiny(workspace_id, tiny_fingerprints, conn=conn)
+        return {tiny_fingerprint: object_key for tiny_fingerprint, (object_key, _) in found.items()}
+
+    def get_verified_at_by_fingerprint(self, workspace_id, fingerprint, conn=None):
+        row = self._lookup_by_fingerprint("verified_at", workspace_id, fingerprint, conn)
+        return row[0] if row else None
+
+    def mark_verified(self, workspace_id, fingerprint, etag=None, size=None, verified_at=None, conn=None):
         self._execute(
-            "DELETE FROM media_files WHERE workspace_id=? AND fingerprint=?",
+            "UPDATE media_files SET verified_at=?, etag=?, size=? WHERE workspace_id=? AND fingerprint=?",
+            (int(verified_at if verified_at is not None else time.time()), etag, size, workspace_id, fingerprint),
+            conn=conn,
+        )
+
+    def mark_verified_by_tiny_many(self, workspace_id, stats, verified_at=None, conn=None):
+        """Record successful HEADs; ``stats`` maps tiny_fingerprint -> ``(etag, size)``."""
+        if not stats:
+            return
+        if conn is None:
+            with self.transaction() as tx:
+                self.mark_verified_by_tiny_many(workspace_id, stats, verified_at=verified_at, conn=tx)
+            return
+        stamp = int(verified_at if verified_at is not None else time.time())
+        conn.executemany(
+            "UPDATE media_files SET verified_at=?, etag=?, size=? WHERE workspace_id=? AND tiny_fingerprint=?",
+            [(stamp, etag, size, workspace_id, tiny) for tiny, (etag, size) in stats.items()],
+        )
+
+    def invalidate_verified(self, workspace_id=None, older_than=None, conn=None):
+        """Forget verification stamps so the next request HEADs the object again; returns rows touched.
+
+        ``older_than`` (seconds) limits it to stamps at least that old.
+        """
+        clauses = ["verified_at IS NOT NULL"]
+        params = []
+        if workspace_id is not None:
+            clauses.append("workspace_id=?")
+            params.append(workspace_id)
+        if older_than is not None:
+            clauses.append("verified_at <= ?")
+            params.append(int(time.time() - older_than))
+        query = f"UPDATE media_files SET verified_at=NULL WHERE {' AND '.join(clauses)}"
+        if conn is None:
+            with self._get_conn(write=True) as conn_ctx:
+                return conn_ctx.execute(query, params).rowcount
+        return conn.execute(query, params).rowcount
+
+    # Deletes return the removed rows so the membership filter can forget them.
+    # With a caller-supplied conn the filter forgets them once that transaction commits.
+
+    def delete_by_tiny_many(self, workspace_id, tiny_fingerprints, conn=None):
+        unique = list(dict.fromkeys(fp for fp in tiny_fingerprints if isinstance(fp, str)))
+        if not unique:
+            return
+        if conn is None:
+            with self.transaction() as tx:
+                deleted = self._delete_by_tiny_many(workspace_id, unique, tx)
+        else:
+            deleted = self._delete_by_tiny_many(workspace_id, unique, conn)
+        self._track_deleted(workspace_id, deleted, conn)
+
+    def _delete_by_tiny_many(self, workspace_id, unique, conn):
+        deleted = []
+        for start in range(0, len(unique), BULK_CHUNK_SIZE):
+            deleted.extend(
+                conn.execute(
+                    "DELETE FROM media_files WHERE workspace_id=? AND tiny_fingerprint IN (SELECT value FROM json_each(?)) "
+                    "RETURNING fingerprint, tiny_fingerprint, object_key",
+                    (workspace_id, json.dumps(unique[start : start + BULK_CHUNK_SIZE])),
+                ).fetchall()
+            )
+        return deleted
+
+    def delete_by_fingerprint(self, workspace_id, fingerprint, conn=None):
+        deleted = self._fetch_all(
+            "DELETE FROM media_files WHERE workspace_id=? AND fingerprint=? "
+            "RETURNING fingerprint, tiny_fingerprint, object_key",
             (workspace_id, fingerprint),
             conn=conn,
+            write=True,
         )
+        self._track_deleted(workspace_id, deleted, conn)
 
     def delete_by_tiny(self, workspace_id, tiny_fingerprint, conn=None):
-        self._execute(
-            "DELETE FROM media_files WHERE workspace_id=? AND tiny_fingerprint=?",
+        deleted = self._fetch_all(
+            "DELETE FROM media_files WHERE workspace_id=? AND tiny_fingerprint=? "
+            "RETURNING fingerprint, tiny_fingerprint, object_key",
             (workspace_id, tiny_fingerprint),
             conn=conn,
+            write=True,
         )
+        self._track_deleted(workspace_id, deleted, conn)
 
     def upsert_fingerprint_tiny(
         self,
@@ -360,17 +804,19 @@ class MediaDB:
             shoot_position_lng=shoot_position_lng,
             metadata=metadata,
         )
+        previous = self._previous_object(workspace_id, fingerprint, conn)
         self._execute(
             """
             INSERT INTO media_files
             (
                 workspace_id, fingerprint, tiny_fingerprint, object_key, file_name, file_path,
                 is_original, sub_file_type, capture_time, absolute_altitude, relative_altitude,
-                gimbal_yaw_degree, shoot_position_lat, shoot_position_lng, created_at
+                gimbal_yaw_degree, shoot_position_lat, shoot_position_lng, created_at, updated_at
             )
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             ON CONFLICT(workspace_id, fingerprint) DO UPDATE SET
                 tiny_fingerprint=excluded.tiny_fingerprint,
+                updated_at=excluded.updated_at,
                 object_key=CASE
                     WHEN media_files.object_key IS NOT NULL AND media_files.object_key != '' THEN media_files.object_key
                     ELSE excluded.object_key
@@ -406,16 +852,17 @@ class MediaDB:
                 extra_fields["shoot_position_lat"],
                 extra_fields["shoot_position_lng"],
                 created_at,
+                int(time.time()),
                 int(parsed_from_name),
                 created_at,
             ),
             conn=conn,
         )
+        # The stored object_key wins over the empty one inserted here.
+        self._track_upsert(
+            workspace_id, fingerprint, tiny_fingerprint, previous[0] if previous else "", previous, conn
+        )
 
     def get_tiny_by_fingerprint(self, workspace_id, fingerprint, conn=None):
-        row = self._fetch_one(
-            "SELECT tiny_fingerprint FROM media_files WHERE workspace_id=? AND fingerprint=?",
-            (workspace_id, fingerprint),
-            conn=conn,
-        )
+        row = self._lookup_by_fingerprint("tiny_fingerprint", workspace_id, fingerprint, conn)
         return row[0] if row else None
@@ -0,0 +1,146 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Upper bounds (milliseconds) of the checkout wait and hold-time histogram buckets.
+LATENCY_BUCKETS_MS = (0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000, 5000)
+
+
+class PoolTimeout(TimeoutError):
+    """No SQLite connection became free within the checkout timeout."""
+
+
+class LatencyHistogram:
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self._bounds = tuple(buckets)
+        self._counts = [0] * (len(self._bounds) + 1)
+        self._total_ms = 0.0
+        self._max_ms = 0.0
+
+    def observe(self, elapsed_ms):
+        # Callers hold the owning pool's lock.
+        index = len(self._bounds)
+        for position, bound in enumerate(self._bounds):
+            if elapsed_ms <= bound:
+                index = position
+                break
+        self._counts[index] += 1
+        self._total_ms += elapsed_ms
+        self._max_ms = max(self._max_ms, elapsed_ms)
+
+    def snapshot(self):
+        count = sum(self._counts)
+        labels = [f"<={bound}ms" for bound in self._bounds]
+        labels.append(f">{self._bounds[-1]}ms")
+        return {
+            "count": count,
+            "avg_ms": round(self._total_ms / count, 3) if count else 0.0,
+            "max_ms": round(self._max_ms, 3),
+            "buckets": dict(zip(labels, self._counts)),
+        }
+
+
+class ConnectionPool:
+    """Bounded pool of SQLite connections opened on demand up to ``size``.
+
+    ``checkout()`` waits at most ``timeout`` seconds for a free connection and
+    raises PoolTimeout after that, so a saturated pool turns into an error
+    response instead of a request that hangs forever.
+    """
+
+    def __init__(self, connect, size, timeout=5.0):
+        self._connect = connect
+        self.size = max(1, int(size))
+        self.timeout = timeout
+        self._cond = threading.Condition()
+        self._idle = deque()
+        self._opened = 0
+        self._in_use = 0
+        self._closed = False
+        self._timeouts = 0
+        self._last_release = time.monotonic()
+        self._wait = LatencyHistogram()
+        self._hold = LatencyHistogram()
+
+    def _acquire(self, timeout):
+        started = time.perf_counter()
+        deadline = started + timeout
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("connection pool is closed")
+                if self._idle:
+                    conn = self._idle.pop()
+                    break
+                if self._opened < self.size:
+                    # Reserve the slot, then connect outside the lock.
+                    self._opened += 1
+                    conn = None
+                    break
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeout(f"no database connection free after {timeout:.1f}s")
+                self._cond.wait(remaining)
+            self._in_use += 1
+        if conn is None:
+            try:
+                conn = self._connect()
+            except BaseException:
+                with self._cond:
+                    self._opened -= 1
+                    self._in_use -= 1
+                    self._cond.notify()
+                raise
+        acquired = time.perf_counter()
+        with self._cond:
+            self._wait.observe((acquired - started) * 1000)
+        return conn, acquired
+
+    def _release(self, conn, acquired):
+        with self._cond:
+            self._hold.observe((time.perf_counter() - acquired) * 1000)
+            self._in_use -= 1
+            self._last_release = time.monotonic()
+            if self._closed:
+                self._opened -= 1
+                conn.close()
+            else:
+                self._idle.append(conn)
+            self._cond.notify()
+
+    @contextmanager
+    def checkout(self, timeout=None):
+        conn, acquired = self._acquire(self.timeout if timeout is None else timeout)
+        try:
+            yield conn
+        finally:
+            self._release(conn, acquired)
+
+    def idle_seconds(self):
+        """Seconds since a connection was last returned, 0.0 while any is checked out."""
+        with self._cond:
+            if self._in_use:
+                return 0.0
+            return time.monotonic() - self._last_release
+
+    def close(self):
+        """Close idle connections now; ones still checked out close when returned."""
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                self._idle.pop().close()
+                self._opened -= 1
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "size": self.size,
+                "open": self._opened,
+                "in_use": self._in_use,
+                "timeouts": self._timeouts,
+                "wait": self._wait.snapshot(),
+                "hold": self._hold.snapshot(),
+            }
@@ -0,0 +1,96 @@
+import threading
+from collections import deque
+
+# Below this many latency samples the percentile says too little; do not hedge yet.
+MIN_SAMPLES = 20
+MIN_DELAY = 0.005
+
+
+class HedgePolicy:
+    """When to send a second copy of a slow request, and how many we can afford.
+
+    The hedge delay is the ``percentile`` of the last ``window`` observed
+    latencies (at least MIN_DELAY, at most ``max_delay`` seconds), so only the
+    slowest few percent of requests are hedged. ``budget`` caps hedges at that
+    fraction of requests: every request earns ``budget`` of a token, a hedge
+    spends one, and at most ``burst`` tokens are banked. A percentile of 0
+    disables hedging.
+    """
+
+    def __init__(self, percentile=95.0, budget=0.05, window=512, max_delay=1.0, burst=10.0):
+        self.percentile = percentile
+        self.budget = budget
+        self.max_delay = max_delay
+        self.burst = burst
+        self._lock = threading.Lock()
+        self._samples = deque(maxlen=window)
+        self._tokens = 0.0
+        self._requests = 0
+        self._hedged = 0
+        self._hedge_wins = 0
+        self._denied = 0
+        self._saturated = 0
+
+    @property
+    def enabled(self):
+        return self.percentile > 0
+
+    def observe(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def delay(self):
+        """Seconds to wait before hedging, or None while there are too few samples."""
+        with self._lock:
+            samples = sorted(self._samples)
+        if len(samples) < MIN_SAMPLES:
+            return None
+        index = min(len(samples) - 1, int(len(samples) * self.percentile / 100))
+        return min(self.max_delay, max(MIN_DELAY, samples[index]))
+
+    def start(self):
+        """Count one request; it earns its share of the hedge budget."""
+        with self._lock:
+            self._requests += 1
+            self._tokens = min(self.burst, self._tokens + self.budget)
+
+    def try_hedge(self):
+        """Spend budget on one hedge; False when the budget is used up."""
+        with self._lock:
+            if self._tokens < 1:
+                self._denied += 1
+                return False
+            self._tokens -= 1
+            self._hedged += 1
+            return True
+
+    def cancel_hedge(self):
+        """A granted hedge could not be sent (no free connection); refund it."""
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + 1)
+            self._hedged -= 1
+            self._denied += 1
+
+    def skip_saturated(self):
+        """A hedge was due but every worker or connection was busy; a second copy would only queue."""
+        with self._lock:
+            self._saturated += 1
+
+    def hedge_won(self):
+        with self._lock:
+            self._hedge_wins += 1
+
+    def stats(self):
+        delay = self.delay()
+        with self._lock:
+            samples = sorted(self._samples)
+            return {
+                "requests": self._requests,
+                "hedged": self._hedged,
+                "hedge_rate": round(self._hedged / self._requests, 4) if self._requests else 0.0,
+                "hedge_wins": self._hedge_wins,
+                "budget_denied": self._denied,
+                "saturated_skips": self._saturated,
+                "delay_ms": None if delay is None else round(delay * 1000, 2),
+                "p50_ms": round(samples[len(samples) // 2] * 1000, 2) if samples else None,
+            }
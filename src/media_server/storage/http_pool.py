@@ -0,0 +1,128 @@
+import http.client
+import threading
+import time
+from collections import deque
+
+# Failures that mean a pooled keep-alive socket went stale between requests;
+# the request is retried once on a fresh connection.
+STALE_CONNECTION_ERRORS = (
+    BrokenPipeError,
+    ConnectionResetError,
+    ConnectionAbortedError,
+    http.client.RemoteDisconnected,
+    http.client.BadStatusLine,
+)
+
+
+class PoolExhausted(RuntimeError):
+    pass
+
+
+class HTTPConnectionPool:
+    """Keep-alive ``http.client`` connections to one storage endpoint.
+
+    At most ``size`` connections exist at a time; idle ones older than
+    ``idle_timeout`` seconds are closed on the next checkout. Thread-safe.
+    """
+
+    def __init__(self, endpoint, size=8, idle_timeout=60.0, timeout=5.0):
+        self._endpoint = endpoint
+        self._timeout = timeout
+        self.size = max(1, size)
+        self.idle_timeout = idle_timeout
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._lock = threading.Lock()
+        self._idle = deque()
+        self._created = 0
+        self._reused = 0
+        self._reconnects = 0
+        self._evicted = 0
+        self._in_use = 0
+
+    def _new_connection(self):
+        if self._endpoint.scheme == "https":
+            conn = http.client.HTTPSConnection(self._endpoint.netloc, timeout=self._timeout)
+        else:
+            conn = http.client.HTTPConnection(self._endpoint.netloc, timeout=self._timeout)
+        with self._lock:
+            self._created += 1
+        return conn
+
+    def _checkout(self):
+        now = time.monotonic()
+        with self._lock:
+            while self._idle:
+                conn, last_used = self._idle.pop()
+                if now - last_used <= self.idle_timeout:
+                    self._reused += 1
+                    return conn, True
+                self._evicted += 1
+                conn.close()
+        return self._new_connection(), False
+
+    def _checkin(self, conn):
+        with self._lock:
+            self._idle.append((conn, time.monotonic()))
+
+    def request(self, method, path, headers, body=None, slot_timeout=None, on_start=None):
+        """Send one request and return ``(status, headers, body)``; transport errors propagate.
+
+        ``slot_timeout`` overrides how long to wait for a free connection; 0 fails at once.
+        ``on_start`` is called once a connection is free, right before sending.
+        """
+        wait_for = self._timeout if slot_timeout is None else slot_timeout
+        if not self._slots.acquire(timeout=wait_for):
+            raise PoolExhausted(f"no free storage connection within {wait_for}s")
+        with self._lock:
+            self._in_use += 1
+        try:
+            if on_start is not None:
+                on_start()
+            conn, reused = self._checkout()
+            while True:
+                try:
+                    conn.request(method, path, body=body, headers=headers)
+                    resp = conn.getresponse()
+                    payload = resp.read()
+                except STALE_CONNECTION_ERRORS:
+                    conn.close()
+                    if not reused:
+                        raise
+                    with self._lock:
+                        self._reconnects += 1
+                    conn, reused = self._new_connection(), False
+                    continue
+                except BaseException:
+                    conn.close()
+                    raise
+                if resp.will_close:
+                    conn.close()
+                else:
+                    self._checkin(conn)
+                return resp.status, resp.headers, payload
+        finally:
+            with self._lock:
+                self._in_use -= 1
+            self._slots.release()
+
+    def saturated(self):
+        """True when every connection is taken and a new request would wait for one."""
+        with self._lock:
+            return self._in_use >= self.size
+
+    def close(self):
+        with self._lock:
+            while self._idle:
+                conn, _ = self._idle.pop()
+                conn.close()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": self.size,
+                "idle": len(self._idle),
+                "created": self._created,
+                "reused": self._reused,
+                "reconnects": self._reconnects,
+                "evicted": self._evicted,
+            }
@@ -0,0 +1,123 @@
+"""Learn which object key layout each workspace's uploads use, so hits cost one HEAD.
+
+Uploads land either under the key as given (``PLAIN``) or under a
+``bucket/`` prefix (``BUCKET_PREFIXED``). head_object tries the plain key
+first, so every object of a bucket-prefixed workspace costs two round
+trips. After ``learn_after`` hits in a row for one layout the layout is
+learned and tried first. The other layout is still tried on a 404: the
+learned layout is only an ordering hint, and a miss is reported only after
+both candidates answered 404. A hit under the other layout demotes the
+workspace to ``MIXED``, which goes back to the default order.
+
+Learned layouts are written to the ``key_layouts`` table when a store is
+attached, so restarts and sibling processes start out knowing them.
+"""
+import logging
+import sqlite3
+import threading
+
+from .db_pool import PoolTimeout
+
+PLAIN = "plain"
+BUCKET_PREFIXED = "bucket"
+MIXED = "mixed"
+_LAYOUTS = (PLAIN, BUCKET_PREFIXED)
+
+
+def workspace_of(object_key):
+    """First path segment of the key: uploads are written under ``{workspace_id}/``."""
+    return object_key.lstrip("/").split("/", 1)[0]
+
+
+class KeyLayouts:
+    """Per-workspace key layouts for one bucket. ``learn_after`` 0 never learns."""
+
+    def __init__(self, bucket, learn_after=3, store=None):
+        self.bucket = bucket
+        self.learn_after = learn_after
+        self._lock = threading.Lock()
+        self._store = None
+        self._layouts = {}
+        # workspace -> (layout, consecutive hits) while still learning.
+        self._streaks = {}
+        self._probes = 0
+        self._second_probes = 0
+        self._demoted = 0
+        if store is not None:
+            self.attach(store)
+
+    def attach(self, store):
+        """Persist learned layouts through ``store`` (a MediaDB) and load the ones it already has."""
+        try:
+            known = store.get_key_layouts(self.bucket)
+        except (sqlite3.Error, PoolTimeout) as exc:
+            logging.warning("key layouts not loaded for bucket %s: %s", self.bucket, exc)
+            known = {}
+        with self._lock:
+            self._store = store
+            self._layouts.update(known)
+
+    def candidates(self, object_key):
+        """``[(layout, key)]`` to try in order for ``object_key``."""
+        key = object_key.lstrip("/")
+        bucket_prefix = f"{self.bucket}/"
+        if object_key.startswith(bucket_prefix):
+            return [(PLAIN, key)]
+        both = [(PLAIN, key), (BUCKET_PREFIXED, f"{bucket_prefix}{key}")]
+        if self.learn_after <= 0:
+            return both
+        with self._lock:
+            layout = self._layouts.get(workspace_of(key))
+        if layout == BUCKET_PREFIXED:
+            return both[::-1]
+        return both
+
+    def record_probe(self, position):
+        """Count one HEAD for the candidate at ``position``; anything past 0 is a second round trip."""
+        with self._lock:
+            self._probes += 1
+            if position > 0:
+                self._second_probes += 1
+
+    def record_hit(self, object_key, layout):
+        if self.learn_after <= 0 or object_key.startswith(f"{self.bucket}/"):
+            return
+        workspace_id = workspace_of(object_key)
+        with self._lock:
+            known = self._layouts.get(workspace_id)
+            if known == MIXED or known == layout:
+                return
+            previous, streak = self._streaks.get(workspace_id, (layout, 0))
+            if known is not None:
+                # The hint was wrong for this object: stop preferring either layout.
+                learned = MIXED
+                self._demoted += 1
+            elif previous != layout:
+                learned = MIXED
+            elif streak + 1 >= self.learn_after:
+                learned = layout
+            else:
+                self._streaks[workspace_id] = (layout, streak + 1)
+                return
+            self._streaks.pop(workspace_id, None)
+            self._layouts[workspace_id] = learned
+            store = self._store
+        logging.info("key layout for %s/%s learned: %s", self.bucket, workspace_id, learned)
+        if store is None:
+            return
+        try:
+            store.set_key_layout(workspace_id, self.bucket, learned)
+        except (sqlite3.Error, PoolTimeout) as exc:
+            logging.warning("key layout for %s/%s not saved: %s", self.bucket, workspace_id, exc)
+
+    def stats(self):
+        with self._lock:
+            learned = sum(1 for layout in self._layouts.values() if layout in _LAYOUTS)
+            return {
+                "learned": learned,
+                "mixed": len(self._layouts) - learned,
+                "learning": len(self._streaks),
+                "head_requests": self._probes,
+                "second_candidate_probes": self._second_probes,
+                "demoted": self._demoted,
+            }
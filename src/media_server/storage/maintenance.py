@@ -0,0 +1,146 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+
+from ..utils import metrics
+from .db_pool import PoolTimeout
+
+TASKS = ("checkpoint", "optimize", "incremental_vacuum", "sweep_placeholders")
+
+
+class MaintenanceScheduler:
+    """Background thread that keeps every database of a MediaDB/ShardedMediaDB in shape.
+
+    Every ``check_interval`` seconds, per database:
+
+    * ``wal_checkpoint(TRUNCATE)`` once the ``-wal`` file exceeds ``wal_limit_bytes``;
+    * ANALYZE/``PRAGMA optimize`` and then ``incremental_vacuum``, at most once per
+      ``optimize_interval`` and only after ``idle_seconds`` without any
+      connection in use;
+    * deleting fast-upload placeholder rows older than ``placeholder_max_age``
+      in batches of ``sweep_batch``, once per ``sweep_interval`` and again on
+      the next check while a backlog is left (0 disables it).
+
+    Each task holds the writer for at most ``budget_ms`` and is recorded with
+    its duration; the latest runs and per-task totals are on /metrics as
+    ``db_maintenance``.
+    """
+
+    def __init__(
+        self,
+        db,
+        wal_limit_bytes=64 * 1024 * 1024,
+        optimize_interval=3600.0,
+        budget_ms=200.0,
+        idle_seconds=5.0,
+        check_interval=10.0,
+        history=50,
+        placeholder_max_age=0.0,
+        sweep_interval=600.0,
+        sweep_batch=500,
+    ):
+        self._db = db
+        self.wal_limit_bytes = wal_limit_bytes
+        self.optimize_interval = optimize_interval
+        self.budget_ms = budget_ms
+        self.idle_seconds = idle_seconds
+        self.check_interval = check_interval
+        self.placeholder_max_age = placeholder_max_age
+        self.sweep_interval = sweep_interval
+        self.sweep_batch = sweep_batch
+        self._lock = threading.Lock()
+        self._runs = deque(maxlen=history)
+        self._totals = {task: {"runs": 0, "errors": 0, "skipped": 0, "total_ms": 0.0, "max_ms": 0.0} for task in TASKS}
+        self._last_optimized = {}
+        self._last_swept = {}
+        self._reclaimed = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="media-db-maintenance", daemon=True)
+        self._thread.start()
+        metrics.register("db_maintenance", self.stats)
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.check_interval):
+            try:
+                self.run_once()
+            except Exception:
+                logging.exception("database maintenance pass failed")
+
+    def run_once(self, now=None):
+        """One pass over every database; returns the runs it recorded."""
+        now = time.monotonic() if now is None else now
+        runs = []
+        for shard in self._db.shards:
+            # Sample idleness first: the checkpoint below is itself a checkout.
+            idle = shard.idle_seconds() >= self.idle_seconds
+            if shard.wal_size() > self.wal_limit_bytes:
+                runs.append(self._record("checkpoint", shard, shard.checkpoint))
+            last = self._last_optimized.get(shard.path)
+            if idle and (last is None or now - last >= self.optimize_interval):
+                self._last_optimized[shard.path] = now
+                runs.append(self._record("optimize", shard, shard.optimize))
+                runs.append(self._record("incremental_vacuum", shard, shard.incremental_vacuum))
+            if self.placeholder_max_age > 0:
+                last = self._last_swept.get(shard.path)
+                if last is None or now - last >= self.sweep_interval:
+                    run = self._record("sweep_placeholders", shard, self._sweeper(shard))
+                    result = run.get("result", {})
+                    # A backlog is left: come back on the next check rather than a full interval later.
+                    self._last_swept[shard.path] = None if result.get("done") is False else now
+                    runs.append(run)
+        return runs
+
+    def _sweeper(self, shard):
+        return lambda budget_ms: shard.sweep_placeholders(budget_ms, self.placeholder_max_age, self.sweep_batch)
+
+    def _record(self, task, shard, action):
+        started = time.perf_counter()
+        # /metrics shows the file name only, never the path on disk.
+        run = {"task": task, "db": os.path.basename(shard.path), "at": int(time.time())}
+        error = None
+        try:
+            run["result"] = action(self.budget_ms)
+            run["status"] = "ok"
+        except PoolTimeout:
+            run["status"] = "skipped"
+        except sqlite3.OperationalError as exc:
+            # "interrupted" means the budget ran out mid-statement.
+            run["status"] = "interrupted" if "interrupt" in str(exc) else "error"
+            run["error"] = type(exc).__name__
+            error = exc
+        run["duration_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        with self._lock:
+            totals = self._totals[task]
+            totals["runs"] += 1
+            totals["errors"] += int(run["status"] in {"error", "interrupted"})
+            totals["skipped"] += int(run["status"] == "skipped")
+            totals["total_ms"] += run["duration_ms"]
+            totals["max_ms"] = max(totals["max_ms"], run["duration_ms"])
+            if task == "sweep_placeholders":
+                self._reclaimed += run.get("result", {}).get("deleted", 0)
+            self._runs.append(run)
+        log = logging.warning if run["status"] == "error" else logging.info
+        log("db maintenance %s on %s: %s in %.1fms %s", task, shard.path, run["status"], run["duration_ms"], run.get("result", error or ""))
+        return run
+
+    def stats(self):
+        with self._lock:
+            return {
+                "budget_ms": self.budget_ms,
+                "placeholders_reclaimed": self._reclaimed,
+                "tasks": {task: dict(totals, total_ms=round(totals["total_ms"], 3)) for task, totals in self._totals.items()},
+                "recent": list(self._runs)[-10:],
+            }
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            metrics.unregister("db_maintenance")
@@ -0,0 +1,179 @@
+"""Numbered schema migrations for media.db, tracked in ``PRAGMA user_version``.
+
+Each migration runs once, in order, inside one write transaction. Append new
+ones to MIGRATIONS; never edit or renumber an applied one. Version 1 is the
+schema the server created before versioning existed, written so that it also
+upgrades those unversioned (user_version 0) databases in place.
+"""
+import logging
+
+MEDIA_FILE_EXTRA_COLUMNS = {
+    "is_original": "INTEGER",
+    "sub_file_type": "TEXT",
+    "capture_time": "INTEGER",
+    "absolute_altitude": "REAL",
+    "relative_altitude": "REAL",
+    "gimbal_yaw_degree": "REAL",
+    "shoot_position_lat": "REAL",
+    "shoot_position_lng": "REAL",
+}
+
+VERIFICATION_COLUMNS = {
+    "verified_at": "INTEGER",
+    "etag": "TEXT",
+    "size": "INTEGER",
+}
+
+
+def _add_missing_columns(conn, columns):
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(media_files)").fetchall()}
+    for name, column_type in columns.items():
+        if name not in existing:
+            conn.execute(f"ALTER TABLE media_files ADD COLUMN {name} {column_type}")
+
+
+def _baseline(conn):
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS media_files (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            workspace_id TEXT NOT NULL,
+            fingerprint TEXT NOT NULL,
+            tiny_fingerprint TEXT,
+            object_key TEXT NOT NULL,
+            file_name TEXT,
+            file_path TEXT,
+            is_original INTEGER,
+            sub_file_type TEXT,
+            capture_time INTEGER,
+            absolute_altitude REAL,
+            relative_altitude REAL,
+            gimbal_yaw_degree REAL,
+            shoot_position_lat REAL,
+            shoot_position_lng REAL,
+            created_at INTEGER NOT NULL,
+            UNIQUE(workspace_id, fingerprint)
+        )
+        """
+    )
+    _add_missing_columns(conn, MEDIA_FILE_EXTRA_COLUMNS)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_media_tiny ON media_files(workspace_id, tiny_fingerprint)")
+
+
+def _verification_columns(conn):
+    _add_missing_columns(conn, VERIFICATION_COLUMNS)
+
+
+def _listing_index(conn):
+    # web listing: WHERE object_key != '' ORDER BY created_at DESC. The id > ?
+    # polling query walks the rowid directly and needs no index of its own.
+    # Deliberately not covering: the listing reads 16 columns of every row, so
+    # a covering index would be a second copy of the table written on every
+    # upsert. This one only spares the listing its sort (no TEMP B-TREE).
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_media_created_at ON media_files(created_at DESC) WHERE object_key != ''"
+    )
+
+
+def _object_key_index(conn):
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_media_object_key ON media_files(workspace_id, object_key) "
+        "WHERE object_key != ''"
+    )
+
+
+def backfill_placeholder_ages(conn):
+    """Start placeholders without an updated_at aging now; returns the rows touched.
+
+    Also used by scripts/split_media_db.py, whose copies of rows from a
+    pre-migration database bypass the migration.
+    """
+    return conn.execute(
+        "UPDATE media_files SET updated_at = CAST(strftime('%s', 'now') AS INTEGER) "
+        "WHERE object_key = '' AND updated_at IS NULL"
+    ).rowcount
+
+
+def _placeholder_index(conn):
+    # fast-upload placeholders (object_key '') age by updated_at, not by the
+    # capture-time created_at. Existing ones start aging at the migration.
+    _add_missing_columns(conn, {"updated_at": "INTEGER"})
+    backfill_placeholder_ages(conn)
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_media_placeholder ON media_files(updated_at) WHERE object_key = ''"
+    )
+
+
+def _key_layouts(conn):
+    # Which object key layout (see storage/key_layout.py) each workspace's
+    # uploads use in a bucket, so misses need a single HEAD.
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS key_layouts (
+            bucket TEXT NOT NULL,
+            workspace_id TEXT NOT NULL,
+            layout TEXT NOT NULL,
+            updated_at INTEGER NOT NULL,
+            PRIMARY KEY (bucket, workspace_id)
+        )
+        """
+    )
+
+
+def _object_index(conn):
+    # Existence of storage objects as reported by bucket notifications and
+    # HEADs (see storage/object_index.py). present=0 rows are removals.
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS objects (
+            bucket TEXT NOT NULL,
+            object_key TEXT NOT NULL,
+            present INTEGER NOT NULL,
+            etag TEXT,
+            size INTEGER,
+            sequencer TEXT NOT NULL DEFAULT '',
+            updated_at INTEGER NOT NULL,
+            PRIMARY KEY (bucket, object_key)
+        )
+        """
+    )
+
+
+MIGRATIONS = [
+    (1, "media_files baseline", _baseline),
+    (2, "verified_at/etag/size columns", _verification_columns),
+    (3, "created_at listing index", _listing_index),
+    (4, "object_key index", _object_key_index),
+    (5, "updated_at column and placeholder index", _placeholder_index),
+    (6, "key_layouts table", _key_layouts),
+    (7, "objects existence index", _object_index),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn):
+    """Bring the schema up to SCHEMA_VERSION; returns the versions applied (empty when current)."""
+    if schema_version(conn) >= SCHEMA_VERSION:
+        return []
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # Re-read under the write lock: another process may have migrated meanwhile.
+        current = schema_version(conn)
+        applied = []
+        for version, description, apply in MIGRATIONS:
+            if version <= current:
+                continue
+            logging.info("applying schema migration %s: %s", version, description)
+            apply(conn)
+            applied.append(version)
+        if applied:
+            conn.execute(f"PRAGMA user_version = {int(applied[-1])}")
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return applied
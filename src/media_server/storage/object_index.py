@@ -0,0 +1,255 @@
+"""Existence index of storage objects, fed by MinIO bucket notifications.
+
+MinIO posts ``s3:ObjectCreated:*`` and ``s3:ObjectRemoved:*`` events to
+``POST /storage/api/v1/events`` (handlers/storage_events.py). They are kept
+in the ``objects`` table under the exact storage key. An object key is
+resolved over the same candidates head_object tries (``head_candidates``):
+it exists when a fresh entry says any candidate exists, and is missing only
+when fresh entries say every candidate is gone. Anything else (cold or
+stale, i.e. older than ``ttl`` seconds) goes to a HEAD whose answer is
+written back. A missed removal therefore outlives its object by at most
+``ttl`` seconds.
+"""
+import asyncio
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+from urllib.parse import unquote_plus
+
+from ..utils import metrics
+from .key_layout import workspace_of
+from .s3_client import ObjectStat, head_candidates
+
+CREATED = "s3:ObjectCreated:"
+REMOVED = "s3:ObjectRemoved:"
+# S3 sequencers are hex strings that only compare within one key; left-padded
+# to this width they compare correctly as text in SQLite.
+SEQUENCER_WIDTH = 32
+
+
+@dataclass(frozen=True)
+class ObjectEvent:
+    object_key: str
+    present: bool
+    etag: Optional[str]
+    size: Optional[int]
+    sequencer: str
+
+
+def storage_workspace(bucket, storage_key):
+    """Workspace that owns a storage key, for shard routing; a ``bucket/`` prefix is not part of it."""
+    key = storage_key.lstrip("/")
+    bucket_prefix = f"{bucket}/"
+    return workspace_of(key[len(bucket_prefix) :] if key.startswith(bucket_prefix) else key)
+
+
+def _sequencer(value):
+    value = str(value or "").strip().lower()
+    return value.rjust(SEQUENCER_WIDTH, "0") if value else ""
+
+
+def parse_events(payload, bucket):
+    """ObjectEvents for ``bucket`` in a MinIO webhook body; other buckets and event types are skipped."""
+    events = []
+    records = payload.get("Records") if isinstance(payload, dict) else None
+    for record in records if isinstance(records, list) else []:
+        if not isinstance(record, dict):
+            continue
+        name = record.get("eventName") or ""
+        if name.startswith(CREATED):
+            present = True
+        elif name.startswith(REMOVED):
+            present = False
+        else:
+            continue
+        s3 = record.get("s3") or {}
+        if (s3.get("bucket") or {}).get("name") != bucket:
+            continue
+        obj = s3.get("object") or {}
+        # Keys arrive URL-encoded, spaces as '+'.
+        key = unquote_plus(str(obj.get("key") or "")).lstrip("/")
+        if not key:
+            continue
+        etag = obj.get("eTag") if present else None
+        size = obj.get("size") if present else None
+        events.append(
+            ObjectEvent(
+                object_key=key,
+                present=present,
+                etag=str(etag).strip('"') if etag else None,
+                size=size if isinstance(size, int) else None,
+                sequencer=_sequencer(obj.get("sequencer")),
+            )
+        )
+    return events
+
+
+class _Counters:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = dict.fromkeys(("events", "applied", "hits", "cold", "stale", "written_back"), 0)
+
+    def add(self, **counts):
+        with self._lock:
+            for name, count in counts.items():
+                self._values[name] += count
+
+    def snapshot(self):
+        with self._lock:
+            stats = dict(self._values)
+        lookups = stats["hits"] + stats["cold"] + stats["stale"]
+        stats["hit_ratio"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        return stats
+
+
+COUNTERS = _Counters()
+metrics.register("object_index", COUNTERS.snapshot)
+
+
+def _by_workspace(bucket, keys):
+    grouped = {}
+    for key in keys:
+        grouped.setdefault(storage_workspace(bucket, key), []).append(key)
+    return grouped
+
+
+class ObjectIndex:
+    """The ``objects`` table of ``db`` for one bucket; entries older than ``ttl`` seconds are not trusted."""
+
+    def __init__(self, db, bucket, ttl, clock=time.time):
+        self.db = db
+        self.bucket = bucket
+        self.ttl = ttl
+        self.clock = clock
+
+    @classmethod
+    def for_config(cls, db, storage_config):
+        """The index handlers should use, or None when bucket notifications are not set up."""
+        if not storage_config.events_token or storage_config.event_index_ttl <= 0:
+            return None
+        return cls(db, storage_config.bucket, storage_config.event_index_ttl)
+
+    def apply(self, events):
+        """Write notifications; returns ``{"received", "applied"}`` (the rest arrived out of order)."""
+        grouped = {}
+        for event in events:
+            grouped.setdefault(storage_workspace(self.bucket, event.object_key), []).append(
+                (event.object_key, event.present, event.etag, event.size, event.sequencer)
+            )
+        applied = sum(
+            self.db.apply_object_events(workspace_id, self.bucket, rows) for workspace_id, rows in grouped.items()
+        )
+        COUNTERS.add(events=len(events), applied=applied)
+        return {"received": len(events), "applied": applied}
+
+    def lookup(self, object_keys):
+        """``{object_key: ObjectStat or False}`` for keys the index can answer; the others need a HEAD."""
+        wanted = {key: head_candidates(self.bucket, key) for key in object_keys}
+        states = {}
+        storage_keys = {candidate for candidates in wanted.values() for candidate in candidates}
+        for workspace_id, keys in _by_workspace(self.bucket, storage_keys).items():
+            states.update(self.db.get_object_states(workspace_id, self.bucket, keys))
+        now = self.clock()
+        known = {}
+        cold = stale = 0
+        for key, candidates in wanted.items():
+            answer, unknown = False, None
+            for candidate in candidates:
+                state = states.get(candidate)
+                if state is None or now - state[3] >= self.ttl:
+                    unknown = unknown or ("cold" if state is None else "stale")
+                    continue
+                present, etag, size, _ = state
+                if present:
+                    answer, unknown = ObjectStat(etag=etag, size=size, key=candidate), None
+                    break
+            if unknown is None:
+                known[key] = answer
+            elif unknown == "cold":
+                cold += 1
+            else:
+                stale += 1
+        COUNTERS.add(hits=len(known), cold=cold, stale=stale)
+        return known
+
+    def record(self, results, checked_at):
+        """Write back HEAD answers from ``{object_key: ObjectStat/False/None}``; None (unknown) is skipped.
+
+        A miss means every candidate answered 404; a hit is recorded for the
+        storage key that answered, and says nothing about the other candidate.
+        """
+        checks = {}
+        for key, result in results.items():
+            if result is False:
+                for candidate in head_candidates(self.bucket, key):
+                    checks[candidate] = (False, None, None)
+            elif isinstance(result, ObjectStat) and result.key:
+                checks[result.key] = (True, result.etag, result.size)
+        for workspace_id, keys in _by_workspace(self.bucket, checks).items():
+            self.db.record_object_checks(
+                workspace_id, self.bucket, [(key, *checks[key]) for key in keys], checked_at
+            )
+        COUNTERS.add(written_back=len(checks))
+
+
+class IndexedStorage:
+    """The head_object / head_objects surface of an S3Client, answered from the index where it can be.
+
+    Results and errors follow S3Client's contract, so handlers use either
+    one interchangeably. With ``consult=False`` every key is HEADed and the
+    index is only written to: for upload-callback, whose object was just
+    written and whose created event may still be on its way. The async
+    methods read and write the index on ``executor`` (the loop's default
+    when None), never on the event loop itself.
+    """
+
+    def __init__(self, client, index, consult=True, executor=None):
+        self.client = client
+        self.index = index
+        self.consult = consult
+        self.executor = executor
+
+    def _known(self, object_keys):
+        return self.index.lookup(object_keys) if self.consult else {}
+
+    async def _off_loop(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    def head_object(self, object_key):
+        known = self._known([object_key])
+        if object_key in known:
+            return known[object_key]
+        checked_at = self.index.clock()
+        result = self.client.head_object(object_key)
+        self.index.record({object_key: result}, checked_at)
+        return result
+
+    async def head_object_async(self, object_key):
+        known = await self._off_loop(self._known, [object_key])
+        if object_key in known:
+            return known[object_key]
+        checked_at = self.index.clock()
+        result = await self.client.head_object_async(object_key)
+        await self._off_loop(self.index.record, {object_key: result}, checked_at)
+        return result
+
+    def head_objects(self, object_keys, parallelism=8, deadline=10.0):
+        known = self._known(object_keys)
+        checked_at = self.index.clock()
+        results = self.client.head_objects(
+            [key for key in object_keys if key not in known], parallelism=parallelism, deadline=deadline
+        )
+        self.index.record(results, checked_at)
+        results.update(known)
+        return results
+
+    async def head_objects_async(self, object_keys, parallelism=8, deadline=10.0):
+        known = await self._off_loop(self._known, object_keys)
+        checked_at = self.index.clock()
+        results = await self.client.head_objects_async(
+            [key for key in object_keys if key not in known], parallelism=parallelism, deadline=deadline
+        )
+        await self._off_loop(self.index.record, results, checked_at)
+        results.update(known)
+        return results
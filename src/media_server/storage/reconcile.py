@@ -0,0 +1,268 @@
+"""Stream object storage listings against media_files and report or fix the drift.
+
+Two kinds of drift:
+
+* ``missing_object``: a row whose object is gone. Fast-upload only notices
+  this when it HEADs the key.
+* ``orphan_object``: an object that no row points at, e.g. because the
+  upload-callback never arrived.
+
+Objects live under ``{workspace}/`` or, for some uploads, ``{bucket}/{workspace}/``.
+Per workspace, both layouts are listed with ListObjectsV2, one page at a time.
+Rows under the same prefixes are read in key order, in batches. All four
+streams are merge-joined on the key with the ``bucket/`` prefix stripped.
+Memory holds one listing page and one row batch per stream, whatever the
+bucket size.
+
+The position is a resume token naming the workspace and the last key done.
+Every storage request goes through a RateLimiter.
+"""
+import base64
+import calendar
+import heapq
+import itertools
+import json
+import logging
+import posixpath
+import time
+
+from .s3_client import head_candidates
+
+MISSING_OBJECT = "missing_object"
+ORPHAN_OBJECT = "orphan_object"
+# Fingerprint given to rows created for orphan objects; the real one is unknown.
+ADOPTED_FINGERPRINT_PREFIX = "reconciled:"
+
+_ROW, _OBJECT = 0, 1
+
+
+class RateLimiter:
+    """Spaces calls to ``wait()`` at least ``1 / rate`` seconds apart; ``rate <= 0`` disables it."""
+
+    def __init__(self, rate, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self._clock = clock
+        self._sleep = sleep
+        self._next = None
+        self.calls = 0
+
+    def wait(self):
+        self.calls += 1
+        if self.rate <= 0:
+            return
+        now = self._clock()
+        if self._next is not None and self._next > now:
+            self._sleep(self._next - now)
+            now = self._next
+        self._next = now + 1 / self.rate
+
+
+def encode_token(workspace_id, key):
+    """Resume token after ``key`` of ``workspace_id``; key None marks the workspace done."""
+    raw = json.dumps([workspace_id, key], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_token(token):
+    try:
+        workspace_id, key = json.loads(base64.urlsafe_b64decode(token.encode("ascii")))
+    except (ValueError, TypeError) as exc:
+        raise ValueError(f"invalid resume token: {token!r}") from exc
+    return workspace_id, key
+
+
+def _parse_last_modified(value):
+    try:
+        return calendar.timegm(time.strptime(value[:19], "%Y-%m-%dT%H:%M:%S"))
+    except (TypeError, ValueError):
+        return None
+
+
+class Reconciler:
+    """Merge-joins storage listings with media_files for each workspace.
+
+    ``fix_missing`` deletes a row once a fresh HEAD confirms its object is
+    gone. ``fix_orphans`` adds a row for each orphan object older than
+    ``orphan_grace`` seconds; younger ones may still be waiting for their
+    upload-callback. Adopted rows get a ``reconciled:<key>`` fingerprint
+    because the real one is unknown.
+    """
+
+    def __init__(
+        self,
+        db,
+        client,
+        bucket,
+        rate=20.0,
+        page_size=1000,
+        fix_missing=False,
+        fix_orphans=False,
+        orphan_grace=3600.0,
+        clock=time.time,
+        limiter=None,
+    ):
+        self._db = db
+        self._client = client
+        self.bucket = bucket
+        self.page_size = page_size
+        self.fix_missing = fix_missing
+        self.fix_orphans = fix_orphans
+        self.orphan_grace = orphan_grace
+        self._clock = clock
+        self._limiter = limiter or RateLimiter(rate)
+        self._bucket_prefix = f"{bucket}/"
+
+    def _list(self, prefix, start_after=None, delimiter=None):
+        """Yield ListObjectsV2 pages under ``prefix``, one throttled request each."""
+        token = None
+        while True:
+            self._limiter.wait()
+            page = self._client.list_objects(
+                prefix,
+                continuation_token=token,
+                start_after=start_after,
+                delimiter=delimiter,
+                max_keys=self.page_size,
+            )
+            yield page
+            if page.next_token is None:
+                return
+            token = page.next_token
+
+    def workspaces(self):
+        """Workspaces with rows, plus top-level storage prefixes under either layout."""
+        found = set(self._db.list_workspaces())
+        for prefix in ("", self._bucket_prefix):
+            for page in self._list(prefix, delimiter="/"):
+                for common in page.prefixes:
+                    name = common[len(prefix) :].rstrip("/")
+                    if name and not (prefix == "" and name == self.bucket):
+                        found.add(name)
+        return sorted(found)
+
+    def _layouts(self, workspace_id):
+        # (physical prefix, part stripped to get the normalized key)
+        return ((f"{workspace_id}/", ""), (f"{self._bucket_prefix}{workspace_id}/", self._bucket_prefix))
+
+    def _objects(self, prefix, strip, after):
+        start_after = f"{strip}{after}" if after is not None else None
+        for page in self._list(prefix, start_after=start_after):
+            for listed in page.objects:
+                yield listed.key[len(strip) :], _OBJECT, listed
+
+    def _rows(self, workspace_id, prefix, strip, after):
+        rows = self._db.iter_object_keys(
+            workspace_id,
+            prefix,
+            after=f"{strip}{after}" if after is not None else None,
+            batch_size=self.page_size,
+        )
+        for object_key, fingerprint in rows:
+            yield object_key[len(strip) :], _ROW, (object_key, fingerprint)
+
+    def run(self, workspaces=None, resume=None, on_drift=None, on_checkpoint=None, checkpoint_every=1000):
+        """Reconcile ``workspaces`` (default: all) in sorted order; returns counters.
+
+        ``resume`` is a token from an earlier run. ``on_drift(entry)`` gets each
+        drift as it is found. ``on_checkpoint(token)`` gets a resume token
+        every ``checkpoint_every`` keys and after each workspace.
+        """
+        stats = {
+            "workspaces": 0,
+            "rows": 0,
+            "objects": 0,
+            MISSING_OBJECT: 0,
+            ORPHAN_OBJECT: 0,
+            "deleted": 0,
+            "adopted": 0,
+            "requests": 0,
+        }
+        calls_before = self._limiter.calls
+        resume_workspace, resume_key = decode_token(resume) if resume else (None, None)
+        for workspace_id in sorted(workspaces) if workspaces is not None else self.workspaces():
+            if resume_workspace is not None and workspace_id < resume_workspace:
+                continue
+            after = None
+            if workspace_id == resume_workspace:
+                if resume_key is None:
+                    continue
+                after = resume_key
+            self._reconcile_workspace(workspace_id, after, stats, on_drift, on_checkpoint, checkpoint_every)
+            stats["workspaces"] += 1
+            if on_checkpoint is not None:
+                on_checkpoint(encode_token(workspace_id, None))
+        stats["requests"] = self._limiter.calls - calls_before
+        return stats
+
+    def _reconcile_workspace(self, workspace_id, after, stats, on_drift, on_checkpoint, checkpoint_every):
+        streams = []
+        for prefix, strip in self._layouts(workspace_id):
+            streams.append(self._objects(prefix, strip, after))
+            streams.append(self._rows(workspace_id, prefix, strip, after))
+        merged = heapq.merge(*streams, key=lambda entry: entry[0])
+        for done, (key, group) in enumerate(itertools.groupby(merged, key=lambda entry: entry[0]), start=1):
+            rows, objects = [], []
+            for _, source, payload in group:
+                (rows if source == _ROW else objects).append(payload)
+            stats["rows"] += len(rows)
+            stats["objects"] += len(objects)
+            for entry in self._drift(workspace_id, rows, objects):
+                stats[entry["kind"]] += 1
+                self._fix(entry, stats)
+                if on_drift is not None:
+                    on_drift(entry)
+            if on_checkpoint is not None and done % checkpoint_every == 0:
+                on_checkpoint(encode_token(workspace_id, key))
+
+    def _drift(self, workspace_id, rows, objects):
+        """Drift within one normalized key, following the HEAD fallback rules."""
+        listed = {obj.key for obj in objects}
+        claimed = set()
+        for object_key, fingerprint in rows:
+            candidates = head_candidates(self.bucket, object_key)
+            claimed.update(candidates)
+            if not listed.intersection(candidates):
+                yield {"kind": MISSING_OBJECT, "workspace_id": workspace_id, "object_key": object_key, "fingerprint": fingerprint}
+        for obj in objects:
+            if obj.key not in claimed:
+                yield {
+                    "kind": ORPHAN_OBJECT,
+                    "workspace_id": workspace_id,
+                    "object_key": obj.key,
+                    "etag": obj.etag,
+                    "size": obj.size,
+                    "last_modified": obj.last_modified,
+                }
+
+    def _fix(self, entry, stats):
+        entry["fixed"] = False
+        if entry["kind"] == MISSING_OBJECT and self.fix_missing:
+            # The listing may be minutes old by now; only delete what is still gone.
+            self._limiter.wait()
+            try:
+                exists = self._client.head_object(entry["object_key"])
+            except RuntimeError as exc:
+                logging.warning("reconcile: HEAD %s failed, row kept: %s", entry["object_key"], exc)
+                return
+            if not exists:
+                self._db.delete_by_fingerprint(entry["workspace_id"], entry["fingerprint"])
+                stats["deleted"] += 1
+                entry["fixed"] = True
+        elif entry["kind"] == ORPHAN_OBJECT and self.fix_orphans:
+            modified = _parse_last_modified(entry["last_modified"])
+            if modified is None or self._clock() - modified < self.orphan_grace:
+                return
+            object_key = entry["object_key"]
+            self._db.upsert_file(
+                entry["workspace_id"],
+                f"{ADOPTED_FINGERPRINT_PREFIX}{object_key}",
+                None,
+                object_key,
+                posixpath.basename(object_key),
+                None,
+                verified_at=self._clock(),
+                etag=entry["etag"],
+                size=entry["size"],
+            )
+            stats["adopted"] += 1
+            entry["fixed"] = True
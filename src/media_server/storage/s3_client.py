@@ -1,51 +1,529 @@
-from urllib.error import HTTPError, URLError
+import asyncio
+import http.client
+import logging
+import os
+import threading
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import List, Optional
 from urllib.parse import quote, urlparse
-from urllib.request import Request, urlopen
 
-from ..utils.aws_sigv4 import aws_v4_headers
+from ..utils import aio_http, metrics, singleflight
+from ..utils.aws_sigv4 import SigV4Signer
+from .circuit_breaker import CircuitBreaker, CircuitOpenError
+from .hedging import HedgePolicy
+from .http_pool import HTTPConnectionPool, PoolExhausted
+from .key_layout import KeyLayouts
+
+HEAD_TIMEOUT = 5
+# Breaker label for a 5xx answer; the status itself stays in the log only.
+HTTP_STATUS_FAILURE = "HTTPStatus"
+# Retries and overlapping syncs HEAD the same key at the same time; they share one request.
+_HEADS = singleflight.group("storage_head")
+
+
+@dataclass(frozen=True)
+class ObjectStat:
+    """What a successful HEAD tells us about an object; always truthy.
+
+    ``key`` is the storage key that answered (one of ``head_candidates``).
+    """
+
+    etag: Optional[str]
+    size: Optional[int]
+    key: Optional[str] = field(default=None, compare=False)
+
+    @classmethod
+    def from_headers(cls, headers, key=None):
+        etag = headers.get("ETag")
+        length = headers.get("Content-Length")
+        return cls(
+            etag=etag.strip('"') if etag else None,
+            size=int(length) if length and length.isdigit() else None,
+            key=key,
+        )
+
+
+def stat_fields(result):
+    """``(etag, size)`` of a head_object result; plain True (no metadata) gives ``(None, None)``."""
+    if isinstance(result, ObjectStat):
+        return result.etag, result.size
+    return None, None
+
+
+@dataclass(frozen=True)
+class ListedObject:
+    key: str
+    etag: Optional[str]
+    size: Optional[int]
+    last_modified: str
+
+
+@dataclass(frozen=True)
+class ListPage:
+    """One ListObjectsV2 response; ``next_token`` is None on the last page."""
+
+    objects: List[ListedObject]
+    prefixes: List[str]
+    next_token: Optional[str]
 
 
 def _encode_path(path):
     return quote(path, safe="/-_.~")
 
 
+def _log_rejected(count):
+    if count:
+        logging.warning("%s head checks skipped: object storage circuit open", count)
+
+
+def head_candidates(bucket, object_key):
+    """Keys that may hold ``object_key``: as given, and under a ``bucket/`` prefix unless it has one."""
+    bucket_prefix = f"{bucket}/"
+    candidates = [object_key.lstrip("/")]
+    if not object_key.startswith(bucket_prefix):
+        candidates.append(f"{bucket_prefix}{object_key.lstrip('/')}")
+    return candidates
+
+
+def _canonical_query(params):
+    return "&".join(
+        f"{quote(name, safe='-_.~')}={quote(str(value), safe='-_.~')}"
+        for name, value in sorted(params.items())
+        if value is not None
+    )
+
+
+def _xml_text(element, name, namespace):
+    child = element.find(f"{namespace}{name}")
+    return child.text if child is not None and child.text is not None else None
+
+
+def parse_list_page(body):
+    root = ET.fromstring(body)
+    namespace = root.tag[: root.tag.index("}") + 1] if root.tag.startswith("{") else ""
+    objects = []
+    for item in root.iter(f"{namespace}Contents"):
+        etag = _xml_text(item, "ETag", namespace)
+        size = _xml_text(item, "Size", namespace)
+        objects.append(
+            ListedObject(
+                key=_xml_text(item, "Key", namespace) or "",
+                etag=etag.strip('"') if etag else None,
+                size=int(size) if size and size.isdigit() else None,
+                last_modified=_xml_text(item, "LastModified", namespace) or "",
+            )
+        )
+    prefixes = [
+        _xml_text(item, "Prefix", namespace) or "" for item in root.iter(f"{namespace}CommonPrefixes")
+    ]
+    truncated = (_xml_text(root, "IsTruncated", namespace) or "").lower() == "true"
+    next_token = _xml_text(root, "NextContinuationToken", namespace) if truncated else None
+    return ListPage(objects=objects, prefixes=prefixes, next_token=next_token)
+
+
 class S3Client:
+    """Signed HEAD and list requests against one storage endpoint over pooled keep-alive connections.
+
+    Use ``S3Client.shared(storage_config)`` from request handlers so every
+    request in the process reuses the same connections.
+    """
+
+    _shared = {}
+    _shared_lock = threading.Lock()
+
     def __init__(self, storage_config):
         self._storage = storage_config
         parsed = urlparse(storage_config.endpoint)
         if not parsed.scheme or not parsed.netloc:
             raise RuntimeError(f"invalid storage endpoint: {storage_config.endpoint}")
         self._endpoint = parsed
+        self._signer = SigV4Signer(storage_config.access_key, storage_config.secret_key, storage_config.region, "s3")
+        self._pool = HTTPConnectionPool(
+            parsed,
+            size=storage_config.pool_size,
+            idle_timeout=storage_config.pool_idle_timeout,
+            timeout=HEAD_TIMEOUT,
+        )
+        self._async_pool = None
+        self._async_loop = None
+        self.breaker = CircuitBreaker(
+            "object storage",
+            failure_threshold=storage_config.breaker_failures,
+            reset_timeout=storage_config.breaker_reset,
+            half_open_probes=storage_config.breaker_probes,
+        )
+        self.layouts = KeyLayouts(storage_config.bucket, learn_after=storage_config.layout_learn_after)
+        self.hedge = HedgePolicy(percentile=storage_config.hedge_percentile, budget=storage_config.hedge_budget)
+        self._hedge_executor = None
+        self._hedge_lock = threading.Lock()
+        self._hedge_in_flight = 0
 
-    def head_object(self, object_key):
-        bucket_prefix = f"{self._storage.bucket}/"
-        candidates = [object_key.lstrip("/")]
-        if not object_key.startswith(bucket_prefix):
-            candidates.append(f"{bucket_prefix}{object_key.lstrip('/')}")
-
-        for candidate in candidates:
-            path = f"/{self._storage.bucket}/{candidate}"
-            canonical_uri = _encode_path(path)
-            url = f"{self._endpoint.scheme}://{self._endpoint.netloc}{canonical_uri}"
-            headers = aws_v4_headers(
-                self._storage.access_key,
-                self._storage.secret_key,
-                self._storage.region,
-                "s3",
-                "HEAD",
-                self._endpoint.netloc,
-                canonical_uri,
-                b"",
+    @classmethod
+    def shared(cls, storage_config):
+        # Keyed by pid as well: a forked worker must not inherit its parent's sockets.
+        key = (cls, storage_config, os.getpid())
+        with cls._shared_lock:
+            client = cls._shared.get(key)
+            if client is None:
+                client = cls(storage_config)
+                cls._shared[key] = client
+                metrics.register("s3_pool", client.pool_stats)
+                metrics.register("storage_breaker", client.breaker.stats)
+                metrics.register("storage_layout", client.layouts.stats)
+                metrics.register("storage_hedge", client.hedge.stats)
+            return client
+
+    def pool_stats(self):
+        stats = {"sync": self._pool.stats()}
+        if self._async_pool is not None:
+            stats["async"] = self._async_pool.stats()
+        return stats
+
+    def close(self):
+        if self._hedge_executor is not None:
+            self._hedge_executor.shutdown(wait=False)
+        self._pool.close()
+        # Streams can only be closed on their own loop; a finished loop already dropped them.
+        if self._async_pool is not None and not self._async_loop.is_closed():
+            self._async_pool.close()
+
+    def _get_async_pool(self):
+        loop = asyncio.get_running_loop()
+        if self._async_loop is not loop:
+            self._async_pool = aio_http.AsyncConnectionPool(
+                self._endpoint,
+                size=self._storage.pool_size,
+                idle_timeout=self._storage.pool_idle_timeout,
+            )
+            self._async_loop = loop
+        return self._async_pool
+
+    # Every storage round trip goes through the breaker. Transport errors and
+    # 5xx answers count as failures; 404 and other answers show storage is up.
+    # PoolExhausted is local back-pressure and says nothing either way.
+
+    def _request(self, method, path, headers, slot_timeout=None, on_start=None):
+        if not self.breaker.allow():
+            raise CircuitOpenError("object storage unavailable (circuit open)")
+        try:
+            status, response_headers, body = self._pool.request(
+                method, path, headers, slot_timeout=slot_timeout, on_start=on_start
             )
-            headers["host"] = self._endpoint.netloc
-            req = Request(url, headers=headers, method="HEAD")
+        except (OSError, http.client.HTTPException) as exc:
+            self.breaker.record_failure(exc)
+            raise
+        if status >= 500:
+            self.breaker.record_failure(HTTP_STATUS_FAILURE)
+        else:
+            self.breaker.record_success()
+        return status, response_headers, body
+
+    async def _request_async(self, method, path, headers, on_start=None):
+        pool = self._get_async_pool()
+        if not self.breaker.allow():
+            raise CircuitOpenError("object storage unavailable (circuit open)")
+        try:
+            result = await pool.request(method, path, headers, timeout=HEAD_TIMEOUT, on_start=on_start)
+        except aio_http.AsyncHTTPError as exc:
+            if exc.status >= 500:
+                self.breaker.record_failure(HTTP_STATUS_FAILURE)
+            else:
+                self.breaker.record_success()
+            raise
+        except (OSError, asyncio.TimeoutError) as exc:
+            self.breaker.record_failure(exc)
+            raise
+        self.breaker.record_success()
+        return result
+
+    # Hedging: a HEAD still unanswered after the policy's delay gets a second
+    # copy on another pooled connection, and the first answer wins. The delay
+    # and the latency samples both run from the moment a request is sent:
+    # time spent queueing for a hedge thread or a pooled connection is local
+    # back-pressure, which a second copy would only add to. For the same
+    # reason no hedge is sent while the threads or connections are all busy.
+
+    def _timed_head(self, canonical_uri, headers, slot_timeout=None, started=None):
+        sent = []
+
+        def on_start():
+            sent.append(time.monotonic())
+            if started is not None:
+                started.set()
+
+        try:
+            result = self._request("HEAD", canonical_uri, headers, slot_timeout=slot_timeout, on_start=on_start)
+        finally:
+            # Also release a waiter when the request failed before it was sent.
+            if started is not None:
+                started.set()
+        self.hedge.observe(time.monotonic() - sent[0])
+        return result
+
+    def _get_hedge_executor(self):
+        with self._hedge_lock:
+            if self._hedge_executor is None:
+                self._hedge_executor = ThreadPoolExecutor(
+                    max_workers=2 * self._pool.size, thread_name_prefix="storage-hedge"
+                )
+            return self._hedge_executor
+
+    def _submit_head(self, *args):
+        executor = self._get_hedge_executor()
+        with self._hedge_lock:
+            self._hedge_in_flight += 1
+        future = executor.submit(self._timed_head, *args)
+        future.add_done_callback(self._head_finished)
+        return future
+
+    def _head_finished(self, _future):
+        with self._hedge_lock:
+            self._hedge_in_flight -= 1
+
+    def _hedge_saturated(self):
+        with self._hedge_lock:
+            busy = self._hedge_in_flight >= 2 * self._pool.size
+        return busy or self._pool.saturated()
+
+    def _head_request(self, canonical_uri, headers):
+        if not self.hedge.enabled:
+            return self._request("HEAD", canonical_uri, headers)
+        self.hedge.start()
+        delay = self.hedge.delay()
+        if delay is None:
+            return self._timed_head(canonical_uri, headers)
+        started = threading.Event()
+        primary = self._submit_head(canonical_uri, headers, None, started)
+        started.wait()
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            return primary.result()
+        if self._hedge_saturated():
+            self.hedge.skip_saturated()
+            return primary.result()
+        if not self.hedge.try_hedge():
+            return primary.result()
+        hedge = self._submit_head(canonical_uri, headers, 0)
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    result = future.result()
+                except PoolExhausted as exc:
+                    if future is hedge:
+                        self.hedge.cancel_hedge()
+                        continue
+                    error = error or exc
+                    continue
+                except Exception as exc:
+                    error = error or exc
+                    continue
+                if future is hedge:
+                    self.hedge.hedge_won()
+                # The loser finishes in the background and returns its connection to the pool.
+                return result
+        raise error
+
+    async def _timed_head_async(self, canonical_uri, headers, started=None):
+        sent = []
+
+        def on_start():
+            sent.append(time.monotonic())
+            if started is not None:
+                started.set()
+
+        try:
+            result = await self._request_async("HEAD", canonical_uri, headers, on_start=on_start)
+        except aio_http.AsyncHTTPError:
+            self.hedge.observe(time.monotonic() - sent[0])
+            raise
+        finally:
+            if started is not None:
+                started.set()
+        self.hedge.observe(time.monotonic() - sent[0])
+        return result
+
+    async def _head_request_async(self, canonical_uri, headers):
+        if not self.hedge.enabled:
+            return await self._request_async("HEAD", canonical_uri, headers)
+        self.hedge.start()
+        delay = self.hedge.delay()
+        if delay is None:
+            return await self._timed_head_async(canonical_uri, headers)
+        started = asyncio.Event()
+        primary = asyncio.ensure_future(self._timed_head_async(canonical_uri, headers, started))
+        pending = {primary}
+        try:
+            await started.wait()
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if done:
+                return await primary
+            if self._get_async_pool().saturated():
+                self.hedge.skip_saturated()
+                return await primary
+            if not self.hedge.try_hedge():
+                return await primary
+            hedge = asyncio.ensure_future(self._timed_head_async(canonical_uri, headers))
+            pending.add(hedge)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    exc = task.exception()
+                    # An HTTP error status (404 above all) is an answer, not a failure.
+                    if exc is None or isinstance(exc, aio_http.AsyncHTTPError):
+                        if task is hedge:
+                            self.hedge.hedge_won()
+                        return task.result()
+                    error = error or exc
+            raise error
+        finally:
+            # Cancelling closes the loser's stream instead of reading an answer nobody wants.
+            for task in pending:
+                task.cancel()
+
+    def _signed_head(self, candidate):
+        path = f"/{self._storage.bucket}/{candidate}"
+        canonical_uri = _encode_path(path)
+        headers = self._signer.headers("HEAD", self._endpoint.netloc, canonical_uri)
+        headers["host"] = self._endpoint.netloc
+        return canonical_uri, headers
+
+    def list_objects(self, prefix="", continuation_token=None, start_after=None, delimiter=None, max_keys=1000):
+        """One ListObjectsV2 page of keys under ``prefix``, in key order."""
+        params = {
+            "continuation-token": continuation_token,
+            "delimiter": delimiter,
+            "list-type": "2",
+            "max-keys": str(max_keys),
+            "prefix": prefix,
+            "start-after": start_after if continuation_token is None else None,
+        }
+        query = _canonical_query(params)
+        canonical_uri = _encode_path(f"/{self._storage.bucket}")
+        headers = self._signer.headers("GET", self._endpoint.netloc, canonical_uri, query=query)
+        headers["host"] = self._endpoint.netloc
+        try:
+            status, _, body = self._request("GET", f"{canonical_uri}?{query}", headers)
+        except (OSError, http.client.HTTPException, PoolExhausted) as exc:
+            raise RuntimeError(f"list objects failed: {exc!r}") from exc
+        if status != 200:
+            raise RuntimeError(f"list objects failed {status}")
+        try:
+            return parse_list_page(body)
+        except ET.ParseError as exc:
+            raise RuntimeError(f"list objects returned invalid XML: {exc}") from exc
+
+    def head_object(self, object_key):
+        """Return an ``ObjectStat`` when the object exists under either key layout, else False.
+
+        The workspace's learned layout (see ``self.layouts``) is tried first;
+        False means every candidate answered 404.
+
+        Concurrent calls for the same key share one request and its outcome.
+        """
+        return _HEADS.do((self._storage, object_key), lambda: self._head_object(object_key))
+
+    def _head_object(self, object_key):
+        candidates = self.layouts.candidates(object_key)
+        for position, (layout, candidate) in enumerate(candidates):
+            canonical_uri, headers = self._signed_head(candidate)
+            self.layouts.record_probe(position)
+            try:
+                status, response_headers, _ = self._head_request(canonical_uri, headers)
+            except (OSError, http.client.HTTPException, PoolExhausted) as exc:
+                raise RuntimeError(f"head object failed: {exc!r}") from exc
+            if status == 404:
+                continue
+            if status >= 400:
+                raise RuntimeError(f"head object failed {status}")
+            if status != 200:
+                return False
+            self.layouts.record_hit(object_key, layout)
+            return ObjectStat.from_headers(response_headers, key=candidate)
+        return False
+
+    async def head_object_async(self, object_key):
+        """Awaitable ``head_object`` for the asyncio engine; same candidates, coalescing and error contract."""
+        return await _HEADS.do_async((self._storage, object_key), lambda: self._head_object_async(object_key))
+
+    async def _head_object_async(self, object_key):
+        candidates = self.layouts.candidates(object_key)
+        for position, (layout, candidate) in enumerate(candidates):
+            canonical_uri, headers = self._signed_head(candidate)
+            self.layouts.record_probe(position)
             try:
-                with urlopen(req, timeout=5) as resp:
-                    return resp.status == 200
-            except HTTPError as exc:
-                if exc.code == 404:
+                status, response_headers, _ = await self._head_request_async(canonical_uri, headers)
+            except aio_http.AsyncHTTPError as exc:
+                if exc.status == 404:
                     continue
-                raise RuntimeError(f"head object failed {exc.code}") from exc
-            except URLError as exc:
-                raise RuntimeError(f"head object failed: {exc}") from exc
+                raise RuntimeError(f"head object failed {exc.status}") from exc
+            except (OSError, asyncio.TimeoutError) as exc:
+                raise RuntimeError(f"head object failed: {exc!r}") from exc
+            if status != 200:
+                return False
+            self.layouts.record_hit(object_key, layout)
+            return ObjectStat.from_headers(response_headers, key=candidate)
         return False
+
+    def head_objects(self, object_keys, parallelism=8, deadline=10.0):
+        """HEAD many keys concurrently; returns ``{key: ObjectStat/False/None}``.
+
+        At most ``parallelism`` requests are in flight. Keys still unanswered
+        after ``deadline`` seconds, and keys whose check failed, map to None
+        (unknown): an unreachable storage must never read as a missing object.
+        """
+        unique_keys = list(dict.fromkeys(object_keys))
+        results = dict.fromkeys(unique_keys)
+        if not unique_keys:
+            return results
+        executor = ThreadPoolExecutor(max_workers=max(1, min(parallelism, len(unique_keys))))
+        try:
+            futures = {executor.submit(self.head_object, key): key for key in unique_keys}
+            done, _ = wait(futures, timeout=deadline)
+            rejected = 0
+            for future in done:
+                key = futures[future]
+                try:
+                    results[key] = future.result()
+                except CircuitOpenError:
+                    rejected += 1
+                except RuntimeError as exc:
+                    logging.error("head check failed key=%s: %s", key, exc)
+            _log_rejected(rejected)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        return results
+
+    async def head_objects_async(self, object_keys, parallelism=8, deadline=10.0):
+        """Awaitable ``head_objects`` with the same bounds and result contract."""
+        unique_keys = list(dict.fromkeys(object_keys))
+        results = dict.fromkeys(unique_keys)
+        if not unique_keys:
+            return results
+        semaphore = asyncio.Semaphore(max(1, parallelism))
+
+        async def _check(key):
+            async with semaphore:
+                return await self.head_object_async(key)
+
+        tasks = {asyncio.ensure_future(_check(key)): key for key in unique_keys}
+        done, pending = await asyncio.wait(tasks, timeout=deadline)
+        for task in pending:
+            task.cancel()
+        rejected = 0
+        for task in done:
+            key = tasks[task]
+            try:
+                results[key] = task.result()
+            except CircuitOpenError:
+                rejected += 1
+            except RuntimeError as exc:
+                logging.error("head check failed key=%s: %s", key, exc)
+        _log_rejected(rejected)
+        return results
@@ -0,0 +1,191 @@
+"""Hash-sharded media.db: each workspace_id lives in one of N SQLite files.
+
+Every shard is a full MediaDB with its own writer connection and reader
+pool, so uploads to different shards never wait on each other's write lock.
+Shard files sit next to the configured path as ``media.shard-3-of-8.db``;
+the shard count is part of the name so that reopening with a different
+``--db-shards`` fails loudly instead of silently routing to empty files.
+Turning sharding on over a populated single media.db that was never split
+fails the same way.
+"""
+import glob
+import os
+import re
+import sqlite3
+import zlib
+
+from ..utils import metrics
+from .bloom import MembershipFilter
+from .db import DEFAULT_MMAP_SIZE, MediaDB
+
+
+def shard_index(workspace_id, shards):
+    # crc32 rather than hash(): routing must agree across processes and restarts.
+    return zlib.crc32(workspace_id.encode("utf-8")) % shards
+
+
+def shard_path(db_path, index, shards):
+    stem, suffix = os.path.splitext(db_path)
+    return f"{stem}.shard-{index}-of-{shards}{suffix or '.db'}"
+
+
+def shard_paths(db_path, shards):
+    return [shard_path(db_path, index, shards) for index in range(shards)]
+
+
+def existing_shard_counts(db_path):
+    """Shard counts that have files next to ``db_path``."""
+    stem, suffix = os.path.splitext(db_path)
+    pattern = re.compile(re.escape(os.path.basename(stem)) + r"\.shard-\d+-of-(\d+)" + re.escape(suffix or ".db") + "$")
+    counts = set()
+    for path in glob.glob(f"{glob.escape(stem)}.shard-*-of-*{suffix or '.db'}"):
+        match = pattern.match(os.path.basename(path))
+        if match:
+            counts.add(int(match.group(1)))
+    return counts
+
+
+def has_unsplit_rows(db_path):
+    """True when the single-file ``db_path`` holds uploaded files."""
+    if not os.path.exists(db_path):
+        return False
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        return conn.execute("SELECT 1 FROM media_files LIMIT 1").fetchone() is not None
+    except sqlite3.OperationalError:
+        # No media_files table: nothing was ever stored there.
+        return False
+    finally:
+        conn.close()
+
+
+def open_media_db(db_path, shards=0, **kwargs):
+    """MediaDB for ``shards <= 1``, otherwise a ShardedMediaDB over ``shards`` files."""
+    if shards and shards > 1:
+        return ShardedMediaDB(db_path, shards, **kwargs)
+    return MediaDB(db_path, **kwargs)
+
+
+def _routed(name):
+    def method(self, workspace_id, *args, **kwargs):
+        return getattr(self.shard_for(workspace_id), name)(workspace_id, *args, **kwargs)
+
+    method.__name__ = name
+    method.__doc__ = f"MediaDB.{name} on the shard that owns ``workspace_id``."
+    return method
+
+
+class ShardedMediaDB:
+    """MediaDB facade that routes every workspace-scoped call to its shard.
+
+    Callers that need a transaction take it from ``shard_for(workspace_id)``;
+    a ``conn`` from that transaction may be passed back into the routed
+    methods for the same workspace.
+    """
+
+    ROUTED_METHODS = (
+        "upsert_file",
+        "upsert_fingerprint_tiny",
+        "get_object_by_fingerprint",
+        "get_object_key_by_fingerprint",
+        "get_object_key_by_tiny",
+        "get_objects_by_tiny",
+        "get_object_keys_by_tiny",
+        "get_verified_at_by_fingerprint",
+        "get_tiny_by_fingerprint",
+        "mark_verified",
+        "mark_verified_by_tiny_many",
+        "delete_by_fingerprint",
+        "delete_by_tiny",
+        "delete_by_tiny_many",
+        "iter_object_keys",
+        "set_key_layout",
+        "apply_object_events",
+        "record_object_checks",
+        "get_object_states",
+    )
+
+    def __init__(
+        self,
+        path,
+        shards,
+        pool_size=4,
+        busy_timeout_ms=5000,
+        init_schema=True,
+        checkout_timeout=5.0,
+        mmap_size=DEFAULT_MMAP_SIZE,
+    ):
+        others = existing_shard_counts(path) - {shards}
+        if others:
+            raise RuntimeError(
+                f"{path} already has shard files for --db-shards={sorted(others)}; "
+                f"re-split it with scripts/split_media_db.py before switching to {shards}"
+            )
+        if not any(os.path.exists(shard) for shard in shard_paths(path, shards)) and has_unsplit_rows(path):
+            raise RuntimeError(
+                f"{path} holds uploaded files but has no shard files for --db-shards={shards}; "
+                f"split it with scripts/split_media_db.py first"
+            )
+        self.path = path
+        self._filter = None
+        self._shards = []
+        try:
+            for shard in shard_paths(path, shards):
+                self._shards.append(
+                    MediaDB(
+                        shard,
+                        pool_size=pool_size,
+                        busy_timeout_ms=busy_timeout_ms,
+                        init_schema=init_schema,
+                        checkout_timeout=checkout_timeout,
+                        mmap_size=mmap_size,
+                    )
+                )
+        except Exception:
+            self.close()
+            raise
+        ready = [shard.schema_ready_ms for shard in self._shards if shard.schema_ready_ms is not None]
+        self.schema_ready_ms = sum(ready) if ready else None
+
+    @property
+    def shards(self):
+        return list(self._shards)
+
+    def shard_for(self, workspace_id):
+        return self._shards[shard_index(workspace_id, len(self._shards))]
+
+    def invalidate_verified(self, workspace_id=None, older_than=None, conn=None):
+        if workspace_id is not None:
+            return self.shard_for(workspace_id).invalidate_verified(workspace_id, older_than, conn=conn)
+        return sum(shard.invalidate_verified(None, older_than) for shard in self._shards)
+
+    def list_workspaces(self):
+        return sorted({workspace_id for shard in self._shards for workspace_id in shard.list_workspaces()})
+
+    def get_key_layouts(self, bucket):
+        layouts = {}
+        for shard in self._shards:
+            layouts.update(shard.get_key_layouts(bucket))
+        return layouts
+
+    def enable_membership_filter(self, fp_rate=0.01):
+        # One filter for all shards: it is already partitioned per workspace.
+        membership = MembershipFilter(fp_rate)
+        membership.load(row for shard in self._shards for row in shard._membership_rows())
+        for shard in self._shards:
+            shard._filter = membership
+        self._filter = membership
+        metrics.register("membership_filter", membership.stats)
+        return membership
+
+    def pool_stats(self):
+        return {os.path.basename(shard.path): shard.pool_stats() for shard in self._shards}
+
+    def close(self):
+        for shard in self._shards:
+            shard.close()
+
+
+for _name in ShardedMediaDB.ROUTED_METHODS:
+    setattr(ShardedMediaDB, _name, _routed(_name))
+del _name
@@ -1,13 +1,21 @@
+import asyncio
 import uuid
+from functools import lru_cache
 from datetime import datetime, timezone
 from urllib.error import HTTPError, URLError
 from urllib.parse import urlencode, urlparse
 from urllib.request import Request, urlopen
 
-from ..utils.aws_sigv4 import aws_v4_headers
+from ..utils import aio_http
+from ..utils.aws_sigv4 import SigV4Signer
 
 
-def fetch_minio_sts(storage_config, sts_config, workspace_id):
+@lru_cache(maxsize=8)
+def _sts_signer(access_key, secret_key, region):
+    return SigV4Signer(access_key, secret_key, region, "sts")
+
+
+def _build_sts_request(storage_config, sts_config, workspace_id):
     endpoint = urlparse(storage_config.endpoint)
     if not endpoint.scheme or not endpoint.netloc:
         raise RuntimeError(f"invalid storage endpoint: {storage_config.endpoint}")
@@ -26,11 +34,8 @@ def fetch_minio_sts(storage_config, sts_config, workspace_id):
 
     body = urlencode(params).encode("utf-8")
     host = endpoint.netloc
-    headers = aws_v4_headers(
-        storage_config.access_key,
-        storage_config.secret_key,
-        storage_config.region,
-        "sts",
+    signer = _sts_signer(storage_config.access_key, storage_config.secret_key, storage_config.region)
+    headers = signer.headers(
         "POST",
         host,
         endpoint.path or "/",
@@ -38,7 +43,18 @@ def fetch_minio_sts(storage_config, sts_config, workspace_id):
         {"content-type": "application/x-www-form-urlencoded"},
     )
     headers["content-type"] = "application/x-www-form-urlencoded"
+    return endpoint, body, headers
+
+
+def _credentials_from_response(raw):
+    access_key, secret_key, session_token, expire_seconds = parse_sts_response(raw)
+    if not (access_key and secret_key and session_token):
+        raise RuntimeError(f"incomplete sts response: {raw.decode('utf-8', errors='ignore')}")
+    return session_token, access_key, secret_key, expire_seconds
 
+
+def fetch_minio_sts(storage_config, sts_config, workspace_id):
+    _, body, headers = _build_sts_request(storage_config, sts_config, workspace_id)
     request = Request(storage_config.endpoint, data=body, headers=headers, method="POST")
     try:
         with urlopen(request, timeout=10) as response:
@@ -48,11 +64,20 @@ def fetch_minio_sts(storage_config, sts_config, workspace_id):
         raise RuntimeError(f"minio sts http {exc.code}: {detail}") from exc
     except URLError as exc:
         raise RuntimeError(f"minio sts unreachable: {exc}") from exc
+    return _credentials_from_response(raw)
 
-    access_key, secret_key, session_token, expire_seconds = parse_sts_response(raw)
-    if not (access_key and secret_key and session_token):
-        raise RuntimeError(f"incomplete sts response: {raw.decode('utf-8', errors='ignore')}")
-    return session_token, access_key, secret_key, expire_seconds
+
+async def fetch_minio_sts_async(storage_config, sts_config, workspace_id):
+    """Awaitable ``fetch_minio_sts`` for the asyncio engine; returns the same tuple."""
+    endpoint, body, headers = _build_sts_request(storage_config, sts_config, workspace_id)
+    try:
+        _, _, raw = await aio_http.request(endpoint, "POST", endpoint.path or "/", headers, body, timeout=10)
+    except aio_http.AsyncHTTPError as exc:
+        detail = exc.body.decode("utf-8", errors="ignore")
+        raise RuntimeError(f"minio sts http {exc.status}: {detail}") from exc
+    except (OSError, asyncio.TimeoutError) as exc:
+        raise RuntimeError(f"minio sts unreachable: {exc!r}") from exc
+    return _credentials_from_response(raw)
 
 
 def parse_sts_response(raw):
@@ -0,0 +1,183 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+from ..utils import metrics
+from .sts import fetch_minio_sts, fetch_minio_sts_async
+
+
+class STSCredentialCache:
+    """Per-workspace AssumeRole credentials, reused until close to expiry.
+
+    Cached credentials are handed out while more than ``refresh_threshold``
+    seconds of lifetime remain; once less than twice that is left, one
+    background refresh replaces them. Concurrent misses for the same key share
+    a single AssumeRole call. Entries are keyed by workspace, role and policy.
+    """
+
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, storage_config, sts_config, fetch=fetch_minio_sts, fetch_async=fetch_minio_sts_async):
+        self._storage = storage_config
+        self._sts = sts_config
+        self._fetch = fetch
+        self._fetch_async = fetch_async
+        self.refresh_threshold = max(0, sts_config.refresh_threshold)
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._in_flight = {}
+        # Background refresh tasks; the loop only holds weak references to them.
+        self._refresh_tasks = set()
+        self._hits = 0
+        self._misses = 0
+        self._coalesced = 0
+        self._refreshes = 0
+        self._errors = 0
+
+    @classmethod
+    def shared(cls, storage_config, sts_config):
+        key = (cls, storage_config, sts_config, os.getpid())
+        with cls._shared_lock:
+            cache = cls._shared.get(key)
+            if cache is None:
+                cache = cls(storage_config, sts_config)
+                cls._shared[key] = cache
+                metrics.register("sts_cache", cache.stats)
+            return cache
+
+    def _key(self, workspace_id):
+        return workspace_id, self._sts.role_arn, self._sts.policy
+
+    def _lookup(self, key):
+        """Return ``(credentials, needs_refresh)`` for a usable entry, else ``(None, False)``."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None, False
+        credentials, expires_at = entry
+        remaining = expires_at - time.monotonic()
+        if remaining <= self.refresh_threshold:
+            return None, False
+        session_token, access_key, secret_key, _ = credentials
+        return (session_token, access_key, secret_key, int(remaining)), remaining < 2 * self.refresh_threshold
+
+    def _claim(self, key):
+        """Return ``(future, owner)``; the owner must run the fetch and resolve the future."""
+        future = self._in_flight.get(key)
+        if future is not None:
+            return future, False
+        future = Future()
+        self._in_flight[key] = future
+        return future, True
+
+    def _store(self, key, future, credentials):
+        expires_at = time.monotonic() + credentials[3]
+        with self._lock:
+            self._entries[key] = (credentials, expires_at)
+            self._in_flight.pop(key, None)
+            now = time.monotonic()
+            for stale_key in [k for k, (_, exp) in self._entries.items() if exp <= now]:
+                del self._entries[stale_key]
+        future.set_result(credentials)
+
+    def _fail(self, key, future, exc):
+        with self._lock:
+            self._errors += 1
+            self._in_flight.pop(key, None)
+        future.set_exception(exc)
+
+    def _run_fetch(self, key, future, workspace_id):
+        try:
+            credentials = self._fetch(self._storage, self._sts, workspace_id)
+        except Exception as exc:
+            self._fail(key, future, exc)
+            return
+        self._store(key, future, credentials)
+
+    def _refresh_in_background(self, key, workspace_id):
+        with self._lock:
+            future, owner = self._claim(key)
+            if owner:
+                self._refreshes += 1
+        if owner:
+            threading.Thread(target=self._run_fetch, args=(key, future, workspace_id), daemon=True).start()
+
+    def get(self, workspace_id):
+        """Return ``(session_token, access_key, secret_key, expire_seconds)``; raises RuntimeError like ``fetch_minio_sts``."""
+        if not self._sts.cache:
+            return self._fetch(self._storage, self._sts, workspace_id)
+        key = self._key(workspace_id)
+        with self._lock:
+            credentials, needs_refresh = self._lookup(key)
+            if credentials is not None:
+                self._hits += 1
+            else:
+                self._misses += 1
+                future, owner = self._claim(key)
+                if not owner:
+                    self._coalesced += 1
+        if credentials is not None:
+            if needs_refresh:
+                self._refresh_in_background(key, workspace_id)
+            return credentials
+        if owner:
+            self._run_fetch(key, future, workspace_id)
+        return future.result()
+
+    async def _run_fetch_async(self, key, future, workspace_id):
+        try:
+            credentials = await self._fetch_async(self._storage, self._sts, workspace_id)
+        except Exception as exc:
+            self._fail(key, future, exc)
+            return
+        self._store(key, future, credentials)
+
+    def _refresh_done(self, task, key, future, workspace_id):
+        self._refresh_tasks.discard(task)
+        if task.cancelled():
+            # Loop shutting down: release anyone waiting on this fetch.
+            if not future.done():
+                self._fail(key, future, RuntimeError("sts refresh cancelled"))
+            return
+        error = task.exception() or future.exception()
+        if error is not None:
+            logging.warning("background sts refresh for workspace %s failed: %s", workspace_id, error)
+
+    async def get_async(self, workspace_id):
+        """Awaitable ``get``; shares entries and in-flight fetches with the threaded path."""
+        if not self._sts.cache:
+            return await self._fetch_async(self._storage, self._sts, workspace_id)
+        key = self._key(workspace_id)
+        with self._lock:
+            credentials, needs_refresh = self._lookup(key)
+            if credentials is not None:
+                self._hits += 1
+                if needs_refresh:
+                    future, owner = self._claim(key)
+                    if owner:
+                        self._refreshes += 1
+                        task = asyncio.ensure_future(self._run_fetch_async(key, future, workspace_id))
+                        self._refresh_tasks.add(task)
+                        task.add_done_callback(lambda done: self._refresh_done(done, key, future, workspace_id))
+                return credentials
+            self._misses += 1
+            future, owner = self._claim(key)
+            if not owner:
+                self._coalesced += 1
+        if owner:
+            await self._run_fetch_async(key, future, workspace_id)
+        return await asyncio.wrap_future(future)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self._hits,
+                "misses": self._misses,
+                "coalesced": self._coalesced,
+                "refreshes": self._refreshes,
+                "errors": self._errors,
+            }
@@ -0,0 +1,149 @@
+import logging
+import threading
+import time
+from queue import Empty, Full, Queue
+
+from ..utils import metrics
+
+_STOP = object()
+
+
+class WriteBehindQueue:
+    """Single writer thread that group-commits fast-upload fingerprint upserts.
+
+    ``upsert_fingerprint_tiny`` has the same signature as the MediaDB method
+    and returns once the row is queued. The writer commits up to
+    ``max_batch`` queued rows per transaction, waiting at most
+    ``max_delay_ms`` after the first one. At most ``capacity`` rows are held
+    in memory; when the queue is full the caller writes synchronously. A
+    crash loses every row still queued, which is up to ``capacity`` rows
+    when the writer falls behind.
+
+    A queued row is not in media.db yet: until it commits, readers such as
+    upload-callback's ``get_tiny_by_fingerprint`` do not see it.
+    """
+
+    def __init__(self, db, max_batch=256, max_delay_ms=5.0, capacity=10000):
+        self._db = db
+        self.max_batch = max(1, max_batch)
+        self.max_delay = max(0.0, max_delay_ms) / 1000
+        self._queue = Queue(maxsize=max(1, capacity))
+        self._lock = threading.Lock()
+        # Guards _closed together with the enqueue, so no row lands behind _STOP.
+        self._close_lock = threading.Lock()
+        self._submitted = 0
+        self._committed = 0
+        self._batches = 0
+        self._largest_batch = 0
+        self._fallbacks = 0
+        self._errors = 0
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="media-db-writer", daemon=True)
+        self._thread.start()
+        metrics.register("write_behind", self.stats)
+
+    def upsert_fingerprint_tiny(self, *args, **kwargs):
+        with self._close_lock:
+            queued = not self._closed
+            if queued:
+                try:
+                    self._queue.put_nowait((args, kwargs))
+                except Full:
+                    queued = False
+                    with self._lock:
+                        self._fallbacks += 1
+        if not queued:
+            self._db.upsert_fingerprint_tiny(*args, **kwargs)
+            return
+        with self._lock:
+            self._submitted += 1
+
+    def _collect(self, first):
+        batch = [first]
+        stop = False
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except Empty:
+                break
+            if item is _STOP:
+                stop = True
+                break
+            batch.append(item)
+        return batch, stop
+
+    def _commit(self, batch):
+        # One transaction per database: with --db-shards a batch spans several files.
+        groups = {}
+        for args, kwargs in batch:
+            groups.setdefault(self._db.shard_for(args[0]), []).append((args, kwargs))
+        for shard, rows in groups.items():
+            self._commit_group(shard, rows)
+
+    def _commit_group(self, shard, rows):
+        try:
+            with shard.transaction() as conn:
+                for args, kwargs in rows:
+                    shard.upsert_fingerprint_tiny(*args, conn=conn, **kwargs)
+        except Exception:
+            # One bad row must not drop the whole group: retry them one by one.
+            logging.exception("write-behind group commit failed, retrying %s rows individually", len(rows))
+            committed = 0
+            for args, kwargs in rows:
+                try:
+                    shard.upsert_fingerprint_tiny(*args, **kwargs)
+                    committed += 1
+                except Exception:
+                    logging.exception("write-behind upsert dropped args=%s", args)
+            with self._lock:
+                self._errors += len(rows) - committed
+                self._committed += committed
+            return
+        with self._lock:
+            self._committed += len(rows)
+            self._batches += 1
+            self._largest_batch = max(self._largest_batch, len(rows))
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                self._queue.task_done()
+                return
+            batch, stop = self._collect(first)
+            try:
+                self._commit(batch)
+            finally:
+                for _ in range(len(batch) + int(stop)):
+                    self._queue.task_done()
+            if stop:
+                return
+
+    def flush(self):
+        """Block until every row queued so far is committed."""
+        self._queue.join()
+
+    def close(self):
+        """Flush and stop the writer thread; later upserts go straight to the database."""
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+        # Outside the lock: a full queue blocks here until the writer drains it.
+        self._queue.put(_STOP)
+        self._thread.join()
+        metrics.unregister("write_behind")
+
+    def stats(self):
+        with self._lock:
+            return {
+                "pending": self._queue.qsize(),
+                "submitted": self._submitted,
+                "committed": self._committed,
+                "batches": self._batches,
+                "largest_batch": self._largest_batch,
+                "fallbacks": self._fallbacks,
+                "errors": self._errors,
+            }
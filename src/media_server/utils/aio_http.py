@@ -0,0 +1,203 @@
+"""Minimal awaitable HTTP/1.1 client used by the asyncio engine for S3 and STS calls."""
+import asyncio
+import ssl
+import time
+from collections import deque
+from http.client import parse_headers
+from io import BytesIO
+
+
+class AsyncHTTPError(Exception):
+    def __init__(self, status, body):
+        super().__init__(f"http {status}")
+        self.status = status
+        self.body = body
+
+
+def _default_port(scheme):
+    return 443 if scheme == "https" else 80
+
+
+def _split_netloc(endpoint):
+    return endpoint.hostname, endpoint.port or _default_port(endpoint.scheme)
+
+
+async def _read_body(reader, method, status, headers):
+    """Return ``(body, reached_eof)``; a body delimited by EOF leaves the connection unusable."""
+    if method == "HEAD" or status in {204, 304} or 100 <= status < 200:
+        return b"", False
+    if headers.get("Transfer-Encoding", "").lower() == "chunked":
+        chunks = []
+        while True:
+            size_line = await reader.readline()
+            size = int(size_line.split(b";", 1)[0].strip() or b"0", 16)
+            if size == 0:
+                await reader.readline()
+                break
+            chunks.append(await reader.readexactly(size))
+            await reader.readexactly(2)
+        return b"".join(chunks), False
+    length = headers.get("Content-Length")
+    if length is not None:
+        return await reader.readexactly(int(length)), False
+    return await reader.read(), True
+
+
+async def _open(endpoint):
+    host, port = _split_netloc(endpoint)
+    ssl_context = ssl.create_default_context() if endpoint.scheme == "https" else None
+    return await asyncio.open_connection(host, port, ssl=ssl_context)
+
+
+async def _send_and_receive(reader, writer, method, path, headers, body, keep_alive):
+    """Run one exchange on an open stream; returns ``(status, headers, body, will_close)``."""
+    lines = [f"{method} {path} HTTP/1.1"]
+    connection = "keep-alive" if keep_alive else "close"
+    merged = {"connection": connection, **{k.lower(): v for k, v in headers.items()}}
+    if body:
+        merged["content-length"] = str(len(body))
+    lines.extend(f"{key}: {value}" for key, value in merged.items())
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + (body or b""))
+    await writer.drain()
+
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionResetError("connection closed before response")
+    parts = status_line.decode("latin-1").split(" ", 2)
+    if len(parts) < 2 or not parts[1].isdigit():
+        raise ConnectionError(f"malformed status line: {status_line!r}")
+    status = int(parts[1])
+    header_lines = []
+    while True:
+        line = await reader.readline()
+        if line in {b"\r\n", b"\n", b""}:
+            break
+        header_lines.append(line)
+    response_headers = parse_headers(BytesIO(b"".join(header_lines) + b"\r\n"))
+    payload, reached_eof = await _read_body(reader, method, status, response_headers)
+    will_close = (
+        not keep_alive
+        or reached_eof
+        or response_headers.get("Connection", "").lower() == "close"
+        or parts[0].strip() == "HTTP/1.0"
+    )
+    return status, response_headers, payload, will_close
+
+
+async def _exchange(endpoint, method, path, headers, body):
+    reader, writer = await _open(endpoint)
+    try:
+        status, response_headers, payload, _ = await _send_and_receive(
+            reader, writer, method, path, headers, body, keep_alive=False
+        )
+        return status, response_headers, payload
+    finally:
+        writer.close()
+
+
+class AsyncConnectionPool:
+    """Keep-alive streams to one endpoint for the asyncio engine.
+
+    Mirrors ``storage.http_pool.HTTPConnectionPool``: at most ``size``
+    connections, idle ones older than ``idle_timeout`` are dropped, and a
+    request that fails on a reused stream is retried once on a new one.
+    Bound to the event loop it is first used on.
+    """
+
+    def __init__(self, endpoint, size=8, idle_timeout=60.0):
+        self._endpoint = endpoint
+        self.size = max(1, size)
+        self.idle_timeout = idle_timeout
+        self._slots = asyncio.Semaphore(self.size)
+        self._idle = deque()
+        self._created = 0
+        self._reused = 0
+        self._reconnects = 0
+        self._evicted = 0
+
+    async def _checkout(self):
+        now = time.monotonic()
+        while self._idle:
+            reader, writer, last_used = self._idle.pop()
+            if now - last_used <= self.idle_timeout and not reader.at_eof():
+                self._reused += 1
+                return reader, writer, True
+            self._evicted += 1
+            writer.close()
+        reader, writer = await _open(self._endpoint)
+        self._created += 1
+        return reader, writer, False
+
+    async def _request(self, method, path, headers, body):
+        reader, writer, reused = await self._checkout()
+        while True:
+            try:
+                status, response_headers, payload, will_close = await _send_and_receive(
+                    reader, writer, method, path, headers, body, keep_alive=True
+                )
+            except (ConnectionError, asyncio.IncompleteReadError):
+                writer.close()
+                if not reused:
+                    raise
+                self._reconnects += 1
+                reader, writer = await _open(self._endpoint)
+                self._created += 1
+                reused = False
+                continue
+            except BaseException:
+                writer.close()
+                raise
+            if will_close:
+                writer.close()
+            else:
+                self._idle.append((reader, writer, time.monotonic()))
+            return status, response_headers, payload
+
+    async def request(self, method, path, headers, body=b"", timeout=10, on_start=None):
+        """Pooled counterpart of ``request``; same return value and exceptions.
+
+        ``on_start`` is called once a connection slot is free, right before sending.
+        """
+        async with self._slots:
+            if on_start is not None:
+                on_start()
+            status, response_headers, payload = await asyncio.wait_for(
+                self._request(method, path, headers, body),
+                timeout,
+            )
+        if status >= 400:
+            raise AsyncHTTPError(status, payload)
+        return status, response_headers, payload
+
+    def saturated(self):
+        """True when every connection slot is taken and a new request would queue."""
+        return self._slots.locked()
+
+    def close(self):
+        while self._idle:
+            _, writer, _ = self._idle.pop()
+            writer.close()
+
+    def stats(self):
+        return {
+            "size": self.size,
+            "idle": len(self._idle),
+            "created": self._created,
+            "reused": self._reused,
+            "reconnects": self._reconnects,
+            "evicted": self._evicted,
+        }
+
+
+async def request(endpoint, method, path, headers, body=b"", timeout=10):
+    """Send one request to ``endpoint`` (a urlparse result) and return ``(status, headers, body)``.
+
+    Raises ``AsyncHTTPError`` for 4xx/5xx and ``OSError``/``asyncio.TimeoutError`` on transport failures.
+    """
+    status, response_headers, payload = await asyncio.wait_for(
+        _exchange(endpoint, method, path, headers, body),
+        timeout,
+    )
+    if status >= 400:
+        raise AsyncHTTPError(status, payload)
+    return status, response_headers, payload
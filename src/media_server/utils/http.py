@@ -36,6 +36,9 @@ def json_response(handler, status, payload):
     handler.send_header("Content-Type", "application/json; charset=utf-8")
     handler.send_header("Access-Control-Allow-Origin", "*")
     handler.send_header("Content-Length", str(len(body)))
+    idle_timeout = getattr(handler, "idle_timeout", None)
+    if idle_timeout and not getattr(handler, "close_connection", True):
+        handler.send_header("Keep-Alive", f"timeout={int(idle_timeout)}")
     handler.end_headers()
     handler.wfile.write(body)
     if logging.getLogger().isEnabledFor(logging.DEBUG):
@@ -0,0 +1,23 @@
+"""Process-wide runtime counters exposed on GET /metrics."""
+import os
+import threading
+
+_lock = threading.Lock()
+_providers = {}
+
+
+def register(name, provider):
+    with _lock:
+        _providers[name] = provider
+
+
+def unregister(name):
+    with _lock:
+        _providers.pop(name, None)
+
+
+def snapshot():
+    with _lock:
+        providers = list(_providers.items())
+    # pid tells pre-forked workers apart: each process keeps its own counters.
+    return {"pid": os.getpid(), **{name: provider() for name, provider in providers}}
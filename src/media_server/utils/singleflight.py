@@ -0,0 +1,113 @@
+"""Coalesce identical in-flight calls: concurrent callers with one key share one execution.
+
+Groups are process-wide and named; their counters are on GET /metrics as
+``singleflight``. Only calls that overlap in time are merged. A result is
+never kept after its call returns, so this is not a cache.
+"""
+import asyncio
+import threading
+
+from . import metrics
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._tasks = {}
+        self._total = 0
+        self._coalesced = 0
+
+    def _count(self, joined):
+        self._total += 1
+        self._coalesced += int(joined)
+
+    def do(self, key, fn):
+        """Run ``fn()`` unless a call for ``key`` is already running; then wait for and share its outcome."""
+        with self._lock:
+            call = self._calls.get(key)
+            joined = call is not None
+            if not joined:
+                call = self._calls[key] = _Call()
+            self._count(joined)
+        if joined:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def do_async(self, key, factory):
+        """Awaitable ``do``: ``factory()`` returns the coroutine to share.
+
+        The shared work runs as its own task, so a caller that is cancelled
+        (e.g. by a fan-out deadline) does not cancel it for the others.
+        """
+        loop = asyncio.get_running_loop()
+        task_key = (id(loop), key)
+        with self._lock:
+            task = self._tasks.get(task_key)
+            joined = task is not None
+            if not joined:
+                task = self._tasks[task_key] = loop.create_task(factory())
+                task.add_done_callback(lambda done: self._task_done(task_key, done))
+            self._count(joined)
+        return await asyncio.shield(task)
+
+    def _task_done(self, task_key, task):
+        with self._lock:
+            self._tasks.pop(task_key, None)
+        if not task.cancelled():
+            # Retrieve it so a result nobody awaits any more is not reported as lost.
+            task.exception()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "calls": self._total,
+                "executions": self._total - self._coalesced,
+                "coalesced": self._coalesced,
+                "coalesced_ratio": round(self._coalesced / self._total, 4) if self._total else 0.0,
+                "in_flight": len(self._calls) + len(self._tasks),
+            }
+
+
+_groups = {}
+_groups_lock = threading.Lock()
+
+
+def group(name):
+    """The process-wide SingleFlight called ``name``."""
+    with _groups_lock:
+        flight = _groups.get(name)
+        if flight is None:
+            flight = _groups[name] = SingleFlight(name)
+        return flight
+
+
+def snapshot():
+    with _groups_lock:
+        groups = list(_groups.values())
+    return {flight.name: flight.stats() for flight in groups}
+
+
+metrics.register("singleflight", snapshot)
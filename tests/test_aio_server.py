@@ -0,0 +1,188 @@
+import asyncio
+import http.client
+import json
+import sys
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_ROOT = REPO_ROOT / "src"
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from media_server.config import AppConfig, ServerConfig, StorageConfig, STSConfig
+from media_server.http_layer.aio_server import AsyncMediaServer
+from media_server.storage.db import MediaDB
+from media_server.storage.s3_client import S3Client
+from media_server.storage.sts import fetch_minio_sts_async
+
+STS_XML = b"""<AssumeRoleResponse xmlns="https://sts.amazonaws.com/doc/2011-06-15/">
+<AssumeRoleResult><Credentials>
+<AccessKeyId>AK</AccessKeyId><SecretAccessKey>SK</SecretAccessKey>
+<SessionToken>TOKEN</SessionToken><Expiration>2099-01-01T00:00:00Z</Expiration>
+</Credentials></AssumeRoleResult></AssumeRoleResponse>"""
+
+
+class _FakeStorage(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    heads = []
+
+    def log_message(self, fmt, *args):
+        return None
+
+    def do_HEAD(self):
+        self.heads.append(self.path)
+        status = 200 if "/present/" in self.path else 404
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", "0")))
+        self.send_response(200)
+        self.send_header("Content-Type", "text/xml")
+        self.send_header("Content-Length", str(len(STS_XML)))
+        self.end_headers()
+        self.wfile.write(STS_XML)
+
+
+def _start(server):
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return thread
+
+
+def _config(storage_port, db_path):
+    return AppConfig(
+        server=ServerConfig(host="127.0.0.1", port=0, token="t", engine="asyncio"),
+        storage=StorageConfig(
+            endpoint=f"http://127.0.0.1:{storage_port}",
+            bucket="media",
+            region="us-east-1",
+            access_key="key",
+            secret_key="secret",
+            session_token="",
+            provider="minio",
+        ),
+        sts=STSConfig(role_arn="arn", policy="", duration=3600),
+        db_path=db_path,
+        log_level="info",
+    )
+
+
+class AsyncEngineTest(unittest.TestCase):
+    def setUp(self):
+        self.storage = ThreadingHTTPServer(("127.0.0.1", 0), _FakeStorage)
+        _start(self.storage)
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.config = _config(self.storage.server_address[1], str(Path(self.tmpdir.name) / "media.db"))
+
+    def tearDown(self):
+        self.storage.shutdown()
+        self.storage.server_close()
+        self.tmpdir.cleanup()
+
+    def test_head_object_async_checks_both_key_layouts(self):
+        client = S3Client(self.config.storage)
+        _FakeStorage.heads = []
+
+        self.assertTrue(asyncio.run(client.head_object_async("present/a.jpg")))
+        self.assertFalse(asyncio.run(client.head_object_async("ws1/missing.jpg")))
+        self.assertEqual(
+            ["/media/present/a.jpg", "/media/ws1/missing.jpg", "/media/media/ws1/missing.jpg"],
+            _FakeStorage.heads,
+        )
+
+    def test_fetch_minio_sts_async_parses_credentials(self):
+        token, access_key, secret_key, expire = asyncio.run(
+            fetch_minio_sts_async(self.config.storage, self.config.sts, "ws1")
+        )
+
+        self.assertEqual(("TOKEN", "AK", "SK"), (token, access_key, secret_key))
+        self.assertGreater(expire, 0)
+
+    def test_serves_routes_over_one_keep_alive_connection(self):
+        db = MediaDB(self.config.db_path)
+        server = AsyncMediaServer(("127.0.0.1", 0), self.config, db)
+        _start(server)
+        conn = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=5)
+        headers = {"x-auth-token": "t", "Content-Type": "application/json"}
+        try:
+            conn.request("GET", "/health")
+            health = conn.getresponse()
+            health.read()
+            sock = conn.sock
+
+            conn.request(
+                "POST",
+                "/media/api/v1/workspaces/ws1/upload-callback",
+                body=json.dumps({"object_key": "present/a.jpg", "fingerprint": "fp1", "name": "a.jpg"}),
+                headers=headers,
+            )
+            callback = conn.getresponse()
+            callback_body = json.loads(callback.read())
+            same_socket = conn.sock is sock
+
+            conn.request(
+                "POST",
+                "/media/api/v1/workspaces/ws1/fast-upload",
+                body=json.dumps({"fingerprint": "fp1", "name": "a.jpg"}),
+                headers=headers,
+            )
+            fast = json.loads(conn.getresponse().read())
+
+            conn.request("POST", "/media/api/v1/workspaces/ws1/unknown", body="{}", headers=headers)
+            unknown = conn.getresponse()
+            unknown.read()
+        finally:
+            conn.close()
+            server.shutdown()
+            server.server_close()
+            db.close()
+
+        self.assertEqual(200, health.status)
+        self.assertEqual(200, callback.status)
+        self.assertEqual("present/a.jpg", callback_body["data"])
+        self.assertTrue(same_socket)
+        self.assertEqual({"object_key": "present/a.jpg"}, fast["data"])
+        self.assertEqual(404, unknown.status)
+
+    def test_database_calls_run_off_the_event_loop(self):
+        db = MediaDB(self.config.db_path)
+        db.upsert_file("ws1", "fp1", "tiny1", "present/a.jpg", "a.jpg", "/")
+        server = AsyncMediaServer(("127.0.0.1", 0), self.config, db)
+        loop_thread = _start(server)
+        db_threads = []
+        lookup = db.get_objects_by_tiny
+
+        def _recording_lookup(*args, **kwargs):
+            db_threads.append(threading.current_thread())
+            return lookup(*args, **kwargs)
+
+        db.get_objects_by_tiny = _recording_lookup
+        conn = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=5)
+        try:
+            conn.request(
+                "POST",
+                "/media/api/v1/workspaces/ws1/files/tiny-fingerprints",
+                body=json.dumps({"tiny_fingerprints": ["tiny1"]}),
+                headers={"x-auth-token": "t", "Content-Type": "application/json"},
+            )
+            found = json.loads(conn.getresponse().read())
+        finally:
+            conn.close()
+            server.shutdown()
+            server.server_close()
+            db.close()
+
+        self.assertEqual(["tiny1"], found["data"]["tiny_fingerprints"])
+        self.assertEqual(1, len(db_threads))
+        self.assertIsNot(loop_thread, db_threads[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
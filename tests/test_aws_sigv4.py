@@ -0,0 +1,62 @@
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_ROOT = REPO_ROOT / "src"
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from media_server.utils import aws_sigv4
+from media_server.utils.aws_sigv4 import SigV4Signer, aws_v4_headers
+
+ACCESS_KEY = "AKIDEXAMPLE"
+SECRET_KEY = "wJalrXUtnFEMI/K7MDENG+bPxRfiCYEXAMPLEKEY"
+HOST = "127.0.0.1:9000"
+AMZ_DATE = "20260312T203353Z"
+
+# Signatures produced by the original per-request implementation for the same inputs.
+CASES = [
+    ("HEAD", "/media/ws1/a.jpg", b"", None, "1ffbe51c7709a08c5592e7914d826c615cc49a2a83da7926a5679ac388a751d1"),
+    (
+        "POST",
+        "/",
+        b"Action=AssumeRole&Version=2011-06-15",
+        {"Content-Type": "application/x-www-form-urlencoded"},
+        "8c168658e1dccd89a2afa4bd760974f2cb1ee74cebf1ea787b34b72bea20c7b1",
+    ),
+    (
+        "GET",
+        "/media/x%20y",
+        b"",
+        {"X-Amz-Security-Token": "tok"},
+        "fbdf436151822a168ace8e29e2f722f1d70cbbd65959a1b674abc3c47f6b7c62",
+    ),
+]
+
+
+class SigV4SignerTest(unittest.TestCase):
+    def test_signatures_match_reference(self):
+        signer = SigV4Signer(ACCESS_KEY, SECRET_KEY, "us-east-1", "s3")
+        for method, uri, payload, extra, expected in CASES:
+            for _ in range(2):
+                headers = signer.headers(method, HOST, uri, payload, extra, amz_date=AMZ_DATE)
+                self.assertTrue(headers["authorization"].endswith(f"Signature={expected}"), method)
+                self.assertEqual(AMZ_DATE, headers["x-amz-date"])
+
+    def test_wrapper_uses_current_second_and_cached_key(self):
+        aws_sigv4._signing_key.cache_clear()
+        with mock.patch.object(aws_sigv4.time, "time", return_value=1773347633.7):
+            first = aws_v4_headers(ACCESS_KEY, SECRET_KEY, "us-east-1", "s3", "HEAD", HOST, "/media/ws1/a.jpg", b"")
+            second = aws_v4_headers(ACCESS_KEY, SECRET_KEY, "us-east-1", "s3", "HEAD", HOST, "/media/ws1/a.jpg", b"")
+
+        self.assertEqual(AMZ_DATE, first["x-amz-date"])
+        self.assertEqual(first, second)
+        self.assertTrue(first["authorization"].endswith(f"Signature={CASES[0][4]}"))
+        self.assertEqual(1, aws_sigv4._signing_key.cache_info().misses)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+import gzip
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_ROOT = REPO_ROOT / "src"
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from media_server.storage import backup
+from media_server.storage.backup import BackupScheduler, list_snapshots, snapshot
+from media_server.storage.db import MediaDB
+from media_server.storage.sharding import ShardedMediaDB
+
+
+def _count(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM media_files").fetchone()[0]
+    finally:
+        conn.close()
+
+
+class SnapshotTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.root = Path(self.tmpdir.name)
+        self.dest = str(self.root / "backups")
+
+    def _fill(self, db, workspaces=("ws1",), rows=500):
+        for workspace_id in workspaces:
+            with db.shard_for(workspace_id).transaction() as conn:
+                for index in range(rows):
+                    db.upsert_file(workspace_id, f"fp{index}", f"tiny{index}", f"{workspace_id}/{index}.jpg", "a.jpg", "/", conn=conn)
+
+    def test_snapshot_while_writes_continue(self):
+        db = MediaDB(str(self.root / "media.db"))
+        self.addCleanup(db.close)
+        self._fill(db)
+        stop = threading.Event()
+        written = []
+
+        def _write():
+            while not stop.is_set():
+                db.upsert_fingerprint_tiny("ws2", f"fp{len(written)}", "tiny")
+                written.append(1)
+
+        writer = threading.Thread(target=_write)
+        writer.start()
+        try:
+            results = snapshot(db, self.dest, pages=1, sleep=0.001)
+        finally:
+            stop.set()
+            writer.join()
+
+        self.assertGreater(len(written), 0)
+        self.assertGreaterEqual(_count(results[0]["path"]), 500)
+        self.assertEqual("delete", sqlite3.connect(results[0]["path"]).execute("PRAGMA journal_mode").fetchone()[0])
+        self.assertEqual([], [name for name in os.listdir(self.dest) if name.endswith(".partial")])
+
+    def test_compression_and_retention_per_shard(self):
+        db = ShardedMediaDB(str(self.root / "media.db"), 2)
+        self.addCleanup(db.close)
+        self._fill(db, workspaces=[f"ws{index}" for index in range(6)], rows=20)
+
+        for stamp in ("20240101-000000", "20240102-000000", "20240103-000000"):
+            results = snapshot(db, self.dest, compress=True, keep=2, stamp=stamp)
+        remaining = [list_snapshots(shard.path, self.dest) for shard in db.shards]
+        restored = self.root / "restored.db"
+        with gzip.open(results[0]["path"], "rb") as packed:
+            restored.write_bytes(packed.read())
+
+        self.assertEqual([2, 2], [len(paths) for paths in remaining])
+        self.assertTrue(all(path.endswith("20240103-000000.db.gz") for path in (paths[-1] for paths in remaining)))
+        self.assertEqual(1, len(results[0]["pruned"]))
+        self.assertEqual(_count(db.shards[0].path), _count(str(restored)))
+
+
+class BackupSchedulerTest(unittest.TestCase):
+    def test_unexpected_errors_are_failed_runs_and_the_schedule_continues(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        db = MediaDB(str(Path(tmpdir.name) / "media.db"))
+        self.addCleanup(db.close)
+        scheduler = BackupScheduler(db, str(Path(tmpdir.name) / "backups"), interval=0.01)
+
+        with mock.patch.object(backup, "snapshot", side_effect=ValueError("bad stamp")), self.assertLogs(level="ERROR"):
+            scheduler.start()
+            for _ in range(200):
+                if scheduler.stats()["failures"] >= 2:
+                    break
+                time.sleep(0.01)
+            scheduler.close()
+        stats = scheduler.stats()
+
+        self.assertGreaterEqual(stats["failures"], 2)
+        self.assertEqual({"error"}, {run["status"] for run in stats["recent"]})
+        self.assertEqual("ValueError", stats["recent"][0]["error"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,141 @@
+import json
+import sys
+import tempfile
+import time
+import unittest
+from dataclasses import replace
+from io import BytesIO
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_ROOT = REPO_ROOT / "src"
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from media_server.config import StorageConfig
+from media_server.handlers.fast_upload import handle_fast_upload
+from media_server.storage.circuit_breaker import CircuitBreaker, CircuitOpenError
+from media_server.storage.db import MediaDB
+from media_server.storage.s3_client import S3Client
+
+# Nothing listens on the discard port, so every request fails at once.
+DOWN = StorageConfig(
+    endpoint="http://127.0.0.1:9",
+    bucket="media",
+    region="us-east-1",
+    access_key="key",
+    secret_key="secret",
+    session_token="",
+    provider="minio",
+    verify_freshness=0,
+    breaker_failures=2,
+    breaker_reset=60.0,
+)
+
+
+class _Handler:
+    def __init__(self, payload, db, storage):
+        body = json.dumps(payload).encode("utf-8")
+        self.headers = {"x-auth-token": "t", "Content-Length": str(len(body))}
+        self.rfile = BytesIO(body)
+        self.wfile = BytesIO()
+        self.db = db
+        self.config = type("Config", (), {"storage": storage, "server": type("S", (), {"token": "t"})()})()
+        self.status = None
+
+    def send_response(self, status):
+        self.status = status
+
+    def send_header(self, key, value):
+        return None
+
+    def end_headers(self):
+        return None
+
+    def read_json(self):
+        return json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+
+    def require_token(self):
+        return "t"
+
+
+class CircuitBreakerTest(unittest.TestCase):
+    def test_opens_fails_fast_and_recovers_through_half_open_probe(self):
+        now = [0.0]
+        breaker = CircuitBreaker("storage", failure_threshold=3, reset_timeout=10, half_open_probes=1, clock=lambda: now[0])
+        for _ in range(3):
+            self.assertTrue(breaker.allow())
+            breaker.record_failure("refused")
+
+        self.assertEqual("open", breaker.state)
+        self.assertFalse(breaker.allow())
+        now[0] = 10.0
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        breaker.record_failure("still down")
+        self.assertEqual("open", breaker.state)
+        now[0] = 20.0
+        self.assertTrue(breaker.allow())
+        breaker.record_success()
+
+        stats = breaker.stats()
+        self.assertEqual(("closed", 0, 2, 2), (stats["state"], stats["consecutive_failures"], stats["times_opened"], stats["rejected"]))
+
+    def test_lost_probe_slot_frees_up_after_reset_timeout(self):
+        now = [0.0]
+        breaker = CircuitBreaker("storage", failure_threshold=1, reset_timeout=5, clock=lambda: now[0])
+        breaker.record_failure()
+        now[0] = 5.0
+        self.assertTrue(breaker.allow())
+        now[0] = 9.0
+        self.assertFalse(breaker.allow())
+        now[0] = 10.0
+        self.assertTrue(breaker.allow())
+
+    def test_zero_threshold_disables_breaker(self):
+        breaker = CircuitBreaker("storage", failure_threshold=0)
+        for _ in range(10):
+            breaker.record_failure()
+        self.assertTrue(breaker.allow())
+        self.assertEqual("closed", breaker.state)
+
+
+class StorageOutageTest(unittest.TestCase):
+    def test_client_fails_fast_once_open(self):
+        client = S3Client(DOWN)
+        self.addCleanup(client.close)
+        for _ in range(2):
+            with self.assertRaises(RuntimeError) as caught:
+                client.head_object("ws1/a.jpg")
+            self.assertNotIsInstance(caught.exception, CircuitOpenError)
+
+        started = time.perf_counter()
+        with self.assertRaises(CircuitOpenError):
+            client.head_object("ws1/a.jpg")
+        results = client.head_objects(["ws1/a.jpg", "ws1/b.jpg"])
+
+        self.assertLess(time.perf_counter() - started, 0.5)
+        self.assertEqual({"ws1/a.jpg": None, "ws1/b.jpg": None}, results)
+        self.assertEqual("open", client.breaker.stats()["state"])
+
+    def test_fast_upload_keeps_rows_while_storage_is_down(self):
+        storage = replace(DOWN, bucket="outage")
+        with tempfile.TemporaryDirectory() as tmpdir:
+            db = MediaDB(str(Path(tmpdir) / "media.db"))
+            db.upsert_file("ws1", "fp1", "tiny1", "ws1/a.jpg", "a.jpg", "/")
+            bodies = []
+            for _ in range(3):
+                handler = _Handler({"fingerprint": "fp1", "name": "a.jpg"}, db, storage)
+                handle_fast_upload(handler, "ws1")
+                bodies.append(json.loads(handler.wfile.getvalue()))
+            remaining = db.get_object_key_by_fingerprint("ws1", "fp1")
+            db.close()
+
+        self.assertEqual("ws1/a.jpg", remaining)
+        self.assertEqual([-1, -1, -1], [body["code"] for body in bodies])
+        self.assertEqual("open", S3Client.shared(storage).breaker.state)
+
+
+if __name__ == "__main__":
+    unittest.main()
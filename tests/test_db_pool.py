@@ -0,0 +1,105 @@
+import http.client
+import json
+import sqlite3
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_ROOT = REPO_ROOT / "src"
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from media_server.app import build_server
+from media_server.config import AppConfig, ServerConfig, StorageConfig, STSConfig
+from media_server.handler import MediaRequestHandler
+from media_server.storage.db import MediaDB
+from media_server.storage.db_pool import PoolTimeout
+
+
+class MediaDBPoolTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.db = MediaDB(str(Path(self.tmpdir.name) / "media.db"), pool_size=2, checkout_timeout=0.05)
+        self.addCleanup(self.db.close)
+
+    def test_readers_are_read_only_and_see_committed_writes(self):
+        self.db.upsert_file("ws1", "fp1", "tiny1", "ws1/a.jpg", "a.jpg", "/")
+        with self.db._get_conn() as conn:
+            query_only = conn.execute("PRAGMA query_only").fetchone()[0]
+            with self.assertRaises(sqlite3.OperationalError):
+                conn.execute("DELETE FROM media_files")
+
+        self.assertEqual(1, query_only)
+        self.assertEqual("ws1/a.jpg", self.db.get_object_key_by_fingerprint("ws1", "fp1"))
+        self.db.delete_by_fingerprint("ws1", "fp1")
+        self.assertIsNone(self.db.get_object_key_by_fingerprint("ws1", "fp1"))
+
+    def test_exhausted_readers_time_out_without_blocking_writes(self):
+        with self.db._get_conn(), self.db._get_conn():
+            with self.assertRaises(PoolTimeout):
+                self.db.get_tiny_by_fingerprint("ws1", "fp1")
+            self.db.upsert_fingerprint_tiny("ws1", "fp1", "tiny1")
+        stats = self.db.pool_stats()
+
+        self.assertEqual("tiny1", self.db.get_tiny_by_fingerprint("ws1", "fp1"))
+        self.assertEqual(1, stats["readers"]["timeouts"])
+        self.assertEqual(2, stats["readers"]["open"])
+        self.assertEqual(2, stats["readers"]["hold"]["count"])
+        self.assertEqual(1, stats["writer"]["size"])
+        self.assertGreater(stats["writer"]["wait"]["count"], 0)
+
+
+class PoolTimeoutResponseTest(unittest.TestCase):
+    def test_exhausted_pool_answers_503(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        db = MediaDB(str(Path(tmpdir.name) / "media.db"), pool_size=1, checkout_timeout=0.05)
+        self.addCleanup(db.close)
+        config = AppConfig(
+            server=ServerConfig(host="127.0.0.1", port=0, token="t", workers=2),
+            storage=StorageConfig(
+                endpoint="http://127.0.0.1:9",
+                bucket="media",
+                region="us-east-1",
+                access_key="key",
+                secret_key="secret",
+                session_token="",
+                provider="minio",
+            ),
+            sts=STSConfig(role_arn="arn", policy="", duration=3600),
+            db_path=db.path,
+            log_level="info",
+        )
+        saved = (MediaRequestHandler.config, MediaRequestHandler.db)
+        self.addCleanup(lambda: setattr(MediaRequestHandler, "db", saved[1]))
+        self.addCleanup(lambda: setattr(MediaRequestHandler, "config", saved[0]))
+        MediaRequestHandler.config, MediaRequestHandler.db = config, db
+        server = build_server(config)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        body = json.dumps({"fingerprint": "fp1", "name": "a.jpg"})
+        with db._get_conn():
+            conn = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=5)
+            conn.request(
+                "POST",
+                "/media/api/v1/workspaces/ws1/fast-upload",
+                body=body,
+                headers={"x-auth-token": "t", "Content-Type": "application/json"},
+            )
+            response = conn.getresponse()
+            payload = json.loads(response.read())
+            conn.close()
+
+        self.assertEqual(503, response.status)
+        self.assertEqual("database busy", payload["message"])
+
+
+if __name__ == "__main__":
+    unittest.main()
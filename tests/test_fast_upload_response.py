@@ -20,7 +20,7 @@ class _FakeDB:
     def upsert_fingerprint_tiny(self, *args, **kwargs):
         self.upserts.append((args, kwargs))
 
-    def get_object_key_by_fingerprint(self, workspace_id, fingerprint):
+    def get_object_by_fingerprint(self, workspace_id, fingerprint):
         return None
 
 
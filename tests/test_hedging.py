@@ -0,0 +1,154 @@
+import asyncio
+import sys
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_ROOT = REPO_ROOT / "src"
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from media_server.config import StorageConfig
+from media_server.storage.hedging import HedgePolicy
+from media_server.storage.s3_client import S3Client
+
+
+class _StallingStorage(BaseHTTPRequestHandler):
+    """The first HEAD of a ``slow`` key stalls, like MinIO during compaction; every other HEAD is fast."""
+
+    protocol_version = "HTTP/1.1"
+    seen = set()
+    lock = threading.Lock()
+
+    def log_message(self, fmt, *args):
+        return None
+
+    def do_HEAD(self):
+        with self.lock:
+            first = self.path not in self.seen
+            self.seen.add(self.path)
+        if first and "slow" in self.path:
+            time.sleep(1.0)
+        self.send_response(200)
+        self.send_header("ETag", '"e1"')
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+
+class HedgePolicyTest(unittest.TestCase):
+    def test_delay_follows_the_percentile_once_warm(self):
+        policy = HedgePolicy(percentile=90, max_delay=1.0)
+        for _ in range(19):
+            policy.observe(0.010)
+        self.assertIsNone(policy.delay())
+        for index in range(81):
+            policy.observe(0.010 if index < 70 else 0.200)
+
+        self.assertAlmostEqual(0.200, policy.delay())
+        for _ in range(100):
+            policy.observe(5.0)
+        self.assertEqual(1.0, policy.delay())
+
+    def test_budget_caps_hedges_to_a_fraction_of_requests(self):
+        policy = HedgePolicy(percentile=95, budget=0.05, burst=2)
+        granted = 0
+        for _ in range(200):
+            policy.start()
+            granted += policy.try_hedge()
+        stats = policy.stats()
+
+        self.assertEqual(10, granted)
+        self.assertEqual((200, 10, 0.05), (stats["requests"], stats["hedged"], stats["hedge_rate"]))
+        self.assertEqual(190, stats["budget_denied"])
+
+
+def _stalling_client(test, pool_size=8):
+    """S3Client with hedging on, against a _StallingStorage torn down with ``test``; returns (client, handler)."""
+    handler = type("Storage", (_StallingStorage,), {"seen": set(), "lock": threading.Lock()})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    test.addCleanup(server.server_close)
+    test.addCleanup(server.shutdown)
+    client = S3Client(
+        StorageConfig(
+            endpoint=f"http://127.0.0.1:{server.server_address[1]}",
+            bucket="media",
+            region="us-east-1",
+            access_key="key",
+            secret_key="secret",
+            session_token="",
+            provider="minio",
+            hedge_percentile=90.0,
+            hedge_budget=1.0,
+            pool_size=pool_size,
+        )
+    )
+    test.addCleanup(client.close)
+    return client, handler
+
+
+class HedgedHeadTest(unittest.TestCase):
+    def setUp(self):
+        self.client, _ = _stalling_client(self)
+
+    def test_slow_head_is_answered_by_the_hedge(self):
+        for index in range(30):
+            self.assertTrue(self.client.head_object(f"ws1/{index}.jpg"))
+
+        started = time.monotonic()
+        result = self.client.head_object("ws1/slow.jpg")
+        elapsed = time.monotonic() - started
+        stats = self.client.hedge.stats()
+
+        self.assertEqual("e1", result.etag)
+        self.assertLess(elapsed, 0.5)
+        self.assertGreaterEqual(stats["hedge_wins"], 1)
+        self.assertEqual(31, stats["requests"])
+
+    def test_async_slow_head_is_answered_by_the_hedge(self):
+        async def _main():
+            for index in range(30):
+                await self.client.head_object_async(f"ws1/{index}.jpg")
+            started = time.monotonic()
+            result = await self.client.head_object_async("ws1/slow.jpg")
+            return result, time.monotonic() - started
+
+        result, elapsed = asyncio.run(_main())
+
+        self.assertEqual("e1", result.etag)
+        self.assertLess(elapsed, 0.5)
+        self.assertGreaterEqual(self.client.hedge.stats()["hedge_wins"], 1)
+
+
+class SaturatedPoolHedgeTest(unittest.TestCase):
+    def setUp(self):
+        self.client, self.handler = _stalling_client(self, pool_size=1)
+
+    def test_waiting_for_a_connection_neither_starts_the_timer_nor_hedges(self):
+        for index in range(30):
+            self.assertTrue(self.client.head_object(f"ws1/{index}.jpg"))
+        slow = threading.Thread(target=self.client.head_object, args=("ws1/slow.jpg",))
+        slow.start()
+        while "/media/ws1/slow.jpg" not in self.handler.seen:
+            time.sleep(0.005)
+
+        # Queues about a second for the only connection, then answers at once.
+        result = self.client.head_object("ws1/queued.jpg")
+        slow.join()
+        stats = self.client.hedge.stats()
+
+        self.assertEqual("e1", result.etag)
+        self.assertEqual(0, stats["hedged"])
+        self.assertEqual(0, stats["budget_denied"])
+        # The stalled HEAD was due a hedge, but its copy could only have queued.
+        self.assertGreaterEqual(stats["saturated_skips"], 1)
+        self.assertLess(stats["delay_ms"], 100)
+
+
+if __name__ == "__main__":
+    unittest.main()
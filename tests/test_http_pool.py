@@ -0,0 +1,135 @@
+import asyncio
+import sys
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlparse
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_ROOT = REPO_ROOT / "src"
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from media_server.config import StorageConfig
+from media_server.storage.http_pool import HTTPConnectionPool
+from media_server.storage.s3_client import S3Client
+
+
+class _StorageHandler(BaseHTTPRequestHandler):
+    """HEAD /media/<key>: 200 for keys starting with "ok" or "drop", 404 otherwise.
+
+    Keys starting with "drop" answer and then silently close the socket, like
+    a storage node that times out an idle keep-alive connection.
+    """
+
+    protocol_version = "HTTP/1.1"
+    connections = 0
+
+    def setup(self):
+        super().setup()
+        type(self).connections += 1
+
+    def do_HEAD(self):
+        key = self.path.rsplit("/", 1)[-1]
+        self.send_response(200 if key.startswith(("ok", "drop")) else 404)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+        if key.startswith("drop"):
+            self.close_connection = True
+
+    def log_message(self, format, *args):
+        return None
+
+
+def _storage_config(endpoint, **overrides):
+    values = dict(
+        endpoint=endpoint,
+        bucket="media",
+        region="us-east-1",
+        access_key="key",
+        secret_key="secret",
+        session_token="",
+        provider="minio",
+    )
+    values.update(overrides)
+    return StorageConfig(**values)
+
+
+class HTTPConnectionPoolTest(unittest.TestCase):
+    def setUp(self):
+        handler_cls = type("Handler", (_StorageHandler,), {"connections": 0})
+        self.handler_cls = handler_cls
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler_cls)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.endpoint = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def test_reuses_one_connection_for_sequential_heads(self):
+        client = S3Client(_storage_config(self.endpoint))
+        results = [client.head_object(f"ok-{i}") for i in range(5)]
+        missing = client.head_object("gone")
+        stats = client.pool_stats()["sync"]
+        client.close()
+
+        self.assertTrue(all(results))
+        self.assertFalse(missing)
+        self.assertEqual(1, stats["created"])
+        self.assertEqual(1, self.handler_cls.connections)
+        self.assertEqual(6, stats["reused"])
+
+    def test_reconnects_when_server_dropped_the_connection(self):
+        pool = HTTPConnectionPool(urlparse(self.endpoint), size=2)
+        first, _, _ = pool.request("HEAD", "/media/drop-1", {})
+        time.sleep(0.05)
+        second, _, _ = pool.request("HEAD", "/media/ok-2", {})
+        stats = pool.stats()
+        pool.close()
+
+        self.assertEqual((200, 200), (first, second))
+        self.assertEqual(1, stats["reconnects"])
+        self.assertEqual(2, stats["created"])
+
+    def test_evicts_idle_connections(self):
+        pool = HTTPConnectionPool(urlparse(self.endpoint), size=2, idle_timeout=0.05)
+        pool.request("HEAD", "/media/ok-1", {})
+        time.sleep(0.1)
+        pool.request("HEAD", "/media/ok-2", {})
+        stats = pool.stats()
+        pool.close()
+
+        self.assertEqual(1, stats["evicted"])
+        self.assertEqual(0, stats["reused"])
+        self.assertEqual(2, stats["created"])
+
+    def test_async_heads_share_pooled_streams(self):
+        client = S3Client(_storage_config(self.endpoint, pool_size=2))
+
+        async def _run():
+            results = await client.head_objects_async([f"ok-{i}" for i in range(6)] + ["gone"], parallelism=4)
+            await client.head_object_async("drop-1")
+            await asyncio.sleep(0.05)
+            after_drop = await client.head_object_async("ok-last")
+            return results, after_drop, client.pool_stats()["async"]
+
+        results, after_drop, stats = asyncio.run(_run())
+        client.close()
+
+        self.assertTrue(all(results[f"ok-{i}"] for i in range(6)))
+        self.assertFalse(results["gone"])
+        self.assertTrue(after_drop)
+        self.assertLessEqual(stats["created"], 3)
+        # The dropped stream is either seen at EOF on checkout or fails and is reopened.
+        self.assertEqual(1, stats["reconnects"] + stats["evicted"])
+
+    def test_shared_client_is_one_instance_per_config(self):
+        config = _storage_config(self.endpoint)
+        self.assertIs(S3Client.shared(config), S3Client.shared(config))
+        self.assertIsNot(S3Client.shared(config), S3Client.shared(_storage_config(self.endpoint, bucket="other")))
+
+
+if __name__ == "__main__":
+    unittest.main()
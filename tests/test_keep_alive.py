@@ -0,0 +1,157 @@
+import http.client
+import json
+import socket
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_ROOT = REPO_ROOT / "src"
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from media_server.app import build_server
+from media_server.config import AppConfig, ServerConfig, StorageConfig, STSConfig
+from media_server.handler import MediaRequestHandler
+from media_server.http_layer.connection_stats import CONNECTION_STATS
+from media_server.storage.db import MediaDB
+
+
+def _config(db_path, workers, keepalive_timeout=5):
+    return AppConfig(
+        server=ServerConfig(host="127.0.0.1", port=0, token="t", workers=workers, keepalive_timeout=keepalive_timeout),
+        storage=StorageConfig(
+            endpoint="http://127.0.0.1:9",
+            bucket="media",
+            region="us-east-1",
+            access_key="key",
+            secret_key="secret",
+            session_token="",
+            provider="minio",
+        ),
+        sts=STSConfig(role_arn="arn", policy="", duration=3600),
+        db_path=db_path,
+        log_level="info",
+    )
+
+
+class KeepAliveTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db = MediaDB(str(Path(self.tmpdir.name) / "media.db"))
+        self.saved = (MediaRequestHandler.config, MediaRequestHandler.db)
+
+    def tearDown(self):
+        MediaRequestHandler.config, MediaRequestHandler.db = self.saved
+        MediaRequestHandler.configure_keep_alive(0)
+        self.db.close()
+        self.tmpdir.cleanup()
+
+    def _start(self, config):
+        MediaRequestHandler.config = config
+        MediaRequestHandler.db = self.db
+        server = build_server(config)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server.server_address[1]
+
+    def test_reuses_connection_after_unread_request_body(self):
+        port = self._start(_config(self.db.path, workers=2))
+        before = CONNECTION_STATS.snapshot()
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+
+        conn.request(
+            "POST",
+            "/media/api/v1/workspaces/ws1/fast-upload",
+            body=json.dumps({"fingerprint": "fp", "name": "a.jpg"}),
+        )
+        unauthorized = conn.getresponse()
+        unauthorized.read()
+        sock = conn.sock
+
+        conn.request(
+            "POST",
+            "/media/api/v1/workspaces/ws1/fast-upload",
+            body=json.dumps({"fingerprint": "fp", "name": "a.jpg"}),
+            headers={"x-auth-token": "t"},
+        )
+        miss = conn.getresponse()
+        miss_body = json.loads(miss.read())
+        reused = conn.sock is sock
+
+        conn.request("GET", "/health")
+        health = conn.getresponse()
+        keep_alive_header = health.getheader("Keep-Alive")
+        health.read()
+        conn.close()
+
+        self.assertEqual(401, unauthorized.status)
+        self.assertEqual(11, unauthorized.version)
+        self.assertTrue(reused)
+        self.assertEqual(-1, miss_body["code"])
+        self.assertEqual("timeout=5", keep_alive_header)
+
+        for _ in range(100):
+            after = CONNECTION_STATS.snapshot()
+            if after["connections"] > before["connections"]:
+                break
+            time.sleep(0.02)
+        self.assertEqual(before["connections"] + 1, after["connections"])
+        self.assertEqual(before["requests"] + 3, after["requests"])
+        self.assertEqual(before["reused_requests"] + 2, after["reused_requests"])
+
+    def test_idle_connection_is_closed_after_timeout(self):
+        port = self._start(_config(self.db.path, workers=1, keepalive_timeout=1))
+        sock = socket.create_connection(("127.0.0.1", port), timeout=5)
+        sock.sendall(b"GET /health HTTP/1.1\r\nHost: x\r\n\r\n")
+        received = b""
+        while True:
+            chunk = sock.recv(4096)
+            if not chunk:
+                break
+            received += chunk
+        sock.close()
+
+        self.assertIn(b"HTTP/1.1 200", received)
+        self.assertEqual(1, received.count(b"HTTP/1.1"))
+
+    def test_idle_keep_alive_clients_do_not_starve_new_ones(self):
+        workers = 2
+        port = self._start(_config(self.db.path, workers=workers, keepalive_timeout=15))
+        idle = []
+        for _ in range(workers):
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+            conn.request("GET", "/health")
+            conn.getresponse().read()
+            idle.append(conn)
+            self.addCleanup(conn.close)
+
+        started = time.monotonic()
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+        conn.request("GET", "/health")
+        resp = conn.getresponse()
+        resp.read()
+        conn.close()
+
+        self.assertEqual(200, resp.status)
+        self.assertLess(time.monotonic() - started, 2)
+
+    def test_serial_server_stays_on_http_1_0(self):
+        port = self._start(_config(self.db.path, workers=0))
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+        conn.request("GET", "/health")
+        resp = conn.getresponse()
+        resp.read()
+        conn.close()
+
+        self.assertEqual(10, resp.version)
+        self.assertIsNone(resp.getheader("Keep-Alive"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,169 @@
+import json
+import sys
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from pathlib import Path
+from unittest import mock
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_ROOT = REPO_ROOT / "src"
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from media_server.config import StorageConfig
+from media_server.handlers import tiny_fingerprints
+from media_server.storage.db import MediaDB
+from media_server.storage.key_layout import BUCKET_PREFIXED, PLAIN, KeyLayouts
+from media_server.storage.s3_client import S3Client
+
+
+class _PrefixedStorage(BaseHTTPRequestHandler):
+    """Holds every object under ``/media/media/<key>``: the bucket-prefixed layout."""
+
+    protocol_version = "HTTP/1.1"
+    objects = set()
+    heads = []
+
+    def log_message(self, fmt, *args):
+        return None
+
+    def do_HEAD(self):
+        self.heads.append(self.path)
+        self.send_response(200 if self.path in self.objects else 404)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+
+class KeyLayoutsTest(unittest.TestCase):
+    def test_layout_is_learned_after_consecutive_hits(self):
+        layouts = KeyLayouts("media", learn_after=2)
+        both = [(PLAIN, "ws1/a.jpg"), (BUCKET_PREFIXED, "media/ws1/a.jpg")]
+
+        self.assertEqual(both, layouts.candidates("ws1/a.jpg"))
+        layouts.record_hit("ws1/a.jpg", BUCKET_PREFIXED)
+        self.assertEqual(2, len(layouts.candidates("ws1/b.jpg")))
+        layouts.record_hit("ws1/b.jpg", BUCKET_PREFIXED)
+
+        self.assertEqual([(BUCKET_PREFIXED, "media/ws1/c.jpg"), (PLAIN, "ws1/c.jpg")], layouts.candidates("ws1/c.jpg"))
+        self.assertEqual(2, len(layouts.candidates("ws2/c.jpg")))
+        self.assertEqual([(PLAIN, "media/ws1/d.jpg")], layouts.candidates("media/ws1/d.jpg"))
+
+    def test_mixed_workspace_keeps_trying_both_and_zero_never_learns(self):
+        layouts = KeyLayouts("media", learn_after=3)
+        layouts.record_hit("ws1/a.jpg", PLAIN)
+        layouts.record_hit("ws1/b.jpg", BUCKET_PREFIXED)
+        disabled = KeyLayouts("media", learn_after=0)
+        for name in "abcd":
+            disabled.record_hit(f"ws1/{name}.jpg", PLAIN)
+
+        self.assertEqual(2, len(layouts.candidates("ws1/c.jpg")))
+        self.assertEqual({"learned": 0, "mixed": 1}, {k: layouts.stats()[k] for k in ("learned", "mixed")})
+        self.assertEqual(2, len(disabled.candidates("ws1/e.jpg")))
+
+    def test_learned_layouts_persist_in_media_db(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        db = MediaDB(str(Path(tmpdir.name) / "media.db"))
+        self.addCleanup(db.close)
+        layouts = KeyLayouts("media", learn_after=1, store=db)
+        layouts.record_hit("ws1/a.jpg", PLAIN)
+        layouts.record_hit("ws2/a.jpg", BUCKET_PREFIXED)
+
+        reloaded = KeyLayouts("media", learn_after=1, store=db)
+
+        self.assertEqual({"ws1": PLAIN, "ws2": BUCKET_PREFIXED}, db.get_key_layouts("media"))
+        self.assertEqual({}, db.get_key_layouts("other"))
+        self.assertEqual(BUCKET_PREFIXED, reloaded.candidates("ws2/b.jpg")[0][0])
+
+
+class _TinyHandler:
+    def __init__(self, payload, db, storage):
+        body = json.dumps(payload).encode("utf-8")
+        self.command = "POST"
+        self.path = "/media/api/v1/workspaces/ws1/files/tiny-fingerprints"
+        self.headers = {"x-auth-token": "t", "Content-Length": str(len(body))}
+        self.rfile = BytesIO(body)
+        self.wfile = BytesIO()
+        self.db = db
+        self.config = type("Config", (), {"storage": storage, "server": type("S", (), {"token": "t"})()})()
+        self.status = None
+
+    def send_response(self, status):
+        self.status = status
+
+    def send_header(self, key, value):
+        return None
+
+    def end_headers(self):
+        return None
+
+    def read_json(self):
+        return json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+
+    def require_token(self):
+        return "t"
+
+
+class HeadObjectLayoutTest(unittest.TestCase):
+    def setUp(self):
+        # a, b, c sit under the bucket prefix; d was uploaded under the plain key.
+        objects = {f"/media/media/ws1/{name}.jpg" for name in "abc"} | {"/media/ws1/d.jpg"}
+        self.handler_cls = type("Storage", (_PrefixedStorage,), {"objects": objects, "heads": []})
+        server = ThreadingHTTPServer(("127.0.0.1", 0), self.handler_cls)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.storage = StorageConfig(
+            endpoint=f"http://127.0.0.1:{server.server_address[1]}",
+            bucket="media",
+            region="us-east-1",
+            access_key="key",
+            secret_key="secret",
+            session_token="",
+            provider="minio",
+        )
+        self.client = S3Client(self.storage)
+        self.addCleanup(self.client.close)
+
+    def test_learned_layout_is_tried_first_and_misses_check_both(self):
+        found = [self.client.head_object(f"ws1/{name}.jpg") for name in "abc"]
+        before = len(self.handler_cls.heads)
+        hit = self.client.head_object("ws1/b.jpg")
+        missing = self.client.head_object("ws1/gone.jpg")
+
+        self.assertTrue(all(found))
+        self.assertEqual(6, before)
+        self.assertTrue(hit)
+        self.assertFalse(missing)
+        self.assertEqual(
+            ["/media/media/ws1/b.jpg", "/media/media/ws1/gone.jpg", "/media/ws1/gone.jpg"],
+            self.handler_cls.heads[before:],
+        )
+
+    def test_object_under_the_other_layout_keeps_its_row_and_demotes_the_workspace(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        db = MediaDB(str(Path(tmpdir.name) / "media.db"))
+        self.addCleanup(db.close)
+        db.upsert_file("ws1", "fp-d", "tiny-d", "ws1/d.jpg", "d.jpg", "/")
+        for name in "abc":
+            self.client.head_object(f"ws1/{name}.jpg")
+        handler = _TinyHandler({"tiny_fingerprints": ["tiny-d"]}, db, self.storage)
+
+        with mock.patch.object(tiny_fingerprints.S3Client, "shared", return_value=self.client):
+            tiny_fingerprints.handle_tiny_fingerprints(handler, "ws1")
+
+        body = json.loads(handler.wfile.getvalue())
+        self.assertEqual(["tiny-d"], body["data"]["tiny_fingerprints"])
+        self.assertEqual("ws1/d.jpg", db.get_object_key_by_fingerprint("ws1", "fp-d"))
+        self.assertEqual((0, 1, 1), tuple(self.client.layouts.stats()[k] for k in ("learned", "mixed", "demoted")))
+        self.assertEqual(2, len(self.client.layouts.candidates("ws1/e.jpg")))
+
+
+if __name__ == "__main__":
+    unittest.main()
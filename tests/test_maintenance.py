@@ -0,0 +1,125 @@
+import sqlite3
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_ROOT = REPO_ROOT / "src"
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from media_server.storage.db import MediaDB
+from media_server.storage.maintenance import MaintenanceScheduler
+
+
+class MaintenanceSchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.db = MediaDB(str(Path(self.tmpdir.name) / "media.db"))
+        self.addCleanup(self.db.close)
+        with self.db.transaction() as conn:
+            for index in range(2000):
+                self.db.upsert_file("ws1", f"fp{index}", f"tiny{index}", f"ws1/{index}.jpg", "a.jpg", "/", conn=conn)
+
+    def _tasks(self, runs):
+        return [(run["task"], run["status"]) for run in runs]
+
+    def test_checkpoint_optimize_and_vacuum_are_recorded(self):
+        with self.db.transaction() as conn:
+            conn.execute("DELETE FROM media_files WHERE id % 2 = 0")
+        scheduler = MaintenanceScheduler(self.db, wal_limit_bytes=1, optimize_interval=60, budget_ms=2000, idle_seconds=0)
+
+        runs = scheduler.run_once(now=100.0)
+        again = scheduler.run_once(now=130.0)
+        stats = scheduler.stats()
+
+        self.assertEqual(
+            [("checkpoint", "ok"), ("optimize", "ok"), ("incremental_vacuum", "ok")],
+            self._tasks(runs),
+        )
+        self.assertFalse(runs[0]["result"]["busy"])
+        self.assertGreater(runs[0]["result"]["wal_bytes_before"], 0)
+        self.assertEqual(0, runs[0]["result"]["wal_bytes_after"])
+        self.assertGreater(runs[2]["result"]["freed_pages"], 0)
+        self.assertTrue(self.db._fetch_all("SELECT * FROM sqlite_stat1"))
+        self.assertNotIn("optimize", [task for task, _ in self._tasks(again)])
+        self.assertEqual(1, stats["tasks"]["optimize"]["runs"])
+        self.assertGreaterEqual(stats["recent"][0]["duration_ms"], 0)
+
+    def test_never_waits_past_the_budget(self):
+        scheduler = MaintenanceScheduler(self.db, wal_limit_bytes=1, budget_ms=50, idle_seconds=3600)
+        with self.db.transaction():
+            started = time.monotonic()
+            skipped = scheduler.run_once()
+        reader = sqlite3.connect(self.db.path, isolation_level=None)
+        self.addCleanup(reader.close)
+        reader.execute("BEGIN")
+        reader.execute("SELECT COUNT(*) FROM media_files").fetchone()
+        with self.db.transaction() as conn:
+            conn.execute("UPDATE media_files SET etag='x'")
+        blocked = scheduler.run_once()
+        elapsed = time.monotonic() - started
+
+        self.assertEqual([("checkpoint", "skipped")], self._tasks(skipped))
+        self.assertEqual([("checkpoint", "ok")], self._tasks(blocked))
+        self.assertTrue(blocked[0]["result"]["busy"])
+        self.assertLess(elapsed, 2)
+
+
+class PlaceholderSweepTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.db = MediaDB(str(Path(self.tmpdir.name) / "media.db"))
+        self.addCleanup(self.db.close)
+        with self.db.transaction() as conn:
+            for index in range(1200):
+                self.db.upsert_fingerprint_tiny("ws1", f"stale{index}", f"tiny{index}", conn=conn)
+            conn.execute("UPDATE media_files SET updated_at = updated_at - 86400")
+            self.db.upsert_fingerprint_tiny("ws1", "fresh", "tiny-fresh", conn=conn)
+            # Uploaded long ago: a real row, not a placeholder.
+            self.db.upsert_fingerprint_tiny("ws1", "done", "tiny-done", conn=conn)
+            self.db.upsert_file("ws1", "done", "tiny-done", "ws1/done.jpg", "done.jpg", "/", conn=conn)
+            conn.execute("UPDATE media_files SET updated_at = 0 WHERE fingerprint = 'done'")
+
+    def test_sweeps_stale_placeholders_in_batches(self):
+        scheduler = MaintenanceScheduler(
+            self.db, wal_limit_bytes=1 << 40, optimize_interval=1e9, budget_ms=2000, placeholder_max_age=3600, sweep_batch=500
+        )
+        scheduler._last_optimized[self.db.path] = 0.0
+        runs = scheduler.run_once(now=1.0)
+        remaining = {row[0] for row in self.db._fetch_all("SELECT fingerprint FROM media_files")}
+
+        self.assertEqual([("sweep_placeholders", "ok")], [(run["task"], run["status"]) for run in runs])
+        self.assertEqual({"deleted": 1200, "batches": 3, "done": True}, runs[0]["result"])
+        self.assertEqual({"fresh", "done"}, remaining)
+        self.assertEqual(1200, scheduler.stats()["placeholders_reclaimed"])
+        self.assertEqual([], scheduler.run_once(now=2.0))
+
+    def test_backlog_is_resumed_on_the_next_check(self):
+        scheduler = MaintenanceScheduler(self.db, wal_limit_bytes=1 << 40, budget_ms=0.001, placeholder_max_age=3600)
+        scheduler._last_optimized[self.db.path] = 0.0
+
+        first = scheduler.run_once(now=1.0)[0]["result"]
+        second = scheduler.run_once(now=2.0)
+
+        self.assertFalse(first["done"])
+        self.assertEqual(["sweep_placeholders"], [run["task"] for run in second])
+
+    def test_sweep_uses_placeholder_index(self):
+        plan = " ".join(
+            row[3]
+            for row in self.db._fetch_all(
+                "EXPLAIN QUERY PLAN SELECT id FROM media_files WHERE object_key = '' AND updated_at < ? LIMIT 500", (0,)
+            )
+        )
+
+        self.assertIn("idx_media_placeholder", plan)
+
+
+if __name__ == "__main__":
+    unittest.main()
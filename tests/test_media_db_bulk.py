@@ -0,0 +1,58 @@
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_ROOT = REPO_ROOT / "src"
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from media_server.storage import db as db_module
+from media_server.storage.db import MediaDB
+
+
+class MediaDBBulkTinyTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db = MediaDB(str(Path(self.tmpdir.name) / "media.db"))
+        for index in range(5):
+            self.db.upsert_file("ws1", f"fp{index}", f"tiny{index}", f"ws1/{index}.jpg", f"{index}.jpg", "/")
+        self.db.upsert_file("ws2", "fp0", "tiny0", "ws2/0.jpg", "0.jpg", "/")
+        self.db.upsert_fingerprint_tiny("ws1", "fp-pending", "tiny-pending", file_name="p.jpg")
+
+    def tearDown(self):
+        self.db.close()
+        self.tmpdir.cleanup()
+
+    def test_get_object_keys_by_tiny_matches_single_lookups(self):
+        requested = ["tiny3", "tiny0", "missing", "tiny-pending", "tiny3", 42, "tiny4"]
+
+        with mock.patch.object(db_module, "BULK_CHUNK_SIZE", 2):
+            found = self.db.get_object_keys_by_tiny("ws1", requested)
+
+        self.assertEqual({"tiny0": "ws1/0.jpg", "tiny3": "ws1/3.jpg", "tiny4": "ws1/4.jpg"}, found)
+        for fp, object_key in found.items():
+            self.assertEqual(object_key, self.db.get_object_key_by_tiny("ws1", fp))
+
+    def test_get_object_by_fingerprint_returns_key_and_verified_at(self):
+        self.db.mark_verified("ws1", "fp2", verified_at=1700000000)
+
+        self.assertEqual(("ws1/2.jpg", 1700000000), self.db.get_object_by_fingerprint("ws1", "fp2"))
+        self.assertEqual(("ws1/3.jpg", None), self.db.get_object_by_fingerprint("ws1", "fp3"))
+        self.assertIsNone(self.db.get_object_by_fingerprint("ws1", "fp-pending"))
+        self.assertIsNone(self.db.get_object_by_fingerprint("ws1", "missing"))
+
+    def test_delete_by_tiny_many_is_scoped_to_workspace(self):
+        with mock.patch.object(db_module, "BULK_CHUNK_SIZE", 2):
+            self.db.delete_by_tiny_many("ws1", ["tiny0", "tiny1", "tiny2", "missing"])
+
+        remaining = self.db.get_object_keys_by_tiny("ws1", [f"tiny{index}" for index in range(5)])
+        self.assertEqual({"tiny3", "tiny4"}, set(remaining))
+        self.assertEqual("ws2/0.jpg", self.db.get_object_key_by_tiny("ws2", "tiny0"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_ROOT = REPO_ROOT / "src"
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from media_server.storage import bloom as bloom_module
+from media_server.storage.bloom import CountingBloomFilter, MembershipFilter
+from media_server.storage.db import MediaDB
+
+
+class CountingBloomFilterTest(unittest.TestCase):
+    def test_false_positive_rate_close_to_target_and_removal(self):
+        bloom = CountingBloomFilter(20000, fp_rate=0.01)
+        for index in range(20000):
+            bloom.add(f"fp{index}")
+        false_positives = sum(f"unknown{index}" in bloom for index in range(20000))
+        for index in range(0, 20000, 2):
+            bloom.remove(f"fp{index}")
+
+        self.assertLess(false_positives / 20000, 0.02)
+        self.assertTrue(all(f"fp{index}" in bloom for index in range(1, 20000, 2)))
+        self.assertEqual(10000, bloom.count)
+
+
+class MembershipFilterDBTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.db = MediaDB(str(Path(self.tmpdir.name) / "media.db"))
+        self.addCleanup(self.db.close)
+        self.db.upsert_file("ws1", "fp-loaded", "tiny-loaded", "ws1/loaded.jpg", "loaded.jpg", "/")
+        self.db.upsert_fingerprint_tiny("ws1", "fp-pending", "tiny-pending")
+        self.membership = self.db.enable_membership_filter()
+
+    def test_definite_misses_skip_sqlite(self):
+        with mock.patch.object(self.db, "_fetch_one", side_effect=AssertionError("db touched")):
+            self.assertIsNone(self.db.get_object_key_by_fingerprint("ws1", "fp-new"))
+            self.assertIsNone(self.db.get_object_key_by_fingerprint("ws1", "fp-pending"))
+            self.assertIsNone(self.db.get_object_key_by_tiny("ws2", "tiny-loaded"))
+        with mock.patch.object(self.db, "_fetch_all", side_effect=AssertionError("db touched")):
+            self.assertEqual({}, self.db.get_objects_by_tiny("ws1", ["tiny-new", "tiny-pending"]))
+
+        self.assertEqual("ws1/loaded.jpg", self.db.get_object_key_by_fingerprint("ws1", "fp-loaded"))
+        self.assertEqual({"tiny-loaded": "ws1/loaded.jpg"}, self.db.get_object_keys_by_tiny("ws1", ["tiny-loaded"]))
+        stats = self.membership.stats()
+        self.assertEqual(5, stats["definite_misses"])
+        self.assertEqual(2, stats["hits"])
+        self.assertGreater(stats["memory_bytes"], 0)
+
+    def test_writes_keep_filter_in_sync(self):
+        self.db.upsert_file("ws1", "fp-pending", "tiny-pending", "ws1/pending.jpg", "pending.jpg", "/")
+        self.db.upsert_fingerprint_tiny("ws1", "fp-pending", "tiny-renamed")
+        self.assertEqual("ws1/pending.jpg", self.db.get_object_key_by_fingerprint("ws1", "fp-pending"))
+        self.assertEqual("ws1/pending.jpg", self.db.get_object_key_by_tiny("ws1", "tiny-renamed"))
+
+        self.db.delete_by_fingerprint("ws1", "fp-loaded")
+        self.db.delete_by_tiny_many("ws1", ["tiny-renamed"])
+        with mock.patch.object(self.db, "_fetch_one", side_effect=AssertionError("db touched")):
+            self.assertIsNone(self.db.get_object_key_by_fingerprint("ws1", "fp-loaded"))
+            self.assertIsNone(self.db.get_object_key_by_tiny("ws1", "tiny-renamed"))
+            self.assertIsNone(self.db.get_object_key_by_fingerprint("ws1", "fp-pending"))
+
+    def test_rolled_back_delete_keeps_the_row_visible(self):
+        with self.assertRaises(RuntimeError):
+            with self.db.transaction() as conn:
+                self.db.delete_by_fingerprint("ws1", "fp-loaded", conn=conn)
+                raise RuntimeError("abort")
+
+        self.assertEqual("ws1/loaded.jpg", self.db.get_object_key_by_fingerprint("ws1", "fp-loaded"))
+
+        with self.db.transaction() as conn:
+            self.db.delete_by_tiny("ws1", "tiny-loaded", conn=conn)
+            # Not committed yet: the filter must still let lookups through.
+            self.assertIn("tiny-loaded", self.membership._filters["tiny"]["ws1"])
+        self.assertNotIn("tiny-loaded", self.membership._filters["tiny"]["ws1"])
+
+    def test_filters_are_sized_from_each_workspace_row_count(self):
+        membership = MembershipFilter()
+        membership.load([("ws-big", f"fp{index}", f"tiny{index}") for index in range(5000)])
+        membership.add("fingerprint", "ws-new", "fp1")
+        capacity = {ws: membership._filters["fingerprint"][ws].capacity for ws in ("ws-big", "ws-new")}
+        new_bytes = membership._filters["fingerprint"]["ws-new"].nbytes
+
+        self.assertEqual({"ws-big": 10000, "ws-new": bloom_module.MIN_CAPACITY}, capacity)
+        self.assertLess(new_bytes, 16 * 1024)
+
+    def test_workspace_filter_is_rebuilt_when_it_outgrows_its_capacity(self):
+        with mock.patch.object(bloom_module, "MIN_CAPACITY", 4):
+            membership = self.db.enable_membership_filter()
+            with self.db.transaction() as conn:
+                for index in range(6):
+                    self.db.upsert_file(
+                        "ws1", f"fp{index}", f"tiny{index}", f"ws1/{index}.jpg", f"{index}.jpg", "/", conn=conn
+                    )
+                self.assertEqual(0, membership.stats()["rebuilds"])
+
+        stats = membership.stats()
+        self.assertEqual(1, stats["rebuilds"])
+        self.assertEqual(14, membership._filters["fingerprint"]["ws1"].capacity)
+        for index in range(6):
+            self.assertEqual(f"ws1/{index}.jpg", self.db.get_object_key_by_fingerprint("ws1", f"fp{index}"))
+        self.assertIsNone(self.db.get_object_key_by_fingerprint("ws1", "fp-pending"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+import http.client
+import json
+import sys
+import tempfile
+import threading
+import unittest
+from dataclasses import replace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_ROOT = REPO_ROOT / "src"
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from media_server.app import build_server
+from media_server.config import AppConfig, ServerConfig, StorageConfig, STSConfig
+from media_server.handler import MediaRequestHandler
+from media_server.storage.db import MediaDB
+from media_server.storage.s3_client import S3Client
+from media_server.utils import metrics
+
+# Nothing listens on the discard port, so every request is refused.
+DOWN = StorageConfig(
+    endpoint="http://127.0.0.1:9",
+    bucket="media",
+    region="us-east-1",
+    access_key="key",
+    secret_key="secret",
+    session_token="",
+    provider="minio",
+    verify_freshness=0,
+    breaker_failures=1,
+    breaker_reset=60.0,
+)
+
+
+class _FailingStorage(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, fmt, *args):
+        return None
+
+    def do_HEAD(self):
+        self.send_response(503)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+
+class MetricsEndpointTest(unittest.TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        config = AppConfig(
+            server=ServerConfig(host="127.0.0.1", port=0, token="t", workers=2),
+            storage=DOWN,
+            sts=STSConfig(role_arn="arn", policy="", duration=3600),
+            db_path=str(Path(tmpdir.name) / "media.db"),
+            log_level="info",
+        )
+        saved = (MediaRequestHandler.config, MediaRequestHandler.db)
+        self.addCleanup(lambda: setattr(MediaRequestHandler, "config", saved[0]))
+        self.addCleanup(lambda: setattr(MediaRequestHandler, "db", saved[1]))
+        self.addCleanup(MediaRequestHandler.configure_keep_alive, 0)
+        db = MediaDB(config.db_path)
+        self.addCleanup(db.close)
+        MediaRequestHandler.config = config
+        MediaRequestHandler.db = db
+        server = build_server(config)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.port = server.server_address[1]
+
+    def _get(self, headers):
+        conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=5)
+        conn.request("GET", "/metrics", headers=headers)
+        response = conn.getresponse()
+        body = response.read().decode("utf-8")
+        conn.close()
+        return response.status, body
+
+    def _breaker_after_failed_head(self, storage, name):
+        client = S3Client(storage)
+        self.addCleanup(client.close)
+        metrics.register(name, client.breaker.stats)
+        self.addCleanup(metrics.unregister, name)
+        with self.assertRaises(Exception):
+            client.head_object("ws1/a.jpg")
+        status, body = self._get({"x-auth-token": "t"})
+        self.assertEqual(200, status)
+        return body, json.loads(body)["data"][name]
+
+    def test_requires_token(self):
+        missing, _ = self._get({})
+        invalid, _ = self._get({"x-auth-token": "wrong"})
+        status, _ = self._get({"x-auth-token": "t"})
+
+        self.assertEqual((401, 401, 200), (missing, invalid, status))
+
+    def test_transport_failure_reports_the_exception_type_only(self):
+        body, breaker = self._breaker_after_failed_head(DOWN, "test_breaker_down")
+
+        self.assertEqual("ConnectionRefusedError", breaker["last_error_type"])
+        self.assertNotIn("Connection refused", body)
+
+    def test_server_error_reports_a_status_label(self):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _FailingStorage)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        storage = replace(DOWN, endpoint=f"http://127.0.0.1:{server.server_address[1]}")
+
+        _, breaker = self._breaker_after_failed_head(storage, "test_breaker_5xx")
+
+        self.assertEqual(("open", "HTTPStatus"), (breaker["state"], breaker["last_error_type"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import sqlite3
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_ROOT = REPO_ROOT / "src"
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from media_server.storage import migrations
+from media_server.storage.db import MediaDB
+
+
+class SchemaMigrationTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.db_path = str(Path(self.tmpdir.name) / "media.db")
+
+    def _user_version(self):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            return migrations.schema_version(conn)
+        finally:
+            conn.close()
+
+    def test_fresh_database_migrates_once_and_reopen_skips_ddl(self):
+        MediaDB(self.db_path).close()
+        self.assertEqual(migrations.SCHEMA_VERSION, self._user_version())
+
+        with mock.patch.object(migrations, "_baseline", side_effect=AssertionError("DDL ran")):
+            db = MediaDB(self.db_path)
+        self.addCleanup(db.close)
+        self.assertIsNotNone(db.schema_ready_ms)
+
+    def test_unversioned_database_is_upgraded_in_place(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute(
+            """
+            CREATE TABLE media_files (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                workspace_id TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                tiny_fingerprint TEXT,
+                object_key TEXT NOT NULL,
+                file_name TEXT,
+                file_path TEXT,
+                created_at INTEGER NOT NULL,
+                UNIQUE(workspace_id, fingerprint)
+            )
+            """
+        )
+        conn.execute(
+            "INSERT INTO media_files (workspace_id, fingerprint, object_key, created_at) VALUES ('ws1', 'fp1', 'k', 1)"
+        )
+        conn.commit()
+        conn.close()
+
+        db = MediaDB(self.db_path)
+        self.addCleanup(db.close)
+        columns = {row[1] for row in db._fetch_all("PRAGMA table_info(media_files)")}
+
+        self.assertEqual("k", db.get_object_key_by_fingerprint("ws1", "fp1"))
+        self.assertTrue({"capture_time", "verified_at", "etag", "size"} <= columns)
+        self.assertEqual(migrations.SCHEMA_VERSION, self._user_version())
+
+    def test_listing_query_uses_created_at_index(self):
+        db = MediaDB(self.db_path)
+        self.addCleanup(db.close)
+        # The columns web/app.py lists; the index is not covering, only ordered.
+        plan = " ".join(
+            row[3]
+            for row in db._fetch_all(
+                "EXPLAIN QUERY PLAN SELECT id, workspace_id, fingerprint, tiny_fingerprint, object_key, "
+                "file_name, file_path, is_original, sub_file_type, capture_time, absolute_altitude, "
+                "relative_altitude, gimbal_yaw_degree, shoot_position_lat, shoot_position_lng, created_at "
+                "FROM media_files WHERE object_key IS NOT NULL AND object_key != '' ORDER BY created_at DESC"
+            )
+        )
+
+        self.assertIn("idx_media_created_at", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+
+if __name__ == "__main__":
+    unittest.main()
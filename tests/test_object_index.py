@@ -0,0 +1,227 @@
+import http.client
+import json
+import sys
+import tempfile
+import threading
+import unittest
+from dataclasses import replace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_ROOT = REPO_ROOT / "src"
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from media_server.config import AppConfig, ServerConfig, StorageConfig, STSConfig
+from media_server.http_layer.aio_server import AsyncMediaServer
+from media_server.storage.db import MediaDB
+from media_server.storage.object_index import ObjectEvent, ObjectIndex, parse_events
+from media_server.storage.s3_client import ObjectStat
+
+
+def _record(event_name, key, sequencer, bucket="media", size=5, etag="e1"):
+    # Shape of one entry in a MinIO webhook body (Records[]).
+    obj = {"key": key, "sequencer": sequencer}
+    if event_name.startswith("s3:ObjectCreated:"):
+        obj.update({"size": size, "eTag": etag, "contentType": "image/jpeg"})
+    return {
+        "eventVersion": "2.0",
+        "eventSource": "minio:s3",
+        "awsRegion": "",
+        "eventTime": "2026-10-17T08:00:00.000Z",
+        "eventName": event_name,
+        "userIdentity": {"principalId": "minioadmin"},
+        "s3": {
+            "s3SchemaVersion": "1.0",
+            "configurationId": "Config",
+            "bucket": {"name": bucket, "arn": f"arn:aws:s3:::{bucket}"},
+            "object": obj,
+        },
+    }
+
+
+def _body(*records):
+    first = records[0]
+    return {
+        "EventName": first["eventName"],
+        "Key": f"{first['s3']['bucket']['name']}/{first['s3']['object']['key']}",
+        "Records": list(records),
+    }
+
+
+class _FakeStorage(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    heads = []
+
+    def log_message(self, fmt, *args):
+        return None
+
+    def do_HEAD(self):
+        self.heads.append(self.path)
+        self.send_response(200 if "/present/" in self.path else 404)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+
+class ParseEventsTest(unittest.TestCase):
+    def test_minio_records_become_object_events(self):
+        body = _body(
+            _record("s3:ObjectCreated:Put", "ws1/DJI+0001%281%29.JPG", "17F2A0C1D2E3B4A5"),
+            _record("s3:ObjectRemoved:Delete", "media/ws1/b.jpg", "17F2A0C1D2E3B4A6"),
+            _record("s3:ObjectCreated:Put", "ws1/c.jpg", "1", bucket="other"),
+            _record("s3:ObjectAccessed:Get", "ws1/d.jpg", "2"),
+        )
+
+        events = parse_events(body, "media")
+
+        self.assertEqual(
+            [
+                ObjectEvent("ws1/DJI 0001(1).JPG", True, "e1", 5, "0000000000000000" + "17f2a0c1d2e3b4a5"),
+                ObjectEvent("media/ws1/b.jpg", False, None, None, "0000000000000000" + "17f2a0c1d2e3b4a6"),
+            ],
+            events,
+        )
+        self.assertEqual([], parse_events({"Records": "nope"}, "media"))
+
+
+class ObjectIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.db = MediaDB(str(Path(self.tmpdir.name) / "media.db"))
+        self.addCleanup(self.db.close)
+        self.now = [2_000_000_000.0]
+        self.index = ObjectIndex(self.db, "media", ttl=60, clock=lambda: self.now[0])
+
+    def _apply(self, *records):
+        return self.index.apply(parse_events(_body(*records), "media"))
+
+    def test_events_are_applied_in_sequencer_order(self):
+        self._apply(_record("s3:ObjectCreated:Put", "ws1/a.jpg", "0A"))
+        self._apply(_record("s3:ObjectRemoved:Delete", "ws1/a.jpg", "0C"))
+        late = self._apply(_record("s3:ObjectCreated:Put", "ws1/a.jpg", "0B"))
+        self._apply(_record("s3:ObjectRemoved:Delete", "media/ws1/a.jpg", "01"))
+        self._apply(_record("s3:ObjectCreated:Put", "media/ws1/b.jpg", "01", etag="eb"))
+        self.now[0] = self.db.get_object_states("ws1", "media", ["ws1/a.jpg"])["ws1/a.jpg"][3]
+
+        known = self.index.lookup(["ws1/a.jpg", "ws1/b.jpg", "ws1/cold.jpg"])
+
+        self.assertEqual({"received": 1, "applied": 0}, late)
+        self.assertEqual(
+            {"ws1/a.jpg": False, "ws1/b.jpg": ObjectStat(etag="eb", size=5, key="media/ws1/b.jpg")}, known
+        )
+
+    def test_removal_under_one_layout_does_not_hide_the_other(self):
+        self._apply(_record("s3:ObjectCreated:Put", "media/ws1/x.jpg", "01", etag="ex"))
+        self._apply(_record("s3:ObjectRemoved:Delete", "ws1/x.jpg", "02"))
+        self._apply(_record("s3:ObjectRemoved:Delete", "ws1/y.jpg", "02"))
+        self.now[0] = self.db.get_object_states("ws1", "media", ["ws1/x.jpg"])["ws1/x.jpg"][3]
+
+        known = self.index.lookup(["ws1/x.jpg", "ws1/y.jpg"])
+
+        self.assertEqual({"ws1/x.jpg": ObjectStat(etag="ex", size=5, key="media/ws1/x.jpg")}, known)
+        self.assertEqual(ObjectStat(etag="ex", size=5), known["ws1/x.jpg"])
+
+    def test_stale_entries_fall_back_and_heads_do_not_override_newer_events(self):
+        self._apply(_record("s3:ObjectRemoved:Delete", "ws1/a.jpg", "0C"))
+        updated_at = self.db.get_object_states("ws1", "media", ["ws1/a.jpg"])["ws1/a.jpg"][3]
+
+        # A HEAD that started before the removal arrived must not resurrect the object.
+        self.index.record(
+            {"ws1/a.jpg": ObjectStat(etag="old", size=1, key="ws1/a.jpg"), "ws1/b.jpg": False}, updated_at - 5
+        )
+        self.now[0] = updated_at
+        fresh = self.index.lookup(["ws1/a.jpg", "ws1/b.jpg"])
+        states = self.db.get_object_states("ws1", "media", ["ws1/a.jpg", "ws1/b.jpg", "media/ws1/b.jpg"])
+        self.now[0] = updated_at + 60
+        stale = self.index.lookup(["ws1/a.jpg", "ws1/b.jpg"])
+
+        # A miss is recorded for both candidates; a.jpg's prefixed key was never seen.
+        self.assertEqual({"ws1/b.jpg": False}, fresh)
+        self.assertEqual(
+            {"ws1/a.jpg": False, "ws1/b.jpg": False, "media/ws1/b.jpg": False},
+            {key: state[0] for key, state in states.items()},
+        )
+        self.assertEqual({}, stale)
+
+
+class StorageEventsWebhookTest(unittest.TestCase):
+    def setUp(self):
+        self.storage = ThreadingHTTPServer(("127.0.0.1", 0), _FakeStorage)
+        threading.Thread(target=self.storage.serve_forever, daemon=True).start()
+        self.addCleanup(self.storage.server_close)
+        self.addCleanup(self.storage.shutdown)
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        storage = StorageConfig(
+            endpoint=f"http://127.0.0.1:{self.storage.server_address[1]}",
+            bucket="media",
+            region="us-east-1",
+            access_key="key",
+            secret_key="secret",
+            session_token="",
+            provider="minio",
+            events_token="hook-secret",
+            layout_learn_after=0,
+        )
+        config = AppConfig(
+            server=ServerConfig(host="127.0.0.1", port=0, token="t", engine="asyncio"),
+            storage=storage,
+            sts=STSConfig(role_arn="arn", policy="", duration=3600),
+            db_path=str(Path(tmpdir.name) / "media.db"),
+            log_level="info",
+        )
+        self.db = MediaDB(config.db_path)
+        self.addCleanup(self.db.close)
+        self.server = AsyncMediaServer(("127.0.0.1", 0), config, self.db)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.conn = http.client.HTTPConnection("127.0.0.1", self.server.server_address[1], timeout=5)
+        self.addCleanup(self.conn.close)
+
+    def _post(self, path, payload, headers):
+        self.conn.request("POST", path, body=json.dumps(payload), headers={"Content-Type": "application/json", **headers})
+        response = self.conn.getresponse()
+        return response.status, json.loads(response.read())
+
+    def test_replayed_notifications_answer_checks_without_heads(self):
+        for fp, key in (("a", "ws1/a.jpg"), ("b", "ws1/b.jpg"), ("c", "ws1/present/c.jpg")):
+            self.db.upsert_file("ws1", f"fp-{fp}", f"tiny-{fp}", key, f"{fp}.jpg", "/")
+        notifications = _body(
+            _record("s3:ObjectCreated:Put", "ws1/a.jpg", "01"),
+            _record("s3:ObjectRemoved:Delete", "ws1/b.jpg", "02"),
+            _record("s3:ObjectRemoved:Delete", "media/ws1/b.jpg", "03"),
+        )
+
+        denied, _ = self._post("/storage/api/v1/events", notifications, {"Authorization": "Bearer wrong"})
+        status, applied = self._post("/storage/api/v1/events", notifications, {"Authorization": "hook-secret"})
+        _FakeStorage.heads = []
+        _, found = self._post(
+            "/media/api/v1/workspaces/ws1/files/tiny-fingerprints",
+            {"tiny_fingerprints": ["tiny-a", "tiny-b", "tiny-c"]},
+            {"x-auth-token": "t"},
+        )
+
+        self.assertEqual(401, denied)
+        self.assertEqual((200, {"received": 3, "applied": 3}), (status, applied["data"]))
+        self.assertEqual(["tiny-a", "tiny-c"], found["data"]["tiny_fingerprints"])
+        # Only the key the index had never heard of went to storage.
+        self.assertEqual(["/media/ws1/present/c.jpg"], _FakeStorage.heads)
+        self.assertIsNone(self.db.get_object_key_by_fingerprint("ws1", "fp-b"))
+        self.assertEqual(
+            (True, None, 0), self.db.get_object_states("ws1", "media", ["ws1/present/c.jpg"])["ws1/present/c.jpg"][:3]
+        )
+
+    def test_endpoint_is_absent_without_a_token(self):
+        self.server.config = replace(self.server.config, storage=replace(self.server.config.storage, events_token=""))
+
+        status, _ = self._post("/storage/api/v1/events", {"Records": []}, {"Authorization": "hook-secret"})
+
+        self.assertEqual(404, status)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+import http.client
+import json
+import socket
+import sys
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_ROOT = REPO_ROOT / "src"
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from media_server.handler import MediaRequestHandler
+from media_server.http_layer.pool_server import PooledHTTPServer
+
+
+class _BlockingHandler(BaseHTTPRequestHandler):
+    release = threading.Event()
+    entered = threading.Semaphore(0)
+
+    def log_message(self, fmt, *args):
+        return None
+
+    def do_GET(self):
+        self.entered.release()
+        self.release.wait(5)
+        body = b"{}"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def _serve(server):
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return thread
+
+
+class PooledHTTPServerTest(unittest.TestCase):
+    def test_serves_concurrent_requests_on_worker_pool(self):
+        server = PooledHTTPServer(("127.0.0.1", 0), MediaRequestHandler, workers=4, backlog=16, queue_depth=16)
+        _serve(server)
+        port = server.server_address[1]
+        statuses = []
+
+        def _get():
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+            conn.request("GET", "/health")
+            statuses.append(conn.getresponse().status)
+            conn.close()
+
+        threads = [threading.Thread(target=_get) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stats = server.stats()
+        server.shutdown()
+        server.server_close()
+
+        self.assertEqual([200] * 8, statuses)
+        self.assertEqual(8, stats["accepted"])
+        self.assertEqual(0, stats["rejected"])
+        self.assertEqual(16, server.request_queue_size)
+
+    def test_rejects_with_503_when_queue_is_full(self):
+        handler = type("Blocking", (_BlockingHandler,), {"release": threading.Event(), "entered": threading.Semaphore(0)})
+        server = PooledHTTPServer(("127.0.0.1", 0), handler, workers=1, queue_depth=1)
+        _serve(server)
+        port = server.server_address[1]
+
+        busy = socket.create_connection(("127.0.0.1", port))
+        busy.sendall(b"GET / HTTP/1.0\r\n\r\n")
+        self.assertTrue(handler.entered.acquire(timeout=5))
+        queued = socket.create_connection(("127.0.0.1", port))
+        queued.sendall(b"GET / HTTP/1.0\r\n\r\n")
+        while server.stats()["queued"] < 1:
+            time.sleep(0.01)
+
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+        conn.request("GET", "/")
+        resp = conn.getresponse()
+        body = json.loads(resp.read().decode("utf-8"))
+        conn.close()
+
+        handler.release.set()
+        busy.recv(1024)
+        queued.recv(1024)
+        busy.close()
+        queued.close()
+        stats = server.stats()
+        server.shutdown()
+        server.server_close()
+
+        self.assertEqual(503, resp.status)
+        self.assertEqual(503, body["code"])
+        self.assertEqual(1, stats["rejected"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+import http.client
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_ROOT = REPO_ROOT / "src"
+
+LAUNCHER = """
+import sys
+sys.path.insert(0, sys.argv[1])
+sys.argv = [sys.argv[0]] + sys.argv[2:]
+from media_server.app import main
+main()
+"""
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _children(parent_pid):
+    pids = set()
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", encoding="utf-8") as handle:
+                fields = handle.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == parent_pid and fields[0] != "Z":
+            pids.add(int(entry))
+    return pids
+
+
+def _wait_for(predicate, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        result = predicate()
+        if result:
+            return result
+        time.sleep(0.1)
+    return predicate()
+
+
+def _metrics_pid(port):
+    try:
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+        conn.request("GET", "/metrics", headers={"x-auth-token": "demo-token"})
+        body = json.loads(conn.getresponse().read())
+        conn.close()
+        return body["data"]["pid"]
+    except OSError:
+        return None
+
+
+@unittest.skipUnless(hasattr(os, "fork") and os.path.isdir("/proc"), "requires fork and procfs")
+class PreforkSupervisorTest(unittest.TestCase):
+    def test_workers_share_port_restart_and_drain(self):
+        port = _free_port()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            proc = subprocess.Popen(
+                [
+                    sys.executable,
+                    "-c",
+                    LAUNCHER,
+                    str(SRC_ROOT),
+                    "--host",
+                    "127.0.0.1",
+                    "--port",
+                    str(port),
+                    "--processes",
+                    "2",
+                    "--db-path",
+                    os.path.join(tmpdir, "media.db"),
+                    "--log-level",
+                    "critical",
+                ]
+            )
+            try:
+                workers = _wait_for(lambda: len(_children(proc.pid)) == 2 and _children(proc.pid))
+                self.assertEqual(2, len(workers))
+                served_by = _wait_for(lambda: _metrics_pid(port))
+                self.assertIn(served_by, workers)
+
+                victim = sorted(workers)[0]
+                os.kill(victim, signal.SIGKILL)
+                replaced = _wait_for(
+                    lambda: (lambda current: len(current) == 2 and victim not in current and current)(
+                        _children(proc.pid)
+                    )
+                )
+                self.assertTrue(replaced)
+                self.assertIn(_wait_for(lambda: _metrics_pid(port)), replaced)
+
+                proc.send_signal(signal.SIGTERM)
+                self.assertEqual(0, proc.wait(timeout=15))
+                self.assertEqual(set(), _children(proc.pid))
+            finally:
+                if proc.poll() is None:
+                    proc.kill()
+                    proc.wait()
+
+
+if __name__ == "__main__":
+    unittest.main()
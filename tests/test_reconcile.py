@@ -0,0 +1,207 @@
+import sys
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+from xml.sax.saxutils import escape
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_ROOT = REPO_ROOT / "src"
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from media_server.config import StorageConfig
+from media_server.storage.db import MediaDB
+from media_server.storage.reconcile import RateLimiter, Reconciler, decode_token
+from media_server.storage.s3_client import S3Client
+from media_server.storage.sharding import ShardedMediaDB
+
+OLD = "2020-01-01T00:00:00.000Z"
+NEW = "2099-01-01T00:00:00.000Z"
+
+
+class _ListingStorage(BaseHTTPRequestHandler):
+    """ListObjectsV2 and HEAD over an in-memory bucket named ``media``."""
+
+    protocol_version = "HTTP/1.1"
+    objects = {}
+    lists = []
+
+    def log_message(self, fmt, *args):
+        return None
+
+    def _send(self, status, body=b""):
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_HEAD(self):
+        key = urlsplit(self.path).path[len("/media/") :]
+        self.send_response(200 if key in self.objects else 404)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self):
+        query = {name: values[0] for name, values in parse_qs(urlsplit(self.path).query).items()}
+        if query.get("list-type") != "2" or "authorization" not in self.headers:
+            self._send(400)
+            return
+        self.lists.append(query)
+        prefix = query.get("prefix", "")
+        after = query.get("continuation-token") or query.get("start-after") or ""
+        delimiter = query.get("delimiter")
+        limit = int(query.get("max-keys", "1000"))
+        entries = []
+        for key in sorted(self.objects):
+            if not key.startswith(prefix) or key <= after:
+                continue
+            if delimiter and delimiter in key[len(prefix) :]:
+                common = key[: key.index(delimiter, len(prefix)) + 1]
+                if entries and entries[-1] == ("prefix", common):
+                    continue
+                entries.append(("prefix", common))
+            else:
+                entries.append(("key", key))
+        page, truncated = entries[:limit], len(entries) > limit
+        parts = ['<ListBucketResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/">']
+        for kind, value in page:
+            if kind == "prefix":
+                parts.append(f"<CommonPrefixes><Prefix>{escape(value)}</Prefix></CommonPrefixes>")
+            else:
+                parts.append(
+                    f"<Contents><Key>{escape(value)}</Key><LastModified>{self.objects[value]}</LastModified>"
+                    f"<ETag>&quot;etag-{escape(value)}&quot;</ETag><Size>7</Size></Contents>"
+                )
+        parts.append(f"<IsTruncated>{'true' if truncated else 'false'}</IsTruncated>")
+        if truncated:
+            last = page[-1][1]
+            # A common prefix covers every key under it, so the next page starts past them all.
+            token = last[:-1] + chr(ord(last[-1]) + 1) if page[-1][0] == "prefix" else last
+            parts.append(f"<NextContinuationToken>{escape(token)}</NextContinuationToken>")
+        parts.append("</ListBucketResult>")
+        self._send(200, "".join(parts).encode("utf-8"))
+
+
+class ReconcilerTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.root = Path(self.tmpdir.name)
+        handler = type("Storage", (_ListingStorage,), {"objects": {}, "lists": []})
+        self.storage = handler
+        server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.client = S3Client(
+            StorageConfig(
+                endpoint=f"http://127.0.0.1:{server.server_address[1]}",
+                bucket="media",
+                region="us-east-1",
+                access_key="minioadmin",
+                secret_key="minioadmin",
+                session_token="",
+                provider="minio",
+            )
+        )
+        self.addCleanup(self.client.close)
+
+    def _db(self, shards=0):
+        db = ShardedMediaDB(str(self.root / "media.db"), shards) if shards else MediaDB(str(self.root / "media.db"))
+        self.addCleanup(db.close)
+        return db
+
+    def _seed(self, db):
+        for index in range(25):
+            self.storage.objects[f"ws1/{index:03d}.jpg"] = OLD
+            db.upsert_file("ws1", f"fp{index}", None, f"ws1/{index:03d}.jpg", "a.jpg", "/")
+        # Rows without objects, under both layouts.
+        db.upsert_file("ws1", "gone", None, "ws1/gone.jpg", "a.jpg", "/")
+        db.upsert_file("ws1", "gone-prefixed", None, "media/ws1/gone2.jpg", "a.jpg", "/")
+        # Uploaded under the bucket-prefixed layout but recorded without it: not drift.
+        self.storage.objects["media/ws1/prefixed.jpg"] = OLD
+        db.upsert_file("ws1", "prefixed", None, "ws1/prefixed.jpg", "a.jpg", "/")
+        # Objects nobody points at, in a known workspace and in one without rows.
+        self.storage.objects["ws1/orphan.jpg"] = OLD
+        self.storage.objects["ws1/recent.jpg"] = NEW
+        self.storage.objects["media/ws2/lost.jpg"] = OLD
+
+    def _drift(self, entries):
+        return sorted((entry["kind"], entry["workspace_id"], entry["object_key"]) for entry in entries)
+
+    def test_reports_both_kinds_of_drift(self):
+        db = self._db()
+        self._seed(db)
+        found = []
+        stats = Reconciler(db, self.client, "media", rate=0, page_size=10).run(on_drift=found.append)
+
+        self.assertEqual(
+            [
+                ("missing_object", "ws1", "media/ws1/gone2.jpg"),
+                ("missing_object", "ws1", "ws1/gone.jpg"),
+                ("orphan_object", "ws1", "ws1/orphan.jpg"),
+                ("orphan_object", "ws1", "ws1/recent.jpg"),
+                ("orphan_object", "ws2", "media/ws2/lost.jpg"),
+            ],
+            self._drift(found),
+        )
+        self.assertEqual(2, stats["workspaces"])
+        self.assertEqual(28, stats["rows"])
+        self.assertTrue(all(int(query["max-keys"]) == 10 for query in self.storage.lists))
+        self.assertFalse(any(entry["fixed"] for entry in found))
+
+    def test_fixes_drift_on_sharded_db(self):
+        db = self._db(shards=2)
+        self._seed(db)
+        reconciler = Reconciler(db, self.client, "media", rate=0, fix_missing=True, fix_orphans=True)
+        stats = reconciler.run()
+        again = []
+        reconciler.run(on_drift=again.append)
+
+        self.assertEqual((2, 2), (stats["deleted"], stats["adopted"]))
+        self.assertIsNone(db.get_object_key_by_fingerprint("ws1", "gone"))
+        self.assertEqual("media/ws2/lost.jpg", db.get_object_key_by_fingerprint("ws2", "reconciled:media/ws2/lost.jpg"))
+        # Too young to adopt: its upload-callback may still be on the way.
+        self.assertEqual([("orphan_object", "ws1", "ws1/recent.jpg")], self._drift(again))
+
+    def test_resumes_from_checkpoint_token(self):
+        db = self._db()
+        self._seed(db)
+        tokens = []
+        first = []
+        Reconciler(db, self.client, "media", rate=0, page_size=5).run(
+            workspaces=["ws1"], on_drift=first.append, on_checkpoint=tokens.append, checkpoint_every=10
+        )
+        token = tokens[1]
+        resumed = []
+        self.storage.lists.clear()
+        Reconciler(db, self.client, "media", rate=0, page_size=5).run(workspaces=["ws1"], resume=token, on_drift=resumed.append)
+
+        self.assertEqual(("ws1", "ws1/019.jpg"), decode_token(token))
+        self.assertEqual(
+            [entry for entry in self._drift(first) if entry[2].split("/")[-1] > "019.jpg"], self._drift(resumed)
+        )
+        self.assertEqual("ws1/019.jpg", self.storage.lists[0]["start-after"])
+
+    def test_rate_limiter_spaces_requests(self):
+        now = [0.0]
+        slept = []
+
+        def _sleep(seconds):
+            slept.append(seconds)
+            now[0] += seconds
+
+        limiter = RateLimiter(4, clock=lambda: now[0], sleep=_sleep)
+        for _ in range(5):
+            limiter.wait()
+
+        self.assertEqual([0.25] * 4, slept)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import sys
+import unittest
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_ROOT = REPO_ROOT / "src"
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from media_server.http_layer.router import Route, Router, resolve_route
+
+
+class RouterTest(unittest.TestCase):
+    def test_resolves_handlers_and_params_per_method(self):
+        router = Router(handlers={"fast-upload": "upload", "health": "health"})
+
+        self.assertEqual(("upload", {"workspace_id": "ws1"}), router.resolve("POST", "/media/api/v1/workspaces/ws1/fast-upload"))
+        self.assertEqual(("health", {}), router.resolve("GET", "/health"))
+        # Routes without a handler are not compiled in.
+        self.assertEqual((None, {}), router.resolve("POST", "/storage/api/v1/workspaces/ws1/sts"))
+        self.assertEqual((None, {}), router.resolve("GET", "/media/api/v1/workspaces/ws1/fast-upload"))
+
+    def test_rejects_what_the_regex_routes_rejected(self):
+        router = Router()
+        for path in (
+            "/media/api/v1/workspaces//fast-upload",
+            "/media/api/v1/workspaces/ws1/fast-upload/",
+            "/media/api/v1/workspaces/a/b/fast-upload",
+            "media/api/v1/workspaces/ws1/fast-upload",
+            "/",
+        ):
+            self.assertEqual((None, {}), router.resolve("POST", path), path)
+        self.assertEqual(("tiny-fingerprints", "ws 1"), resolve_route("POST", "/media/api/v1/workspaces/ws 1/files/tiny-fingerprints"))
+
+    def test_literal_segments_win_and_backtrack_to_params(self):
+        router = Router(
+            [
+                Route("item", "GET", "/items/{item_id}/detail"),
+                Route("latest", "GET", "/items/latest"),
+                Route("pair", "GET", "/items/{item_id}/{part}"),
+            ]
+        )
+
+        self.assertEqual(("latest", {}), router.resolve("GET", "/items/latest"))
+        self.assertEqual(("item", {"item_id": "latest"}), router.resolve("GET", "/items/latest/detail"))
+        self.assertEqual(("pair", {"item_id": "7", "part": "x"}), router.resolve("GET", "/items/7/x"))
+
+    def test_duplicate_routes_are_rejected(self):
+        with self.assertRaises(ValueError):
+            Router([Route("a", "GET", "/x/{id}"), Route("b", "GET", "/x/{other}")])
+
+
+if __name__ == "__main__":
+    unittest.main()
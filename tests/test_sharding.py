@@ -0,0 +1,166 @@
+import importlib.util
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_ROOT = REPO_ROOT / "src"
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+SCRIPTS_ROOT = SRC_ROOT / "media_server" / "scripts"
+if str(SCRIPTS_ROOT) not in sys.path:
+    sys.path.insert(0, str(SCRIPTS_ROOT))
+
+from media_server.storage.db import MediaDB
+from media_server.storage.sharding import ShardedMediaDB, shard_index, shard_paths
+from media_server.storage.write_behind import WriteBehindQueue
+from split_media_db import split
+
+WORKSPACES = [f"ws{index}" for index in range(12)]
+
+
+class ShardedMediaDBTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.db_path = str(Path(self.tmpdir.name) / "media.db")
+
+    def _rows(self, path):
+        conn = sqlite3.connect(path)
+        try:
+            return {row[0] for row in conn.execute("SELECT workspace_id FROM media_files")}
+        finally:
+            conn.close()
+
+    def test_workspaces_route_to_their_own_shard(self):
+        db = ShardedMediaDB(self.db_path, 3)
+        writer = WriteBehindQueue(db, max_batch=64, max_delay_ms=1)
+        for workspace_id in WORKSPACES:
+            db.upsert_file(workspace_id, "fp-file", "tiny-file", f"{workspace_id}/a.jpg", "a.jpg", "/")
+            writer.upsert_fingerprint_tiny(workspace_id, "fp-pending", "tiny-pending")
+        writer.close()
+        db.enable_membership_filter()
+        found = {workspace_id: db.get_object_keys_by_tiny(workspace_id, ["tiny-file"]) for workspace_id in WORKSPACES}
+        pending = db.get_tiny_by_fingerprint("ws5", "fp-pending")
+        with db.shard_for("ws7").transaction() as conn:
+            db.delete_by_fingerprint("ws7", "fp-file", conn=conn)
+        deleted = db.get_object_key_by_fingerprint("ws7", "fp-file")
+        db.close()
+
+        for index, path in enumerate(shard_paths(self.db_path, 3)):
+            self.assertEqual({ws for ws in WORKSPACES if shard_index(ws, 3) == index}, self._rows(path))
+        self.assertEqual({"tiny-file": "ws3/a.jpg"}, found["ws3"])
+        self.assertEqual("tiny-pending", pending)
+        self.assertIsNone(deleted)
+        self.assertFalse(os.path.exists(self.db_path))
+
+    def test_refuses_to_shard_an_unsplit_database(self):
+        single = MediaDB(self.db_path)
+        single.upsert_file("ws1", "fp1", "tiny1", "ws1/a.jpg", "a.jpg", "/")
+        single.close()
+
+        with self.assertRaises(RuntimeError) as caught:
+            ShardedMediaDB(self.db_path, 3)
+
+        self.assertIn("split_media_db.py", str(caught.exception))
+        self.assertFalse(any(os.path.exists(path) for path in shard_paths(self.db_path, 3)))
+
+    def test_split_existing_database(self):
+        single = MediaDB(self.db_path)
+        for workspace_id in WORKSPACES:
+            for index in range(5):
+                single.upsert_file(workspace_id, f"fp{index}", f"tiny{index}", f"{workspace_id}/{index}.jpg", "a.jpg", "/")
+        single.set_key_layout("ws3", "media", "bucket")
+        single.record_object_checks(
+            "ws3", "media", [("media/ws3/0.jpg", True, "e", 1), ("ws8/gone.jpg", False, None, None)], time.time()
+        )
+        single.close()
+
+        counts = split(self.db_path, 4, batch_rows=7)
+        with self.assertRaises(RuntimeError):
+            split(self.db_path, 4)
+        with self.assertRaises(RuntimeError):
+            ShardedMediaDB(self.db_path, 2)
+        db = ShardedMediaDB(self.db_path, 4)
+        self.addCleanup(db.close)
+
+        self.assertEqual(len(WORKSPACES) * 5, sum(counts["media_files"]))
+        self.assertEqual((1, 2), (sum(counts["key_layouts"]), sum(counts["objects"])))
+        self.assertEqual("ws9/4.jpg", db.get_object_key_by_fingerprint("ws9", "fp4"))
+        self.assertEqual({"ws3": "bucket"}, db.get_key_layouts("media"))
+        self.assertTrue(db.get_object_states("ws3", "media", ["media/ws3/0.jpg"])["media/ws3/0.jpg"][0])
+        self.assertFalse(db.get_object_states("ws8", "media", ["ws8/gone.jpg"])["ws8/gone.jpg"][0])
+        self.assertIn("ws0", self._rows(shard_paths(self.db_path, 4)[shard_index("ws0", 4)]))
+
+    def test_split_backfills_placeholder_age_from_a_legacy_database(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute(
+            """
+            CREATE TABLE media_files (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                workspace_id TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                tiny_fingerprint TEXT,
+                object_key TEXT NOT NULL,
+                file_name TEXT,
+                file_path TEXT,
+                created_at INTEGER NOT NULL,
+                UNIQUE(workspace_id, fingerprint)
+            )
+            """
+        )
+        conn.executemany(
+            "INSERT INTO media_files (workspace_id, fingerprint, object_key, created_at) VALUES (?, ?, ?, 1)",
+            [(workspace_id, "fp-pending", "") for workspace_id in WORKSPACES] + [("ws1", "fp-done", "ws1/a.jpg")],
+        )
+        conn.commit()
+        conn.close()
+
+        split(self.db_path, 3)
+        ages = {}
+        for path in shard_paths(self.db_path, 3):
+            shard = sqlite3.connect(path)
+            ages.update(shard.execute("SELECT workspace_id || '/' || fingerprint, updated_at FROM media_files"))
+            shard.close()
+
+        self.assertIsNone(ages.pop("ws1/fp-done"))
+        self.assertEqual(len(WORKSPACES), len(ages))
+        self.assertTrue(all(abs(updated_at - time.time()) < 60 for updated_at in ages.values()))
+
+
+@unittest.skipUnless(importlib.util.find_spec("flask"), "flask not installed")
+class ShardedWebListingTest(unittest.TestCase):
+    def test_listing_merges_shards_and_cursor_advances_per_shard(self):
+        web_root = str(REPO_ROOT / "web")
+        if web_root not in sys.path:
+            sys.path.insert(0, web_root)
+        import app as web_app
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            db_path = str(Path(tmpdir) / "media.db")
+            db = ShardedMediaDB(db_path, 2)
+            for index, workspace_id in enumerate(WORKSPACES[:4]):
+                db.upsert_file(workspace_id, "fp", "tiny", f"{workspace_id}/DJI_2024010112000{index}_0001_W.JPG",
+                               f"DJI_2024010112000{index}_0001_W.JPG", "/")
+            paths = shard_paths(db_path, 2)
+            rows, cursor = web_app.fetch_items(paths)
+            db.upsert_file("ws0", "fp-new", "tiny-new", "ws0/new.jpg", "new.jpg", "/")
+            new_rows, next_cursor = web_app.fetch_items(paths, cursor=web_app.parse_cursor(cursor, 2))
+            db.close()
+
+        created = [row["created_at"] for _, row in rows]
+        self.assertEqual(sorted(created, reverse=True), created)
+        self.assertEqual(4, len(rows))
+        self.assertEqual(["ws0/new.jpg"], [row["object_key"] for _, row in new_rows])
+        self.assertNotEqual(cursor, next_cursor)
+        with self.assertRaises(ValueError):
+            web_app.parse_cursor("1", 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
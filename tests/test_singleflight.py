@@ -0,0 +1,147 @@
+import asyncio
+import sys
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_ROOT = REPO_ROOT / "src"
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from media_server.config import StorageConfig
+from media_server.storage.s3_client import S3Client
+from media_server.utils.singleflight import SingleFlight
+
+
+class _SlowStorage(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    heads = []
+
+    def log_message(self, fmt, *args):
+        return None
+
+    def do_HEAD(self):
+        self.heads.append(self.path)
+        time.sleep(0.2)
+        self.send_response(200)
+        self.send_header("ETag", '"e1"')
+        self.send_header("Content-Length", "5")
+        self.end_headers()
+
+
+def _callers(count, target):
+    threads = [threading.Thread(target=target) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads
+
+
+class SingleFlightTest(unittest.TestCase):
+    def test_concurrent_callers_share_one_execution(self):
+        flight = SingleFlight("test")
+        release = threading.Event()
+        executions = []
+        results = []
+
+        def _work():
+            executions.append(1)
+            release.wait(5)
+            return "value"
+
+        threads = _callers(8, lambda: results.append(flight.do("k", _work)))
+        while flight.stats()["calls"] < 8:
+            time.sleep(0.001)
+        release.set()
+        for thread in threads:
+            thread.join()
+        later = flight.do("k", lambda: "fresh")
+
+        self.assertEqual(1, len(executions))
+        self.assertEqual(["value"] * 8, results)
+        self.assertEqual("fresh", later)
+        stats = flight.stats()
+        self.assertEqual((9, 2, 7, 0), (stats["calls"], stats["executions"], stats["coalesced"], stats["in_flight"]))
+
+    def test_errors_are_shared_with_followers(self):
+        flight = SingleFlight("test")
+        release = threading.Event()
+        errors = []
+
+        def _work():
+            release.wait(5)
+            raise RuntimeError("head object failed 500")
+
+        def _call():
+            try:
+                flight.do("k", _work)
+            except RuntimeError as exc:
+                errors.append(str(exc))
+
+        threads = _callers(3, _call)
+        while flight.stats()["calls"] < 3:
+            time.sleep(0.001)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(["head object failed 500"] * 3, errors)
+
+    def test_async_callers_share_and_survive_a_cancelled_caller(self):
+        flight = SingleFlight("test")
+        executions = []
+
+        async def _work():
+            executions.append(1)
+            await asyncio.sleep(0.05)
+            return "value"
+
+        async def _main():
+            impatient = asyncio.ensure_future(flight.do_async("k", _work))
+            others = [asyncio.ensure_future(flight.do_async("k", _work)) for _ in range(4)]
+            await asyncio.sleep(0.01)
+            impatient.cancel()
+            return await asyncio.gather(*others)
+
+        self.assertEqual(["value"] * 4, asyncio.run(_main()))
+        self.assertEqual(1, len(executions))
+        self.assertEqual(4, flight.stats()["coalesced"])
+
+
+class HeadCoalescingTest(unittest.TestCase):
+    def test_concurrent_heads_for_one_key_send_one_request(self):
+        handler = type("Storage", (_SlowStorage,), {"heads": []})
+        server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        client = S3Client(
+            StorageConfig(
+                endpoint=f"http://127.0.0.1:{server.server_address[1]}",
+                bucket="media",
+                region="us-east-1",
+                access_key="key",
+                secret_key="secret",
+                session_token="",
+                provider="minio",
+            )
+        )
+        self.addCleanup(client.close)
+        results = []
+
+        threads = _callers(6, lambda: results.append(client.head_object("ws1/a.jpg")))
+        for thread in threads:
+            thread.join()
+        batch = client.head_objects(["ws1/a.jpg", "ws1/b.jpg"], parallelism=4)
+
+        self.assertEqual(1 + 2, len(handler.heads))
+        self.assertEqual({"e1"}, {result.etag for result in results})
+        self.assertTrue(all(batch.values()))
+
+
+if __name__ == "__main__":
+    unittest.main()
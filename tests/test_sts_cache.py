@@ -0,0 +1,140 @@
+import asyncio
+import sys
+import threading
+import time
+import unittest
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_ROOT = REPO_ROOT / "src"
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from media_server.config import STSConfig
+from media_server.storage.sts_cache import STSCredentialCache
+
+
+class _CountingFetch:
+    def __init__(self, lifetime=3600, delay=0.0, error=None):
+        self.lifetime = lifetime
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, storage_config, sts_config, workspace_id):
+        with self.lock:
+            self.calls += 1
+            call = self.calls
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return f"token-{workspace_id}-{call}", "ak", "sk", self.lifetime
+
+    async def fetch_async(self, storage_config, sts_config, workspace_id):
+        await asyncio.sleep(self.delay)
+        return self(storage_config, sts_config, workspace_id)
+
+
+def _cache(fetch, refresh_threshold=300, cache=True):
+    sts = STSConfig(role_arn="arn", policy="", duration=3600, cache=cache, refresh_threshold=refresh_threshold)
+    return STSCredentialCache(None, sts, fetch=fetch, fetch_async=fetch.fetch_async)
+
+
+class STSCredentialCacheTest(unittest.TestCase):
+    def test_burst_of_misses_makes_one_assume_role(self):
+        fetch = _CountingFetch(delay=0.2)
+        cache = _cache(fetch)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get("ws1"))) for _ in range(16)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        again = cache.get("ws1")
+        other = cache.get("ws2")
+
+        self.assertEqual(2, fetch.calls)
+        self.assertEqual({"token-ws1-1"}, {creds[0] for creds in results})
+        self.assertEqual("token-ws1-1", again[0])
+        self.assertEqual("token-ws2-2", other[0])
+        self.assertLessEqual(again[3], 3600)
+        stats = cache.stats()
+        self.assertEqual(1, stats["hits"])
+        self.assertEqual(17, stats["misses"])
+        self.assertEqual(15, stats["coalesced"])
+
+    def test_refreshes_in_background_before_threshold(self):
+        fetch = _CountingFetch(lifetime=500)
+        cache = _cache(fetch, refresh_threshold=300)
+        first = cache.get("ws1")
+        served = cache.get("ws1")
+        for _ in range(100):
+            if not cache._in_flight:
+                break
+            time.sleep(0.01)
+        refreshed = cache._entries[cache._key("ws1")][0]
+
+        self.assertEqual("token-ws1-1", first[0])
+        self.assertEqual("token-ws1-1", served[0])
+        self.assertEqual("token-ws1-2", refreshed[0])
+        self.assertEqual(2, fetch.calls)
+        self.assertEqual(1, cache.stats()["refreshes"])
+
+    def test_short_lived_credentials_and_errors_are_not_cached(self):
+        fetch = _CountingFetch(lifetime=100)
+        cache = _cache(fetch, refresh_threshold=300)
+        cache.get("ws1")
+        cache.get("ws1")
+        self.assertEqual(2, fetch.calls)
+
+        failing = _cache(_CountingFetch(error=RuntimeError("minio sts http 500")))
+        with self.assertRaises(RuntimeError):
+            failing.get("ws1")
+        self.assertEqual(1, failing.stats()["errors"])
+
+    def test_async_get_shares_single_flight(self):
+        fetch = _CountingFetch(delay=0.1)
+        cache = _cache(fetch)
+
+        async def _run():
+            return await asyncio.gather(*(cache.get_async("ws1") for _ in range(8)))
+
+        results = asyncio.run(_run())
+        self.assertEqual(1, fetch.calls)
+        self.assertEqual({"token-ws1-1"}, {creds[0] for creds in results})
+
+    def test_async_background_refresh_is_tracked_and_failures_logged(self):
+        fetch = _CountingFetch(lifetime=500)
+        cache = _cache(fetch, refresh_threshold=300)
+
+        async def _run():
+            first = await cache.get_async("ws1")
+            fetch.error = RuntimeError("minio sts http 500")
+            served = await cache.get_async("ws1")
+            pending = set(cache._refresh_tasks)
+            await asyncio.gather(*pending, return_exceptions=True)
+            await asyncio.sleep(0)
+            return first, served, pending
+
+        with self.assertLogs(level="WARNING") as logs:
+            first, served, pending = asyncio.run(_run())
+
+        self.assertEqual("token-ws1-1", first[0])
+        self.assertEqual("token-ws1-1", served[0])
+        self.assertEqual(1, len(pending))
+        self.assertEqual(set(), cache._refresh_tasks)
+        self.assertEqual(1, cache.stats()["errors"])
+        self.assertIn("minio sts http 500", logs.output[0])
+
+    def test_disabled_cache_always_fetches(self):
+        fetch = _CountingFetch()
+        cache = _cache(fetch, cache=False)
+        cache.get("ws1")
+        cache.get("ws1")
+        self.assertEqual(2, fetch.calls)
+
+
+if __name__ == "__main__":
+    unittest.main()
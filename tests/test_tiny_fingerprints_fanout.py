@@ -0,0 +1,171 @@
+import json
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from io import BytesIO
+from pathlib import Path
+from unittest import mock
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_ROOT = REPO_ROOT / "src"
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from media_server.config import StorageConfig
+from media_server.handlers import tiny_fingerprints
+from media_server.storage.db import MediaDB
+from media_server.storage.s3_client import ObjectStat, S3Client
+
+STORAGE = StorageConfig(
+    endpoint="http://127.0.0.1:9",
+    bucket="media",
+    region="us-east-1",
+    access_key="key",
+    secret_key="secret",
+    session_token="",
+    provider="minio",
+    head_parallelism=4,
+    head_deadline=0.5,
+    verify_freshness=300,
+)
+
+
+class _ScriptedS3Client(S3Client):
+    """head_object answers from a key -> (delay, result) script and tracks concurrency."""
+
+    script = {}
+    lock = threading.Lock()
+    in_flight = 0
+    peak = 0
+
+    def head_object(self, object_key):
+        cls = type(self)
+        with cls.lock:
+            cls.in_flight += 1
+            cls.peak = max(cls.peak, cls.in_flight)
+        try:
+            delay, result = cls.script[object_key]
+            time.sleep(delay)
+            if isinstance(result, Exception):
+                raise result
+            return result
+        finally:
+            with cls.lock:
+                cls.in_flight -= 1
+
+
+class _FakeHandler:
+    def __init__(self, payload, db):
+        body = json.dumps(payload).encode("utf-8")
+        self.command = "POST"
+        self.path = "/media/api/v1/workspaces/ws1/files/tiny-fingerprints"
+        self.headers = {"x-auth-token": "t", "Content-Length": str(len(body))}
+        self.rfile = BytesIO(body)
+        self.wfile = BytesIO()
+        self.db = db
+        self.config = type("Config", (), {"storage": STORAGE, "server": type("S", (), {"token": "t"})()})()
+        self.status = None
+
+    def send_response(self, status):
+        self.status = status
+
+    def send_header(self, key, value):
+        return None
+
+    def end_headers(self):
+        return None
+
+    def read_json(self):
+        return json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+
+    def require_token(self):
+        return "t"
+
+
+class HeadObjectsTest(unittest.TestCase):
+    def test_bounded_parallelism_and_deadline(self):
+        client_cls = type("Client", (_ScriptedS3Client,), {"in_flight": 0, "peak": 0, "lock": threading.Lock()})
+        client_cls.script = {f"k{i}": (0.05, True) for i in range(12)}
+        client_cls.script["slow"] = (2.0, True)
+        client = client_cls(STORAGE)
+
+        started = time.monotonic()
+        results = client.head_objects(list(client_cls.script), parallelism=4, deadline=0.5)
+        elapsed = time.monotonic() - started
+
+        self.assertLessEqual(client_cls.peak, 4)
+        self.assertGreater(client_cls.peak, 1)
+        self.assertLess(elapsed, 1.0)
+        self.assertIsNone(results["slow"])
+        self.assertTrue(all(results[f"k{i}"] for i in range(12)))
+
+
+class TinyFingerprintsFanoutTest(unittest.TestCase):
+    def test_keeps_request_order_and_only_deletes_confirmed_misses(self):
+        client_cls = type("Client", (_ScriptedS3Client,), {"in_flight": 0, "peak": 0, "lock": threading.Lock()})
+        client_cls.script = {
+            "ws1/a.jpg": (0.2, True),
+            "ws1/b.jpg": (0.0, False),
+            "ws1/c.jpg": (0.0, True),
+            "ws1/d.jpg": (2.0, True),
+            "ws1/e.jpg": (0.0, RuntimeError("head object failed 500")),
+        }
+        with tempfile.TemporaryDirectory() as tmpdir:
+            db = MediaDB(str(Path(tmpdir) / "media.db"))
+            for name in "abcde":
+                db.upsert_file("ws1", f"fp-{name}", f"tiny-{name}", f"ws1/{name}.jpg", f"{name}.jpg", "/")
+            handler = _FakeHandler(
+                {"tiny_fingerprints": ["tiny-c", "tiny-a", "tiny-unknown", "tiny-b", "tiny-d", "tiny-e"]},
+                db,
+            )
+
+            with mock.patch.object(tiny_fingerprints, "S3Client", client_cls):
+                tiny_fingerprints.handle_tiny_fingerprints(handler, "ws1")
+
+            body = json.loads(handler.wfile.getvalue())
+            remaining = {name: db.get_object_key_by_tiny("ws1", f"tiny-{name}") for name in "abcde"}
+            db.close()
+
+        self.assertEqual(["tiny-c", "tiny-a"], body["data"]["tiny_fingerprints"])
+        self.assertIsNone(remaining["b"])
+        self.assertEqual("ws1/d.jpg", remaining["d"])
+        # A failed check is unknown, not missing: the row stays.
+        self.assertEqual("ws1/e.jpg", remaining["e"])
+        self.assertEqual("ws1/a.jpg", remaining["a"])
+
+    def test_fresh_rows_skip_head_and_checked_rows_are_stamped(self):
+        client_cls = type("Client", (_ScriptedS3Client,), {"in_flight": 0, "peak": 0, "lock": threading.Lock()})
+        client_cls.script = {"ws1/old.jpg": (0.0, ObjectStat(etag="e-old", size=42))}
+        calls = []
+        original = client_cls.head_object
+        client_cls.head_object = lambda self, key: calls.append(key) or original(self, key)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            db = MediaDB(str(Path(tmpdir) / "media.db"))
+            now = int(time.time())
+            db.upsert_file("ws1", "fp-new", "tiny-new", "ws1/new.jpg", "new.jpg", "/", verified_at=now)
+            db.upsert_file("ws1", "fp-old", "tiny-old", "ws1/old.jpg", "old.jpg", "/", verified_at=now - 3600)
+            handler = _FakeHandler({"tiny_fingerprints": ["tiny-new", "tiny-old"]}, db)
+
+            with mock.patch.object(tiny_fingerprints, "S3Client", client_cls):
+                tiny_fingerprints.handle_tiny_fingerprints(handler, "ws1")
+
+            body = json.loads(handler.wfile.getvalue())
+            row = db._fetch_one(
+                "SELECT verified_at, etag, size FROM media_files WHERE workspace_id=? AND fingerprint=?",
+                ("ws1", "fp-old"),
+            )
+            cleared = db.invalidate_verified(workspace_id="ws1")
+            db.close()
+
+        self.assertEqual(["tiny-new", "tiny-old"], body["data"]["tiny_fingerprints"])
+        self.assertEqual(["ws1/old.jpg"], calls)
+        self.assertGreaterEqual(row[0], now)
+        self.assertEqual(("e-old", 42), row[1:])
+        self.assertEqual(2, cleared)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,127 @@
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_ROOT = REPO_ROOT / "src"
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from media_server.storage.db import MediaDB
+from media_server.storage.write_behind import WriteBehindQueue
+
+
+class _FlakyDB(MediaDB):
+    """Fails any upsert of fingerprint "fp-bad" so group commits have to fall back."""
+
+    def upsert_fingerprint_tiny(self, workspace_id, fingerprint, *args, **kwargs):
+        if fingerprint == "fp-bad":
+            raise ValueError("bad row")
+        return super().upsert_fingerprint_tiny(workspace_id, fingerprint, *args, **kwargs)
+
+
+class WriteBehindQueueTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def _count(self, db):
+        return db._fetch_one("SELECT COUNT(*) FROM media_files")[0]
+
+    def test_groups_concurrent_upserts_and_flushes_on_close(self):
+        db = MediaDB(str(Path(self.tmpdir.name) / "media.db"))
+        writer = WriteBehindQueue(db, max_batch=64, max_delay_ms=20)
+
+        def _submit(worker):
+            for index in range(100):
+                writer.upsert_fingerprint_tiny("ws1", f"fp-{worker}-{index}", f"tiny-{worker}-{index}", file_name="a.jpg")
+
+        threads = [threading.Thread(target=_submit, args=(worker,)) for worker in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        writer.close()
+        stats = writer.stats()
+        writer.upsert_fingerprint_tiny("ws1", "fp-after-close", "tiny-after-close")
+        total = self._count(db)
+        tiny = db.get_tiny_by_fingerprint("ws1", "fp-3-99")
+        db.close()
+
+        self.assertEqual(401, total)
+        self.assertEqual("tiny-3-99", tiny)
+        self.assertEqual(400, stats["committed"])
+        self.assertLess(stats["batches"], 400)
+        self.assertLessEqual(stats["largest_batch"], 64)
+        self.assertEqual(0, stats["pending"])
+
+    def test_upserts_racing_close_are_not_dropped(self):
+        db = MediaDB(str(Path(self.tmpdir.name) / "media.db"))
+        writer = WriteBehindQueue(db, max_batch=8, max_delay_ms=1)
+        started = threading.Barrier(5)
+
+        def _submit(worker):
+            started.wait()
+            for index in range(200):
+                writer.upsert_fingerprint_tiny("ws1", f"fp-{worker}-{index}", f"tiny-{worker}-{index}")
+
+        threads = [threading.Thread(target=_submit, args=(worker,)) for worker in range(4)]
+        for thread in threads:
+            thread.start()
+        started.wait()
+        writer.close()
+        for thread in threads:
+            thread.join()
+        total = self._count(db)
+        db.close()
+
+        self.assertEqual(800, total)
+
+    def test_bad_row_only_drops_itself(self):
+        db = _FlakyDB(str(Path(self.tmpdir.name) / "media.db"))
+        writer = WriteBehindQueue(db, max_batch=10, max_delay_ms=50)
+        for fingerprint in ("fp-1", "fp-bad", "fp-2"):
+            writer.upsert_fingerprint_tiny("ws1", fingerprint, f"tiny-{fingerprint}")
+        writer.flush()
+        stats = writer.stats()
+        writer.close()
+        total = self._count(db)
+        db.close()
+
+        self.assertEqual(2, total)
+        self.assertEqual(1, stats["errors"])
+        self.assertEqual(2, stats["committed"])
+
+    def test_full_queue_writes_synchronously(self):
+        release = threading.Event()
+
+        class _StalledDB(MediaDB):
+            def transaction(self):
+                release.wait(5)
+                return super().transaction()
+
+        db = _StalledDB(str(Path(self.tmpdir.name) / "media.db"))
+        writer = WriteBehindQueue(db, max_batch=1, max_delay_ms=0, capacity=1)
+        writer.upsert_fingerprint_tiny("ws1", "fp-1", "tiny-1")
+        while writer.stats()["pending"]:
+            time.sleep(0.01)
+        writer.upsert_fingerprint_tiny("ws1", "fp-2", "tiny-2")
+        writer.upsert_fingerprint_tiny("ws1", "fp-3", "tiny-3")
+        synchronous = db.get_tiny_by_fingerprint("ws1", "fp-3")
+        release.set()
+        writer.close()
+        stats = writer.stats()
+        total = self._count(db)
+        db.close()
+
+        self.assertEqual("tiny-3", synchronous)
+        self.assertEqual(1, stats["fallbacks"])
+        self.assertEqual(3, total)
+
+
+if __name__ == "__main__":
+    unittest.main()
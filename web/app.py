@@ -1,4 +1,5 @@
 from lib.aws_sigv4 import aws_v4_headers
+import heapq
 import os
 import sqlite3
 import sys
@@ -13,6 +14,8 @@ from flask import Flask, Response, jsonify, render_template, request
 repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, os.path.join(repo_root, "src"))
 
+from media_server.storage.sharding import shard_paths  # noqa: E402
+
 
 SELECT_FIELDS = """
     id, workspace_id, fingerprint, tiny_fingerprint, object_key,
@@ -71,6 +74,7 @@ class WebConfig:
     storage_access_key: str
     storage_secret_key: str
     storage_session_token: str
+    db_shards: int = 0
     storage_scheme: str = ""
     storage_host: str = ""
 
@@ -84,7 +88,13 @@ def parse_storage_endpoint(config):
     config.storage_host = parsed.netloc
 
 
-def fetch_items(db_path, since_id=None):
+def db_paths(config):
+    if config.db_shards > 1:
+        return shard_paths(config.db_path, config.db_shards)
+    return [config.db_path]
+
+
+def _fetch_shard(db_path, since_id=None):
     query = f"""
         SELECT {SELECT_FIELDS}
         FROM media_files
@@ -97,10 +107,40 @@ def fetch_items(db_path, since_id=None):
         query += " ORDER BY id ASC"
     else:
         query += " ORDER BY created_at DESC"
+    if not os.path.exists(db_path):
+        return []
     with open_db(db_path) as conn:
         return conn.execute(query, params).fetchall()
 
 
+def parse_cursor(value, shards):
+    """Per-shard highest ids from ``"12,40,7"``; raises ValueError on a malformed cursor."""
+    ids = [int(part) for part in value.split(",")]
+    if len(ids) != shards:
+        raise ValueError(f"cursor has {len(ids)} ids, expected {shards}")
+    return ids
+
+
+def fetch_items(paths, cursor=None):
+    """Rows of every shard as ``(shard, row)`` plus the cursor for the next poll.
+
+    Without a cursor the rows are newest first; with one, only rows added
+    since, oldest first. Ids are per shard, so the cursor keeps one per shard.
+    """
+    per_shard = []
+    next_cursor = []
+    for shard, path in enumerate(paths):
+        since_id = cursor[shard] if cursor is not None else None
+        rows = [(shard, row) for row in _fetch_shard(path, since_id)]
+        per_shard.append(rows)
+        next_cursor.append(max([since_id or 0] + [row["id"] for _, row in rows]))
+    merged = heapq.merge(
+        *per_shard,
+        key=lambda entry: (entry[1]["created_at"] or 0) if cursor is not None else -(entry[1]["created_at"] or 0),
+    )
+    return list(merged), ",".join(str(value) for value in next_cursor)
+
+
 def create_app(config):
     app = Flask(__name__)
     parse_storage_endpoint(config)
@@ -125,8 +165,12 @@ def create_app(config):
             return "-"
         return f"{lat}, {lng}"
 
-    def _row_to_item(row):
+    sharded = config.db_shards > 1
+
+    def _row_to_item(shard, row):
         item = dict(row)
+        if sharded:
+            item["id"] = f"{shard}:{row['id']}"
         item["created_at"] = _format_timestamp(row["created_at"])
         item["capture_time"] = _format_timestamp(row["capture_time"])
         item["is_original"] = None if row["is_original"] is None else bool(row["is_original"])
@@ -142,20 +186,22 @@ def create_app(config):
 
     @app.route("/")
     def index():
-        rows = fetch_items(config.db_path)
-        items = [_row_to_item(row) for row in rows]
-        return render_template("index.html", items=items)
+        rows, cursor = fetch_items(db_paths(config))
+        items = [_row_to_item(shard, row) for shard, row in rows]
+        return render_template("index.html", items=items, cursor=cursor)
 
     @app.route("/api/media")
     def api_media():
-        since_id = request.args.get("since_id", "0")
+        paths = db_paths(config)
+        # since_id is the pre-sharding single-file form of the cursor.
+        cursor = request.args.get("cursor", request.args.get("since_id", "0"))
         try:
-            since_id = int(since_id)
+            cursor = parse_cursor(cursor, len(paths))
         except ValueError:
-            return jsonify({"error": "invalid since_id"}), 400
-        rows = fetch_items(config.db_path, since_id=since_id)
-        items = [_row_to_item(row) for row in rows]
-        return jsonify({"items": items})
+            return jsonify({"error": "invalid cursor"}), 400
+        rows, next_cursor = fetch_items(paths, cursor=cursor)
+        items = [_row_to_item(shard, row) for shard, row in rows]
+        return jsonify({"items": items, "cursor": next_cursor})
 
     @app.route("/preview")
     def preview():
@@ -176,9 +222,16 @@ def create_app(config):
         object_key = request.form.get("object_key", "")
         if not record_id or not object_key:
             return jsonify({"ok": False, "error": "missing record_id/object_key"}), 400
+        paths = db_paths(config)
+        shard, _, row_id = record_id.rpartition(":")
+        try:
+            path = paths[int(shard or 0)]
+            row_id = int(row_id)
+        except (ValueError, IndexError):
+            return jsonify({"ok": False, "error": "invalid record_id"}), 400
         s3_request(config, "DELETE", object_key)
-        with open_db(config.db_path) as conn:
-            conn.execute("DELETE FROM media_files WHERE id=?", (record_id,))
+        with open_db(path) as conn:
+            conn.execute("DELETE FROM media_files WHERE id=?", (row_id,))
             conn.commit()
         return jsonify({"ok": True, "id": record_id})
 
@@ -206,6 +259,8 @@ def main(
         "minioadmin", "--storage-secret-key", help="Object storage secret key"),
     storage_session_token: str = typer.Option(
         "", "--storage-session-token", help="Object storage session token"),
+    db_shards: int = typer.Option(
+        0, "--db-shards", help="Same value as the media server's --db-shards (0 = one file)"),
 ):
     config = WebConfig(
         host,
@@ -217,6 +272,7 @@ def main(
         storage_access_key,
         storage_secret_key,
         storage_session_token,
+        db_shards,
     )
     app = create_app(config)
     app.run(host=config.host, port=config.port)
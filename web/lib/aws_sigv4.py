@@ -1,62 +1,11 @@
-import hashlib
-import hmac
-from datetime import datetime, timezone
+"""The web console signs with the server's SigV4 implementation (media_server.utils.aws_sigv4)."""
+import os
+import sys
 
+_src_root = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "src")
+if _src_root not in sys.path:
+    sys.path.insert(0, _src_root)
 
-def _aws_v4_sign(key, msg):
-    return hmac.new(key, msg.encode("utf-8"), hashlib.sha256).digest()
+from media_server.utils.aws_sigv4 import SigV4Signer, aws_v4_headers  # noqa: E402
 
-
-def _aws_v4_signature(secret_key, date_stamp, region, service, string_to_sign):
-    k_date = _aws_v4_sign(("AWS4" + secret_key).encode("utf-8"), date_stamp)
-    k_region = hmac.new(k_date, region.encode("utf-8"), hashlib.sha256).digest()
-    k_service = hmac.new(k_region, service.encode("utf-8"), hashlib.sha256).digest()
-    k_signing = hmac.new(k_service, b"aws4_request", hashlib.sha256).digest()
-    return hmac.new(k_signing, string_to_sign.encode("utf-8"), hashlib.sha256).hexdigest()
-
-
-def aws_v4_headers(access_key, secret_key, region, service, method, host, canonical_uri, payload, extra_headers=None):
-    extra_headers = extra_headers or {}
-    amz_date = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
-    date_stamp = amz_date[:8]
-    payload_hash = hashlib.sha256(payload).hexdigest()
-
-    headers = {
-        "host": host,
-        "x-amz-content-sha256": payload_hash,
-        "x-amz-date": amz_date,
-    }
-    for key, value in extra_headers.items():
-        headers[key.lower()] = value
-
-    signed_headers = ";".join(sorted(headers.keys()))
-    canonical_headers = "".join(f"{k}:{headers[k]}\n" for k in sorted(headers.keys()))
-    canonical_request = "\n".join(
-        [
-            method,
-            canonical_uri,
-            "",
-            canonical_headers,
-            signed_headers,
-            payload_hash,
-        ]
-    )
-    credential_scope = f"{date_stamp}/{region}/{service}/aws4_request"
-    string_to_sign = "\n".join(
-        [
-            "AWS4-HMAC-SHA256",
-            amz_date,
-            credential_scope,
-            hashlib.sha256(canonical_request.encode("utf-8")).hexdigest(),
-        ]
-    )
-    signature = _aws_v4_signature(secret_key, date_stamp, region, service, string_to_sign)
-    authorization = (
-        "AWS4-HMAC-SHA256 "
-        f"Credential={access_key}/{credential_scope}, "
-        f"SignedHeaders={signed_headers}, "
-        f"Signature={signature}"
-    )
-
-    headers["authorization"] = authorization
-    return headers
+__all__ = ["SigV4Signer", "aws_v4_headers"]
@@ -61,12 +61,12 @@ function buildCard(item, apiBase) {
 async function pollNew(state) {
   const { apiBase, grid, emptyState } = state;
   try {
-    const res = await fetch(`${apiBase}/api/media?since_id=${state.lastId}`);
+    const res = await fetch(`${apiBase}/api/media?cursor=${encodeURIComponent(state.cursor)}`);
     if (!res.ok) return;
     const data = await res.json();
+    if (data.cursor) state.cursor = data.cursor;
     if (!data.items || !data.items.length) return;
     data.items.forEach((item) => {
-      if (item.id > state.lastId) state.lastId = item.id;
       const card = buildCard(item, apiBase);
       if (card) grid.prepend(card);
     });
@@ -109,9 +109,10 @@ export function initMediaSection(options) {
     throw new Error("media_section: .media-grid element not found");
   }
   const emptyState = root.querySelector(".media-empty");
-  const lastId = parseInt(root.dataset.lastId || "0", 10);
+  // One highest-seen id per database shard, comma separated; the server hands back the next one.
+  const cursor = root.dataset.cursor || "0";
 
-  const state = { apiBase, grid, emptyState, lastId };
+  const state = { apiBase, grid, emptyState, cursor };
 
   root.querySelectorAll(".media-preview img").forEach(attachImageRetry);
 